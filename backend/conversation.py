@@ -1,3 +1,6 @@
+import json
+import os
+import re
 import time
 import logging
 from dataclasses import dataclass, field
@@ -141,6 +144,7 @@ class Packer:
         user_images_data_urls: Optional[List[str]] = None,
         include_summary: bool = True,
         include_state_facts: bool = True,
+        user_context_texts: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """Return a list of input items for Runner.run_streamed(..., input=...).
 
@@ -149,6 +153,8 @@ class Packer:
           has `instructions` set; that would duplicate the prompt. We include optional
           summary/facts as system items because those are dynamic and not part of the agent.
         - We include last K curated items (user/assistant only) and the current user text.
+        - `user_context_texts` are extra input_text parts of the current user item
+          (e.g. the text of a tool output whose images are attached).
         - If over budget, we trim K downward.
         """
 
@@ -162,10 +168,13 @@ class Packer:
         # Helper: build the current user message with optional images
         def _build_current_user_item(text: Optional[str], image_urls: Optional[List[str]]) -> Dict[str, Any]:
             images = [u for u in (image_urls or []) if isinstance(u, str) and u]
-            if images:
+            extras = [t for t in (user_context_texts or []) if isinstance(t, str) and t]
+            if images or extras:
                 segments: List[Dict[str, Any]] = []
                 if text:
                     segments.append({"type": "input_text", "text": text})
+                for extra in extras:
+                    segments.append({"type": "input_text", "text": extra})
                 for url in images:
                     segments.append({"type": "input_image", "image_url": url})
                 return {"role": "user", "content": segments}
@@ -203,3 +212,242 @@ class Packer:
         return items
 
 
+
+
+class ToolOutputCompactor:
+    """Shrinks tool outputs to a per-tool token budget before they reach the model.
+
+    Passes run cheapest-loss first and stop as soon as the output fits:
+    1) always: elide inline base64 blobs (the top-level `images` map is kept, it is
+       routed to the model as image input) and round floats;
+    2) over budget: drop None/empty/default-valued fields;
+    3) still over: progressively halve the longest arrays, keeping the head.
+    Whatever was removed is recorded under `_compaction` so the model can ask for more.
+
+    Node lists of the tools in TABULAR_KEYS are first re-encoded as tables
+    (`{"_format": "table", "columns": [...], "rows": [[...], ...]}`) so keys are
+    not repeated per element; nested objects are flattened into dotted columns.
+    """
+
+    DEFAULT_BUDGET_TOKENS = 4000
+    TOOL_BUDGETS: Dict[str, int] = {
+        "get_canvas_snapshot": 6000,
+        "get_node_details": 6000,
+        "get_node_hierarchy": 6000,
+        "find_nodes": 5000,
+        "get_document_styles": 4000,
+        "get_document_components": 4000,
+        "get_style_consumers": 3000,
+        "get_node_ancestry": 2000,
+    }
+    TOOL_HINTS: Dict[str, str] = {
+        "find_nodes": "Narrow the filters, page with limit/offset/cursor, or pass fields.",
+        "get_node_details": "Request fewer node_ids or pass fields.",
+        "get_canvas_snapshot": "Pass fields to project the summaries.",
+        "get_node_hierarchy": "Call it on a deeper node to see the elided children.",
+    }
+    DEFAULT_VALUES: Dict[str, Any] = {
+        "visible": True,
+        "locked": False,
+        "opacity": 1,
+        "rotation": 0,
+        "blend_mode": "PASS_THROUGH",
+        "blendMode": "PASS_THROUGH",
+    }
+    TABULAR_KEYS: Dict[str, Tuple[str, ...]] = {
+        "find_nodes": ("matching_nodes",),
+        "get_node_hierarchy": ("children",),
+        "get_style_consumers": ("consuming_nodes",),
+        "get_document_components": ("components",),
+    }
+    TABULAR_MIN_ROWS = 3
+    BASE64_MIN_LENGTH = 512
+    FLOAT_DIGITS = 2
+    MIN_ARRAY_ITEMS = 3
+
+    _BASE64_RE = re.compile(r"^[A-Za-z0-9+/]+={0,2}$")
+
+    def __init__(self, default_budget_tokens: int = DEFAULT_BUDGET_TOKENS, enabled: bool = True,
+                 tabular: bool = True, budgeter: Optional[TokenBudgeter] = None) -> None:
+        self.default_budget_tokens = default_budget_tokens
+        self.enabled = enabled
+        self.tabular = tabular
+        self.budgeter = budgeter or TokenBudgeter()
+
+    @classmethod
+    def from_env(cls) -> "ToolOutputCompactor":
+        """Build from TOOL_OUTPUT_BUDGET_TOKENS / TOOL_OUTPUT_COMPACTION / TOOL_OUTPUT_TABULAR."""
+        try:
+            default_budget = int(os.getenv("TOOL_OUTPUT_BUDGET_TOKENS", str(cls.DEFAULT_BUDGET_TOKENS)))
+        except ValueError:
+            default_budget = cls.DEFAULT_BUDGET_TOKENS
+        enabled = os.getenv("TOOL_OUTPUT_COMPACTION", "true").lower() not in ("0", "false", "no")
+        tabular = os.getenv("TOOL_OUTPUT_TABULAR", "true").lower() not in ("0", "false", "no")
+        return cls(default_budget_tokens=default_budget, enabled=enabled, tabular=tabular)
+
+    def budget_for(self, tool_name: Optional[str]) -> int:
+        return self.TOOL_BUDGETS.get(tool_name or "", self.default_budget_tokens)
+
+    def compact(self, result: Any, tool_name: Optional[str] = None) -> Any:
+        """Return a compacted copy of `result` (the input is never mutated)."""
+        if not isinstance(result, (dict, list)):
+            return result
+        original = result
+        if self.tabular and isinstance(result, dict):
+            result = self.encode_tables(result, tool_name)
+        if not self.enabled:
+            return result
+        budget = self.budget_for(tool_name)
+        notes: Dict[str, Any] = {"elided_base64": 0, "dropped_fields": 0, "truncated_arrays": []}
+
+        out = self._walk(result, notes, drop_defaults=False, top_level=True)
+        original_tokens = self._tokens(original)
+        tokens = self._tokens(out)
+        if tokens > budget:
+            out = self._walk(out, notes, drop_defaults=True, top_level=True)
+            tokens = self._tokens(out)
+        if tokens > budget:
+            tokens = self._truncate_arrays(out, notes, budget)
+
+        changed = notes["elided_base64"] or notes["dropped_fields"] or notes["truncated_arrays"]
+        if changed:
+            logger.info(
+                f"🗜️ Compacted {tool_name or 'tool'} output: {original_tokens} -> {tokens} tokens "
+                f"(budget={budget}, base64={notes['elided_base64']}, dropped={notes['dropped_fields']}, arrays={len(notes['truncated_arrays'])})"
+            )
+        if changed and isinstance(out, dict):
+            meta: Dict[str, Any] = {"budget_tokens": budget, "original_tokens": original_tokens}
+            meta.update({k: v for k, v in notes.items() if v})
+            hint = self.TOOL_HINTS.get(tool_name or "")
+            if notes["truncated_arrays"] and hint:
+                meta["hint"] = hint
+            out["_compaction"] = meta
+        return out
+
+    def encode_tables(self, result: Dict[str, Any], tool_name: Optional[str]) -> Dict[str, Any]:
+        """Return a shallow copy of `result` with the tool's node lists in table form."""
+        keys = self.TABULAR_KEYS.get(tool_name or "", ())
+        out = result
+        for key in keys:
+            rows = result.get(key)
+            if not isinstance(rows, list) or len(rows) < self.TABULAR_MIN_ROWS:
+                continue
+            if not all(isinstance(row, dict) for row in rows):
+                continue
+            flat_rows = [self._flatten(row) for row in rows]
+            columns: List[str] = []
+            seen = set()
+            for row in flat_rows:
+                for col in row:
+                    if col not in seen:
+                        seen.add(col)
+                        columns.append(col)
+            if out is result:
+                out = dict(result)
+            out[key] = {
+                "_format": "table",
+                "columns": columns,
+                "rows": [[row.get(col) for col in columns] for row in flat_rows],
+            }
+        return out
+
+    # Internal
+    def _flatten(self, row: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+        flat: Dict[str, Any] = {}
+        for key, value in row.items():
+            col = f"{prefix}{key}"
+            if isinstance(value, dict) and value:
+                flat.update(self._flatten(value, f"{col}."))
+            else:
+                flat[col] = value
+        return flat
+
+    def _tokens(self, value: Any) -> int:
+        # The top-level `images` map never reaches the model as text, so it does not count
+        if isinstance(value, dict) and "images" in value:
+            value = {k: v for k, v in value.items() if k != "images"}
+        return self.budgeter.estimate_tokens_for_text(json.dumps(value, ensure_ascii=False, default=str))
+
+    def _is_base64(self, value: str) -> bool:
+        return len(value) >= self.BASE64_MIN_LENGTH and bool(self._BASE64_RE.match(value))
+
+    def _is_droppable(self, key: str, value: Any) -> bool:
+        if value is None or (isinstance(value, (list, dict, str)) and len(value) == 0):
+            return True
+        if key not in self.DEFAULT_VALUES:
+            return False
+        default = self.DEFAULT_VALUES[key]
+        return isinstance(value, bool) == isinstance(default, bool) and value == default
+
+    def _walk(self, value: Any, notes: Dict[str, Any], drop_defaults: bool, top_level: bool = False) -> Any:
+        if isinstance(value, dict):
+            out: Dict[str, Any] = {}
+            for key, item in value.items():
+                if top_level and key == "images":
+                    out[key] = item
+                    continue
+                if drop_defaults and self._is_droppable(key, item):
+                    notes["dropped_fields"] += 1
+                    continue
+                out[key] = self._walk(item, notes, drop_defaults)
+            return out
+        if isinstance(value, list):
+            return [self._walk(item, notes, drop_defaults) for item in value]
+        if isinstance(value, float):
+            rounded = round(value, self.FLOAT_DIGITS)
+            return int(rounded) if rounded.is_integer() else rounded
+        if isinstance(value, str) and self._is_base64(value):
+            notes["elided_base64"] += 1
+            return f"<base64 elided: {len(value)} chars>"
+        return value
+
+    def _collect_arrays(self, root: Any) -> List[Tuple[str, List[Any]]]:
+        arrays: List[Tuple[str, List[Any]]] = []
+
+        def collect(value: Any, path: str) -> None:
+            if self._is_table(value):
+                collect_table(value, path or "$")
+            elif isinstance(value, dict):
+                for key, item in value.items():
+                    if path == "" and key == "images":
+                        continue
+                    collect(item, f"{path}.{key}" if path else str(key))
+            elif isinstance(value, list):
+                arrays.append((path or "$", value))
+                for idx, item in enumerate(value):
+                    collect(item, f"{path}[{idx}]")
+
+        def collect_table(table: Dict[str, Any], path: str) -> None:
+            # Only whole rows may go; `columns` and each row list must keep their shape
+            rows = table.get("rows")
+            if not isinstance(rows, list):
+                return
+            arrays.append((f"{path}.rows", rows))
+            for idx, row in enumerate(rows):
+                for col, cell in enumerate(row if isinstance(row, list) else []):
+                    collect(cell, f"{path}.rows[{idx}][{col}]")
+
+        collect(root, "")
+        return arrays
+
+    def _truncate_arrays(self, root: Any, notes: Dict[str, Any], budget: int) -> int:
+        original_lengths = {id(lst): len(lst) for _, lst in self._collect_arrays(root)}
+        tokens = self._tokens(root)
+        while tokens > budget:
+            # Re-collect each round so arrays nested in dropped items stop competing
+            candidates = [lst for _, lst in self._collect_arrays(root) if len(lst) > self.MIN_ARRAY_ITEMS]
+            if not candidates:
+                break
+            longest = max(candidates, key=len)
+            del longest[max(self.MIN_ARRAY_ITEMS, len(longest) // 2):]
+            tokens = self._tokens(root)
+
+        for path, lst in self._collect_arrays(root):
+            original = original_lengths.get(id(lst), len(lst))
+            if len(lst) < original:
+                notes["truncated_arrays"].append({"path": path, "kept": len(lst), "total": original})
+        return tokens
+
+    @staticmethod
+    def _is_table(value: Any) -> bool:
+        return isinstance(value, dict) and value.get("_format") == "table" and isinstance(value.get("columns"), list)
@@ -10,10 +10,69 @@ import json
 import uuid
 import logging
 import time
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional
+
+from scene_index import SceneIndex
 
 logger = logging.getLogger(__name__)
 
+# Number of per-command timing records retained for latency analysis
+TIMING_HISTORY_SIZE = 50
+
+# Adaptive timeouts: cold-start baselines (seconds) per command. Commands not
+# listed start from the communicator's default timeout. Once enough samples are
+# observed, the timeout converges on a latency percentile scaled by payload size.
+COMMAND_TIMEOUT_BASELINES: Dict[str, float] = {
+    "show_notification": 5.0,
+    "commit_undo_step": 5.0,
+    "flush_reveal": 8.0,
+    "preload_fonts": 15.0,
+    "scroll_and_zoom_into_view": 8.0,
+    "get_node_ancestry": 10.0,
+    "get_node_hierarchy": 10.0,
+    "get_document_styles": 15.0,
+    "get_node_details": 45.0,
+    "find_nodes": 45.0,
+    "get_style_consumers": 45.0,
+    "get_document_components": 45.0,
+    "get_image_of_node": 60.0,
+}
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 5
+ADAPTIVE_TIMEOUT_PERCENTILE = 0.95
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0
+# The adaptive timeout never drops below this fraction of the command's baseline
+ADAPTIVE_TIMEOUT_BASELINE_FLOOR = 0.25
+# Payload weight of an unscoped (whole-page) find_nodes relative to a scoped one
+UNSCOPED_SEARCH_WEIGHT = 8.0
+# Payload weight assumed for selector-targeted mutations (see _payload_weight)
+SELECTOR_ASSUMED_NODES = 25
+
+# Scheduling priority classes (lower runs first). Interactive commands give the
+# user immediate feedback; bulk commands are expensive inspections/exports.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+COMMAND_PRIORITIES: Dict[str, int] = {
+    "show_notification": PRIORITY_INTERACTIVE,
+    "scroll_and_zoom_into_view": PRIORITY_INTERACTIVE,
+    "commit_undo_step": PRIORITY_INTERACTIVE,
+    "flush_reveal": PRIORITY_INTERACTIVE,
+    "get_image_of_node": PRIORITY_BULK,
+    "get_style_consumers": PRIORITY_BULK,
+    "get_document_components": PRIORITY_BULK,
+    "preload_fonts": PRIORITY_BULK,
+}
+# Starvation protection: every PRIORITY_AGING_SECONDS spent queued promotes a
+# waiter by one class, so bulk work cannot be postponed indefinitely.
+PRIORITY_AGING_SECONDS = 2.0
+# Extra in-flight slots only interactive commands may use when the window is full
+INTERACTIVE_RESERVED_SLOTS = 1
+
+# Reveal policies for the plugin's post-step viewport work. "always" reveals after
+# every step, "end_of_turn" defers to one `flush_reveal` call, "never" skips it.
+REVEAL_POLICIES = ("always", "end_of_turn", "never")
+
 class ToolExecutionError(Exception):
     """
     Specialized exception for tool execution failures.
@@ -45,6 +104,131 @@ class ToolExecutionError(Exception):
         text = self.message if self.message else self.code
         super().__init__(text)
 
+class CommandStream:
+    """Async iterator over the partial result batches of one streamed tool call.
+
+    Use as an async context manager::
+
+        async with communicator.stream_command("find_nodes", params) as stream:
+            async for items in stream:
+                ...
+        final = stream.result  # None when the loop exited early
+
+    Leaving the block before the plugin finished cancels the call, which sends a
+    `tool_cancel` so the plugin stops walking.
+    """
+
+    def __init__(self, communicator: "FigmaCommunicator", command: str, params: Optional[Dict[str, Any]] = None):
+        self._communicator = communicator
+        self.command = command
+        self.params = params or {}
+        self.request_id = communicator.generate_id()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.result: Any = None
+        self.completed = False
+        self.batches = 0
+
+    async def __aenter__(self) -> "CommandStream":
+        self._communicator._partial_queues[self.request_id] = self._queue
+        self._task = asyncio.create_task(
+            self._communicator.send_command(self.command, self.params, request_id=self.request_id)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self._communicator._partial_queues.pop(self.request_id, None)
+        if self._task is not None and not self._task.done():
+            logger.info(f"🛑 Stream {self.command} (ID: {self.request_id}) closed early after {self.batches} batch(es)")
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        return False
+
+    def __aiter__(self) -> "CommandStream":
+        return self
+
+    async def __anext__(self) -> List[Any]:
+        while True:
+            if not self._queue.empty():
+                self.batches += 1
+                return self._queue.get_nowait()
+            if self._task.done():
+                # Partials are relayed before the final response, so the queue is drained
+                self.result = self._task.result()
+                self.completed = True
+                raise StopAsyncIteration
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                self.batches += 1
+                return getter.result()
+            getter.cancel()
+
+
+class EditTransaction:
+    """A batch of mutations applied atomically through one `apply_edit_plan` call.
+
+    Use as an async context manager::
+
+        async with communicator.transaction() as tx:
+            card = tx.add("create_frame", {"name": "Card"}, ref="card")
+            tx.add("set_corner_radius", {"node_ids": [card], "uniform_radius": 12})
+        tx.result
+
+    Nothing is sent until `commit()` (a clean exit of the block). An exception in
+    the block, or `abort()`, discards the queued operations. When an operation
+    fails in the plugin, everything applied before it is rolled back and `commit()`
+    raises ToolExecutionError with code `transaction_rolled_back`.
+    """
+
+    def __init__(self, communicator: "FigmaCommunicator", reveal: Optional[str] = None):
+        self._communicator = communicator
+        self.reveal = reveal
+        self.operations: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.committed = False
+        self.aborted = False
+
+    def add(self, command: str, params: Optional[Dict[str, Any]] = None, ref: Optional[str] = None) -> Optional[str]:
+        """Queue one operation. Returns the "$ref.id" token when `ref` is given."""
+        if self.committed or self.aborted:
+            raise RuntimeError("Transaction already finished")
+        operation: Dict[str, Any] = {"command": command, "params": params or {}}
+        if ref:
+            operation["ref"] = ref
+        self.operations.append(operation)
+        return f"${ref}.id" if ref else None
+
+    async def commit(self) -> Any:
+        if self.committed or self.aborted:
+            raise RuntimeError("Transaction already finished")
+        self.committed = True
+        if not self.operations:
+            return None
+        self.result = await self._communicator.send_command(
+            "apply_edit_plan", {"operations": self.operations, "atomic": True}, reveal=self.reveal
+        )
+        return self.result
+
+    def abort(self) -> None:
+        if not self.committed:
+            self.aborted = True
+            self.operations.clear()
+
+    async def __aenter__(self) -> "EditTransaction":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.abort()
+        elif not self.committed and not self.aborted:
+            await self.commit()
+        return False
+
+
 class FigmaCommunicator:
     """
     Handles RPC communication with the Figma plugin.
@@ -56,22 +240,48 @@ class FigmaCommunicator:
     - Error handling and timeouts
     """
     
-    def __init__(self, websocket, timeout: float = 30.0):
+    def __init__(self, websocket, timeout: float = 30.0, min_timeout: float = 2.0,
+                 max_timeout: float = 120.0, adaptive_timeouts: bool = True, max_in_flight: int = 2,
+                 scene_index: Optional[SceneIndex] = None, reveal_policy: str = "always"):
         """
         Initialize the communicator.
         
         Args:
             websocket: The WebSocket connection to send messages through
-            timeout: Timeout in seconds for tool calls (default: 30.0)
+            timeout: Default timeout in seconds for commands without a baseline (default: 30.0)
+            min_timeout: Floor applied to every resolved timeout (default: 2.0)
+            max_timeout: Ceiling applied to every resolved timeout (default: 120.0)
+            adaptive_timeouts: When False, every command uses `timeout` unchanged
+            max_in_flight: Maximum tool_calls outstanding at the plugin; extra calls queue here
+            scene_index: Optional local mirror of the document; read-only commands it can
+                answer never reach the plugin, and every result is fed back into it
+            reveal_policy: Session reveal policy stamped on tool_calls (see REVEAL_POLICIES)
         """
         self.websocket = websocket
         self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max(max_timeout, min_timeout)
+        self.adaptive_timeouts = adaptive_timeouts
+        self.reveal_policy = reveal_policy if reveal_policy in REVEAL_POLICIES else "always"
+        self._reveal_pending = False  # A deferred reveal awaits flush_reveal
         self.pending_requests: Dict[str, asyncio.Future] = {}
         self.request_timestamps: Dict[str, float] = {}  # Track request start times
         self.request_meta: Dict[str, Dict[str, Any]] = {}  # Track command/params per request
         # Token logging context and hook
         self.current_turn_id: Optional[str] = None
         self._token_counter_hook = None  # Optional[Callable[[Dict[str, Any]], None]]
+        # Per-command timing records: round trip vs. plugin execution vs. transit
+        self.timing_history: Dict[str, Deque[Dict[str, Any]]] = {}
+        # Bounded in-flight window. The plugin runs commands on Figma's single main
+        # thread, so extra calls wait here (visible, measurable) instead of inside it.
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._in_flight = 0
+        self._waiters: List[Dict[str, Any]] = []  # {future, priority, seq, enqueued_at, command}
+        self._waiter_seq = 0
+        self._queue_stats: Dict[str, Any] = {"queued_total": 0, "total_wait_ms": 0, "max_wait_ms": 0}
+        self.scene_index = scene_index
+        # Streamed tool calls: request id -> queue of partial item batches
+        self._partial_queues: Dict[str, asyncio.Queue] = {}
 
     def set_token_counter_hook(self, hook) -> None:
         """Register a callback to record token usage per tool IO locally in the agent.
@@ -84,14 +294,260 @@ class FigmaCommunicator:
     def generate_id(self) -> str:
         """Generate a unique ID for tool calls."""
         return str(uuid.uuid4())
+
+    def _send_nowait(self, payload: Dict[str, Any]) -> None:
+        """Schedule a best-effort websocket send from sync code paths."""
+        try:
+            loop = asyncio.get_running_loop()
+            loop.create_task(self.websocket.send(json.dumps(payload)))
+        except Exception:
+            pass
+
+    @staticmethod
+    def command_priority(command: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Scheduling class for a call; page-wide find_nodes counts as bulk work."""
+        if command == "find_nodes" and not (params or {}).get("scope_node_id"):
+            return PRIORITY_BULK
+        return COMMAND_PRIORITIES.get(command, PRIORITY_NORMAL)
+
+    def _slot_capacity(self, priority: int) -> int:
+        if priority == PRIORITY_INTERACTIVE:
+            return self.max_in_flight + INTERACTIVE_RESERVED_SLOTS
+        return self.max_in_flight
+
+    def _effective_priority(self, entry: Dict[str, Any], now: float) -> float:
+        """Base priority minus one class per PRIORITY_AGING_SECONDS spent waiting."""
+        return entry["priority"] - (now - entry["enqueued_at"]) / PRIORITY_AGING_SECONDS
+
+    async def _acquire_slot(self, command: str, priority: int = PRIORITY_NORMAL) -> float:
+        """Wait for a free in-flight slot. Returns the seconds spent queued."""
+        # Fast path: free capacity and nobody ahead of us (interactive calls may jump the queue)
+        if self._in_flight < self._slot_capacity(priority) and (not self._waiters or priority == PRIORITY_INTERACTIVE):
+            self._in_flight += 1
+            return 0.0
+
+        enqueued_at = time.time()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiter_seq += 1
+        entry = {"future": waiter, "priority": priority, "seq": self._waiter_seq, "enqueued_at": enqueued_at, "command": command}
+        self._waiters.append(entry)
+        logger.info(f"⏳ {command} queued (priority: {priority}, depth: {len(self._waiters)}, in flight: {self._in_flight}/{self.max_in_flight})")
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+            elif waiter.done() and not waiter.cancelled():
+                # A slot was granted just before cancellation; give it back
+                self._release_slot()
+            raise
+
+        waited = time.time() - enqueued_at
+        waited_ms = int(waited * 1000)
+        self._queue_stats["queued_total"] += 1
+        self._queue_stats["total_wait_ms"] += waited_ms
+        self._queue_stats["max_wait_ms"] = max(self._queue_stats["max_wait_ms"], waited_ms)
+        logger.info(f"▶️ {command} dequeued after {waited_ms}ms")
+        return waited
+
+    def _release_slot(self) -> None:
+        """Free a slot, then grant slots to the best-ranked waiters that fit."""
+        self._in_flight = max(0, self._in_flight - 1)
+        while self._waiters:
+            now = time.time()
+            best = min(self._waiters, key=lambda e: (self._effective_priority(e, now), e["seq"]))
+            if best["future"].done():
+                self._waiters.remove(best)
+                continue
+            if self._in_flight >= self._slot_capacity(best["priority"]):
+                break
+            self._waiters.remove(best)
+            self._in_flight += 1
+            best["future"].set_result(None)
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Current window occupancy plus cumulative queue wait statistics."""
+        queued_total = self._queue_stats["queued_total"]
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "queued_total": queued_total,
+            "avg_wait_ms": int(self._queue_stats["total_wait_ms"] / queued_total) if queued_total else 0,
+            "max_wait_ms": self._queue_stats["max_wait_ms"],
+        }
+
+    def send_cancel(self, request_id: str, reason: str = "abandoned") -> None:
+        """Tell the plugin to stop working on an abandoned request (best-effort, non-blocking).
+
+        The plugin honors `tool_cancel` cooperatively: long loops check for it
+        between items, so a page-wide scan or multi-node export stops early
+        instead of blocking the plugin's main thread for the next request.
+        """
+        logger.info(f"🛑 Sending tool_cancel for {request_id} ({reason})")
+        self._send_nowait({"type": "tool_cancel", "id": request_id, "reason": reason})
+
+    @staticmethod
+    def _payload_weight(command: str, params: Optional[Dict[str, Any]]) -> float:
+        """Estimate relative work for a call from payload hints (node count, export scale)."""
+        p = params or {}
+        weight = 1.0
+        node_ids = p.get("node_ids")
+        if isinstance(node_ids, list) and node_ids:
+            weight = float(len(node_ids))
+        elif isinstance(p.get("selector"), dict):
+            # The match count is only known in the plugin; assume a mid-sized bulk edit
+            weight = float(min(p["selector"].get("max_nodes") or SELECTOR_ASSUMED_NODES, SELECTOR_ASSUMED_NODES))
+        if command == "find_nodes" and not p.get("scope_node_id"):
+            # A page-wide search walks far more nodes than a search inside one frame
+            weight = UNSCOPED_SEARCH_WEIGHT
+        elif command == "get_image_of_node":
+            # Raster cost grows with the square of the scale factor (default export is 2x)
+            scale = 2.0
+            settings = p.get("export_settings")
+            constraint = settings.get("constraint") if isinstance(settings, dict) else None
+            if isinstance(constraint, dict) and str(constraint.get("type", "")).upper() == "SCALE":
+                try:
+                    scale = float(constraint.get("value", 2.0))
+                except (TypeError, ValueError):
+                    scale = 2.0
+            weight *= max(0.25, (scale / 2.0) ** 2)
+        elif command == "get_canvas_snapshot" and p.get("include_images"):
+            weight *= 2.0
+        elif command == "apply_edit_plan" and isinstance(p.get("operations"), list):
+            # Each operation is roughly one ordinary mutation round of plugin work
+            weight = float(max(len(p["operations"]), 1))
+        elif command == "set_multiple_text_contents" and isinstance(p.get("replacements"), list):
+            weight = float(max(len(p["replacements"]), 1))
+        elif command == "set_annotations" and isinstance(p.get("annotations"), list):
+            weight = float(max(len(p["annotations"]), 1))
+        elif command == "create_connections" and isinstance(p.get("connections"), list):
+            # Each connection creates up to two nodes
+            weight = float(max(len(p["connections"]), 1)) * 1.5
+        return max(weight, 1.0)
+
+    def resolve_timeout(self, command: str, params: Optional[Dict[str, Any]] = None) -> float:
+        """Return the timeout (seconds) to apply to one call of `command`.
+
+        Cold start uses the per-command baseline scaled sub-linearly by payload weight.
+        With enough samples, the timeout becomes
+        percentile(round_trip / weight) * weight * multiplier, floored at a fraction
+        of the baseline. Timed-out calls count as samples at their timeout, so the
+        estimate grows after a cancellation. Always clamped to [min_timeout, max_timeout].
+        """
+        if not self.adaptive_timeouts:
+            return self.timeout
+
+        weight = self._payload_weight(command, params)
+        history = self.timing_history.get(command) or ()
+        per_unit = sorted(
+            r["round_trip_ms"] / 1000.0 / max(r.get("weight", 1.0), 1.0)
+            for r in history if r.get("ok") or r.get("timed_out")
+        )
+        baseline = COMMAND_TIMEOUT_BASELINES.get(command, self.timeout)
+        if len(per_unit) >= ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            idx = min(len(per_unit) - 1, int(round(ADAPTIVE_TIMEOUT_PERCENTILE * (len(per_unit) - 1))))
+            resolved = per_unit[idx] * weight * ADAPTIVE_TIMEOUT_MULTIPLIER
+            resolved = max(resolved, baseline * ADAPTIVE_TIMEOUT_BASELINE_FLOOR)
+        else:
+            resolved = baseline * (weight ** 0.5)
+        return min(self.max_timeout, max(self.min_timeout, resolved))
+
+    def _record_timing(self, request_id: str, command: Optional[str], elapsed: float, timings: Any, ok: bool,
+                       weight: float = 1.0, queue_wait_ms: int = 0, timed_out: bool = False) -> Dict[str, Any]:
+        """Combine the backend-observed round trip with plugin-reported execution timings.
+
+        The plugin reports `exec_ms` (handler wall time) and named sub-phases such as
+        `json_rest_export`, `png_export` or `find_all`. Transit time is whatever the
+        round trip spent outside plugin execution (bridge, UI relay, serialization).
+        """
+        round_trip_ms = int(elapsed * 1000)
+        record: Dict[str, Any] = {
+            "id": request_id,
+            "command": command,
+            "ok": ok,
+            "timed_out": timed_out,
+            "round_trip_ms": round_trip_ms,
+            "weight": weight,
+            "queue_wait_ms": queue_wait_ms,
+            "plugin_exec_ms": None,
+            "transit_ms": None,
+            "phases": {},
+            "recorded_at": time.time(),
+        }
+        if isinstance(timings, dict):
+            exec_ms = timings.get("exec_ms")
+            if isinstance(exec_ms, (int, float)):
+                record["plugin_exec_ms"] = int(exec_ms)
+                record["transit_ms"] = max(0, round_trip_ms - int(exec_ms))
+            if isinstance(timings.get("phases"), dict):
+                record["phases"] = timings.get("phases")
+            if isinstance(timings.get("ui_relay_ms"), (int, float)):
+                record["ui_relay_ms"] = int(timings.get("ui_relay_ms"))
+
+        history = self.timing_history.setdefault(command or "<unknown>", deque(maxlen=TIMING_HISTORY_SIZE))
+        history.append(record)
+
+        logger.info(
+            f"⏱️ {command} timing: round_trip={round_trip_ms}ms plugin_exec={record['plugin_exec_ms']}ms "
+            f"transit={record['transit_ms']}ms phases={record['phases']}"
+        )
+        self._send_nowait({
+            "type": "progress_update",
+            "message": {
+                "kind": "tool_timing",
+                "turn_id": self.current_turn_id,
+                "tool": {"command": command, "id": request_id},
+                "timing": record,
+            }
+        })
+        return record
+
+    def get_timing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Summarize recorded timings per command (averages over the retained window)."""
+        stats: Dict[str, Dict[str, Any]] = {}
+        for command, history in self.timing_history.items():
+            records = list(history)
+            if not records:
+                continue
+            exec_samples = [r["plugin_exec_ms"] for r in records if r.get("plugin_exec_ms") is not None]
+            transit_samples = [r["transit_ms"] for r in records if r.get("transit_ms") is not None]
+            stats[command] = {
+                "count": len(records),
+                "avg_round_trip_ms": int(sum(r["round_trip_ms"] for r in records) / len(records)),
+                "avg_plugin_exec_ms": int(sum(exec_samples) / len(exec_samples)) if exec_samples else None,
+                "avg_transit_ms": int(sum(transit_samples) / len(transit_samples)) if transit_samples else None,
+            }
+        return stats
     
-    async def send_command(self, command: str, params: Dict[str, Any] = None) -> Any:
+    def set_reveal_policy(self, policy: str) -> str:
+        """Change the session reveal policy. Returns the previous one."""
+        if policy not in REVEAL_POLICIES:
+            raise ValueError(f"Unknown reveal policy: {policy}")
+        previous, self.reveal_policy = self.reveal_policy, policy
+        return previous
+
+    async def flush_reveal(self) -> Any:
+        """Reveal the nodes deferred under "end_of_turn"; no round-trip when nothing is pending."""
+        if not self._reveal_pending:
+            return None
+        self._reveal_pending = False
+        return await self.send_command("flush_reveal", {}, reveal="never")
+
+    async def send_command(self, command: str, params: Dict[str, Any] = None, request_id: Optional[str] = None,
+                           reveal: Optional[str] = None) -> Any:
         """
         Send a command to the Figma plugin and wait for the response.
+
+        Calls beyond `max_in_flight` wait in a local queue ordered by priority class
+        (interactive < normal < bulk, with aging); the timeout only starts once the
+        call is actually sent.
         
         Args:
             command: The command name (e.g., "create_frame")
             params: Optional parameters for the command
+            request_id: Optional preassigned id (used by streamed calls)
+            reveal: Optional per-call reveal policy overriding `reveal_policy`
             
         Returns:
             The result from the plugin
@@ -102,11 +558,41 @@ class FigmaCommunicator:
         """
         if not self.websocket:
             raise RuntimeError("WebSocket connection not available")
+
+        if self.scene_index is not None:
+            local = self.scene_index.lookup(command, params)
+            if local is not None:
+                logger.info(f"🗂️ Served {command} from scene index")
+                return local
+
+        policy = reveal if reveal in REVEAL_POLICIES else self.reveal_policy
+        queue_wait = await self._acquire_slot(command, self.command_priority(command, params))
+        try:
+            result = await self._dispatch_command(command, params, queue_wait, request_id=request_id, reveal=policy)
+        except ToolExecutionError as e:
+            if self.scene_index is not None and e.code == "node_not_found":
+                ids = [(params or {}).get("node_id")] + list((params or {}).get("node_ids") or [])
+                self.scene_index.forget([i for i in ids if i])
+            raise
+        finally:
+            self._release_slot()
+        if policy == "end_of_turn":
+            self._reveal_pending = True
+        if self.scene_index is not None:
+            self.scene_index.ingest(command, params, result)
+        return result
+
+    async def _dispatch_command(self, command: str, params: Dict[str, Any] = None, queue_wait: float = 0.0,
+                                request_id: Optional[str] = None, reveal: Optional[str] = None) -> Any:
+        """Send one tool_call (slot already held) and await its tool_response."""
+        if not self.websocket:
+            raise RuntimeError("WebSocket connection not available")
         
         # Single-version mode: no Phase guardrails; allow all commands and rely on tool errors
         
         # Generate unique ID for this request
-        request_id = self.generate_id()
+        request_id = request_id or self.generate_id()
+        timeout = self.resolve_timeout(command, params)
         
         # Create the tool_call message
         tool_call_message = {
@@ -115,12 +601,14 @@ class FigmaCommunicator:
             "command": command,
             "params": params or {}
         }
+        if reveal and reveal != "always":
+            tool_call_message["options"] = {"reveal": reveal}
         
         # Create a future to track this request
         future = asyncio.Future()
         self.pending_requests[request_id] = future
         self.request_timestamps[request_id] = time.time()  # Record start time
-        self.request_meta[request_id] = {"command": command, "params": params or {}}
+        self.request_meta[request_id] = {"command": command, "params": params or {}, "queue_wait_ms": int(queue_wait * 1000)}
         
         logger.debug(f"📝 Added to pending requests: {request_id}")
         logger.debug(f"📝 Total pending requests: {len(self.pending_requests)}")
@@ -130,13 +618,13 @@ class FigmaCommunicator:
             try:
                 await self.websocket.send(json.dumps({
                     "type": "progress_update",
-                    "message": {"phase": 3, "status": "tool_called", "message": f"🛠️ {command}", "data": {"command": command, "id": request_id}}
+                    "message": {"phase": 3, "status": "tool_called", "message": f"🛠️ {command}", "data": {"command": command, "id": request_id, "queue_wait_ms": int(queue_wait * 1000), "queue_depth": len(self._waiters)}}
                 }))
             except Exception:
                 pass
             # Send the message
             start_time = time.time()
-            logger.info(f"🚀 Sending tool_call: {command} with ID: {request_id} at {start_time:.3f}")
+            logger.info(f"🚀 Sending tool_call: {command} with ID: {request_id} at {start_time:.3f} (timeout: {timeout:.1f}s)")
             logger.debug(f"🚀 Tool call payload: {json.dumps(tool_call_message)}")
             await self.websocket.send(json.dumps(tool_call_message))
 
@@ -164,7 +652,7 @@ class FigmaCommunicator:
                 pass
             
             # Wait for the response with timeout
-            result = await asyncio.wait_for(future, timeout=self.timeout)
+            result = await asyncio.wait_for(future, timeout=timeout)
             # Emit progress update: step_succeeded
             try:
                 await self.websocket.send(json.dumps({
@@ -176,20 +664,34 @@ class FigmaCommunicator:
             return result
             
         except asyncio.TimeoutError:
-            # Clean up the pending request
+            # Clean up the pending request and stop the plugin from finishing abandoned work
             self.pending_requests.pop(request_id, None)
             start_time = self.request_timestamps.pop(request_id, None)
             self.request_meta.pop(request_id, None)
-            elapsed = time.time() - start_time if start_time else self.timeout
-            logger.error(f"⏰ Tool call {command} (ID: {request_id}) timed out after {elapsed:.3f}s (limit: {self.timeout}s)")
+            self.send_cancel(request_id, reason="timeout")
+            elapsed = time.time() - start_time if start_time else timeout
+            self._record_timing(request_id, command, elapsed, None, False,
+                                weight=self._payload_weight(command, params),
+                                queue_wait_ms=int(queue_wait * 1000), timed_out=True)
+            logger.error(f"⏰ Tool call {command} (ID: {request_id}) timed out after {elapsed:.3f}s (limit: {timeout:.1f}s)")
             try:
                 await self.websocket.send(json.dumps({
                     "type": "progress_update",
-                    "message": {"phase": 3, "status": "step_failed", "message": f"❗ {command} timed out", "data": {"command": command, "id": request_id, "elapsed_ms": int(elapsed*1000)}}
+                    "message": {"phase": 3, "status": "step_failed", "message": f"❗ {command} timed out", "data": {"command": command, "id": request_id, "elapsed_ms": int(elapsed*1000), "timeout_ms": int(timeout*1000)}}
                 }))
             except Exception:
                 pass
             raise asyncio.TimeoutError(f"Tool call '{command}' timed out after {elapsed:.1f} seconds")
+
+        except asyncio.CancelledError:
+            # The awaiting task was cancelled (e.g. the turn was abandoned). If the request
+            # is still tracked here, nobody else has told the plugin yet.
+            if self.pending_requests.pop(request_id, None) is not None:
+                self.send_cancel(request_id, reason="caller_cancelled")
+            self.request_timestamps.pop(request_id, None)
+            self.request_meta.pop(request_id, None)
+            logger.info(f"🛑 Tool call {command} (ID: {request_id}) cancelled by caller")
+            raise
             
         except Exception as e:
             # Clean up the pending request
@@ -206,6 +708,31 @@ class FigmaCommunicator:
                 pass
             raise
     
+    def stream_command(self, command: str, params: Dict[str, Any] = None) -> CommandStream:
+        """Start a streamed tool call; see `CommandStream` for usage."""
+        return CommandStream(self, command, params)
+
+    def transaction(self, reveal: Optional[str] = None) -> EditTransaction:
+        """Begin an atomic batch of mutations; see `EditTransaction` for usage."""
+        return EditTransaction(self, reveal=reveal)
+
+    async def run_transaction(self, operations: List[Dict[str, Any]], reveal: Optional[str] = None) -> Any:
+        """Single-shot form of `transaction()`: apply `operations` atomically."""
+        tx = self.transaction(reveal=reveal)
+        for operation in operations:
+            tx.add(operation.get("command"), operation.get("params"), operation.get("ref"))
+        return await tx.commit()
+
+    def handle_tool_partial(self, message: Dict[str, Any]) -> None:
+        """Route a `tool_partial` batch to the stream awaiting it."""
+        request_id = message.get("id")
+        queue = self._partial_queues.get(request_id)
+        if queue is None:
+            logger.debug(f"⚠️ tool_partial for unknown or closed stream: {request_id}")
+            return
+        items = message.get("items")
+        queue.put_nowait(items if isinstance(items, list) else [])
+
     def handle_tool_response(self, message: Dict[str, Any]) -> None:
         """
         Handle incoming tool_response messages from the plugin.
@@ -240,6 +767,10 @@ class FigmaCommunicator:
         
         # Calculate elapsed time
         elapsed = time.time() - start_time if start_time else 0
+        ok = "error_structured" not in message and "error" not in message
+        self._record_timing(request_id, cmd, elapsed, message.get("timings"), ok,
+                            weight=self._payload_weight(cmd or "", params),
+                            queue_wait_ms=int(meta.get("queue_wait_ms", 0)) if isinstance(meta, dict) else 0)
         
         # Check if the response contains an error or an explicit failure result
         if "error_structured" in message and isinstance(message.get("error_structured"), dict):
@@ -324,14 +855,22 @@ class FigmaCommunicator:
         else:
             logger.debug(f"⚠️ Future already completed for {request_id}")
     
-    def cleanup_pending_requests(self) -> None:
-        """Cancel all pending requests (called on shutdown)."""
+    def cleanup_pending_requests(self, reason: str = "cleanup") -> None:
+        """Cancel all pending requests and notify the plugin for each abandoned id."""
         for request_id, future in self.pending_requests.items():
+            self.send_cancel(request_id, reason=reason)
             if not future.cancelled():
                 future.cancel()
                 logger.info(f"Cancelled pending request: {request_id}")
         self.pending_requests.clear()
         self.request_timestamps.clear()
+        self.request_meta.clear()
+        self._partial_queues.clear()
+        # Calls still waiting for a slot were never sent; drop them too
+        waiters, self._waiters = self._waiters, []
+        for entry in waiters:
+            if not entry["future"].done():
+                entry["future"].cancel()
 
 
 # Global communicator instance (will be set by main.py)
@@ -348,16 +887,43 @@ def get_communicator() -> FigmaCommunicator:
         raise RuntimeError("Communicator not initialized. Call set_communicator() first.")
     return _communicator
 
-async def send_command(command: str, params: Dict[str, Any] = None) -> Any:
+async def send_command(command: str, params: Dict[str, Any] = None, reveal: Optional[str] = None) -> Any:
     """
     Convenience function to send a command using the global communicator.
     
     Args:
         command: The command name
         params: Optional parameters
+        reveal: Optional per-call reveal policy (see REVEAL_POLICIES)
         
     Returns:
         The result from the plugin
     """
     communicator = get_communicator()
-    return await communicator.send_command(command, params)
+    return await communicator.send_command(command, params, reveal=reveal)
+
+def stream_command(command: str, params: Dict[str, Any] = None) -> CommandStream:
+    """
+    Convenience function to stream a command using the global communicator.
+
+    Args:
+        command: The command name
+        params: Optional parameters
+
+    Returns:
+        A CommandStream to use with `async with` / `async for`
+    """
+    return get_communicator().stream_command(command, params)
+
+async def run_transaction(operations: List[Dict[str, Any]], reveal: Optional[str] = None) -> Any:
+    """
+    Convenience function to apply operations atomically using the global communicator.
+
+    Args:
+        operations: Ordered [{command, params?, ref?}] entries (see `EditTransaction`)
+        reveal: Optional per-call reveal policy (see REVEAL_POLICIES)
+
+    Returns:
+        The apply_edit_plan result from the plugin
+    """
+    return await get_communicator().run_transaction(operations, reveal=reveal)
@@ -13,7 +13,9 @@ import json
 from typing import Optional, List, Any, Dict, Literal
 from pydantic import BaseModel, ConfigDict
 from agents import function_tool
-from figma_communicator import send_command, ToolExecutionError
+from figma_communicator import send_command, stream_command, run_transaction, get_communicator, ToolExecutionError
+from conversation import ToolOutputCompactor
+from tool_guides import get_guide, guide_names
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +24,23 @@ logger = logging.getLogger(__name__)
 # ============ INTERNAL HELPERS ==============
 # ============================================
 
-def _to_json_string(result: Any) -> str:
-    """Convert plugin result to a JSON string for model reasoning."""
+_output_compactor = ToolOutputCompactor.from_env()
+
+
+def _to_json_string(result: Any, tool_name: Optional[str] = None) -> str:
+    """Convert plugin result to a JSON string for model reasoning.
+
+    Structured results are first compacted to the tool's token budget
+    (see `ToolOutputCompactor`); elisions are listed under `_compaction`.
+    """
     try:
         if isinstance(result, str):
             # Assume plugin already returned a JSON/string payload
             return result
+        try:
+            result = _output_compactor.compact(result, tool_name)
+        except Exception as e:
+            logger.warning(f"⚠️ Tool output compaction failed for {tool_name}: {e}")
         return json.dumps(result, ensure_ascii=False)
     except Exception:
         # Fallback: wrap as string field
@@ -41,6 +54,85 @@ def _sanitize_color_value(value: float, default: float = 0.0) -> float:
     except (ValueError, TypeError):
         return default
 
+def _normalize_find_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize find_nodes-style filters (aliases, coercions) to the bridge/plugin schema."""
+    allowed_filter_keys = {"name_regex", "text_regex", "node_types", "main_component_id", "style_id"}
+    normalized_filters: Dict[str, Any] = {}
+    removed_keys: List[str] = []
+
+    if isinstance(filters, dict):
+        temp = dict(filters)
+
+        # Map common alias 'characters' -> 'text_regex'
+        if "characters" in temp and "text_regex" not in temp:
+            try:
+                temp["text_regex"] = str(temp.get("characters", ""))
+            except Exception:
+                # Best-effort; if conversion fails, drop alias
+                pass
+            finally:
+                temp.pop("characters", None)
+
+        # Coerce node_types to array if a single string was provided
+        if isinstance(temp.get("node_types"), str):
+            temp["node_types"] = [temp["node_types"]]
+
+        # Keep only allowed keys; record removed ones for observability
+        for k, v in temp.items():
+            if k in allowed_filter_keys:
+                normalized_filters[k] = v
+            else:
+                removed_keys.append(k)
+
+    if removed_keys:
+        logger.info(
+            "🧹 Normalized find_nodes filters",
+            {"code": "normalized_find_nodes_filters", "removed_keys": removed_keys}
+        )
+    return normalized_filters
+
+# Id lists longer than this are cut to a sample in selector-driven results
+SELECTOR_ID_SAMPLE = 10
+
+def _node_targets(command: str, node_ids: Optional[List[str]], selector: Any) -> Dict[str, Any]:
+    """Return the target params of a bulk mutation: `node_ids`, or a normalized `selector`."""
+    if selector is None:
+        if not isinstance(node_ids, list) or len(node_ids) == 0:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide a non-empty node_ids array or a selector", "details": {"command": command, "node_ids": node_ids}})
+        return {"node_ids": node_ids}
+    if node_ids:
+        raise ToolExecutionError({"code": "invalid_parameter", "message": "Provide either node_ids or selector, not both", "details": {"command": command}})
+    raw = selector.model_dump(exclude_none=True) if isinstance(selector, BaseModel) else dict(selector or {})
+    filters = _normalize_find_filters(raw.get("filters"))
+    scope_node_id = raw.get("scope_node_id")
+    if not filters and not scope_node_id:
+        raise ToolExecutionError({"code": "invalid_parameter", "message": "selector needs at least one filter or a scope_node_id", "details": {"command": command, "selector": raw}})
+    out: Dict[str, Any] = {"filters": filters}
+    if scope_node_id:
+        out["scope_node_id"] = scope_node_id
+    if raw.get("max_nodes") is not None:
+        out["max_nodes"] = max(1, min(5000, int(raw["max_nodes"])))
+    return {"selector": out}
+
+def _target_count(targets: Dict[str, Any]) -> Any:
+    """Node count for log lines; selector targets are only known to the plugin."""
+    return len(targets["node_ids"]) if "node_ids" in targets else "selector"
+
+def _selector_output(result: Any, selector: Any) -> Any:
+    """Cut the id lists of a selector-driven result to a sample plus a `*_count`.
+
+    The point of a selector is that matched ids never travel through the model;
+    the full result has already reached the scene index by the time this runs.
+    """
+    if selector is None or not isinstance(result, dict):
+        return result
+    out = dict(result)
+    for key, value in result.items():
+        if key.endswith("_node_ids") and isinstance(value, list) and len(value) > SELECTOR_ID_SAMPLE:
+            out[key] = value[:SELECTOR_ID_SAMPLE]
+            out[f"{key[:-len('_ids')]}_count"] = len(value)
+    return out
+
 
 # ============================================
 # == PYDANTIC MODELS FOR COMPLEX PARAMETERS ==
@@ -82,6 +174,25 @@ class FontName(BaseModel):
     family: str
     style: str
 
+class EditPlanOperation(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    command: str
+    params: Optional[Dict[str, Any]] = None
+    ref: Optional[str] = None
+
+class NodeSelector(BaseModel):
+    """Targets every match of a find_nodes query instead of an explicit `node_ids` list.
+
+    The plugin resolves the query in place, so matched ids never travel through
+    the model; results report `*_count` plus a sample of ids. `filters` takes the
+    find_nodes filter shape, `scope_node_id` limits the search to one subtree
+    (default: the current page) and `max_nodes` caps the match count (default
+    1000, max 5000; a broader match fails with `selector_too_broad`).
+    """
+    filters: Dict[str, Any]
+    scope_node_id: Optional[str] = None
+    max_nodes: Optional[int] = None
+
 
 # ============================================
 # ===============  TOOLS  ====================
@@ -92,7 +203,7 @@ class FontName(BaseModel):
 # ============================================
 
 @function_tool
-async def get_canvas_snapshot(include_images: bool = False) -> str:
+async def get_canvas_snapshot(include_images: bool = False, fields: Optional[List[str]] = None) -> str:
     """Return a compact snapshot of the current page and selection.
 
     Purpose & Use Case
@@ -110,6 +221,10 @@ async def get_canvas_snapshot(include_images: bool = False) -> str:
     include_images (bool, optional): If True, the plugin will attempt to export
         a low-resolution PNG image of each selected node (up to a small limit)
         and include it as a Base64-encoded string in the response. Defaults to False.
+    fields (List[str], optional): Projection for the node summaries in `selection`
+        and `root_nodes_on_page` (e.g. ["id", "name", "type"]). Only the requested
+        keys are computed; `id` is always included. When set, `selection_summary`
+        is only built if "selection_summary" is listed. Defaults to the full shape.
 
     Returns
     -------
@@ -156,9 +271,12 @@ async def get_canvas_snapshot(include_images: bool = False) -> str:
     4. Agent proceeds to call `set_fills` on the node IDs from the snapshot.
     """
     try:
-        logger.info(f"🧭 Getting canvas snapshot (include_images={include_images})")
-        result = await send_command("get_canvas_snapshot", {"include_images": include_images})
-        return _to_json_string(result)
+        logger.info(f"🧭 Getting canvas snapshot (include_images={include_images}, fields={fields})")
+        params: Dict[str, Any] = {"include_images": include_images}
+        if fields:
+            params["fields"] = list(fields)
+        result = await send_command("get_canvas_snapshot", params)
+        return _to_json_string(result, "get_canvas_snapshot")
     except ToolExecutionError as te:
         logger.error(f"❌ Tool get_canvas_snapshot failed: {getattr(te, 'message', str(te))}")
         # Re-raise structured tool error for agent self-correction
@@ -177,7 +295,16 @@ async def get_canvas_snapshot(include_images: bool = False) -> str:
 # ============================================
 
 @function_tool(strict_mode=False)
-async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Optional[str] = None, highlight_results: Optional[bool] = None) -> str:
+async def find_nodes(
+    filters: Optional[Dict[str, Any]] = None,
+    scope_node_id: Optional[str] = None,
+    highlight_results: Optional[bool] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    stop_at_limit: bool = False,
+) -> str:
     """Find nodes matching flexible filters within a specified scope.
 
     Purpose & Use Case
@@ -200,21 +327,47 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
           of a TEXT node (`node.characters`). The plugin will only test this
           regex against nodes of type "TEXT".
         - `main_component_id` (str): The ID of a main component to find all its
-          instances. The plugin will only test this against INSTANCE nodes.
+          instances. Served from the plugin's page component -> instances
+          index (no traversal).
         - `style_id` (str): The ID of a style (e.g., fill, stroke, text, effect)
-          to find all nodes that consume it.
+          to find all nodes that consume it. Served from the plugin's page
+          style index (no traversal), so it is cheap even on large pages.
     scope_node_id (str, optional): The ID of a node to search within. If omitted,
         the search is performed on the entire current page. Scoping searches is
         highly recommended for performance.
     highlight_results (bool, optional): If True, the plugin will briefly
         highlight the found nodes on the canvas to provide visual feedback to
         the user. Defaults to False.
+    limit (int, optional): Maximum number of matches returned in this page
+        (1-1000). Defaults to 100.
+    offset (int, optional): Index of the first match to return. Defaults to 0,
+        or to the position encoded in `cursor` when one is given.
+    cursor (str, optional): The `next_cursor` value from a previous call. The
+        plugin serves the next page from the stored match list without
+        searching the document again; `filters` and `scope_node_id` are ignored.
+    fields (List[str], optional): Projection for each returned summary. Accepts
+        the RichNodeSummary keys (`name`, `type`, `absolute_bounding_box`,
+        `auto_layout_mode`, `has_children`) plus `visible`, `locked`, `opacity`,
+        `parent_id` and `characters` (TEXT only). `id` is always included.
+        Defaults to the full RichNodeSummary.
+    stop_at_limit (bool, optional): Stop searching as soon as `limit` matches
+        are found (document order). The plugin streams matches while it walks
+        the scope, so large scopes answer in a fraction of the time. The total
+        is not computed: `total_count` is null when the search stopped early,
+        and no cursor is returned. Ignored with `cursor`/`offset`. Defaults to
+        False.
 
     Returns
     -------
-    (str): A JSON string containing a single key, "matching_nodes", which holds
-        an array of `RichNodeSummary` objects for each node that matched the
-        filters.
+    (str): A JSON string with:
+        - `matching_nodes`: `RichNodeSummary` objects for this page of matches.
+        - `total_count`: Total number of matches for the search.
+        - `offset` / `limit`: The window that was returned.
+        - `has_more`: True when more matches exist beyond this page.
+        - `next_cursor`: Pass back as `cursor` to fetch the next page (null when
+          there are no more matches).
+        - `stopped_early` (only with `stop_at_limit`): True when the search
+          ended at `limit` before covering the whole scope.
 
     Raises (Errors & Pitfalls)
     --------------------------
@@ -222,6 +375,8 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
     errors. Known error codes include:
       - `invalid_regex`: The `name_regex` or `text_regex` provided is invalid.
       - `scope_not_found`: The `scope_node_id` does not exist in the document.
+      - `cursor_expired`: The cursor is unknown or older than 5 minutes; re-run
+        the search without a cursor.
       - `invalid_scope`: The node specified by `scope_node_id` does not support
         searching (e.g., it's a primitive shape).
       - `unknown_plugin_error`: A general failure occurred inside the plugin.
@@ -240,6 +395,10 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
           user's selection or a relevant container.
         - For fetching deep, authoritative details of a known node, use
           `get_node_details` instead.
+        - Check `total_count` before paging; only follow `next_cursor` when the
+          task really needs every match.
+        - When you only need the first few hits (e.g. "find a Submit button"),
+          pass a small `limit` with `stop_at_limit: true`.
 
     Examples
     --------
@@ -251,42 +410,13 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
       `{"filters": {"style_id": "S:12345..."}, "highlight_results": true}`
     - Find all frames whose names start with "Card-":
       `{"filters": {"node_types": ["FRAME"], "name_regex": "^Card-"}}`
+    - Fetch the next page of a previous search:
+      `{"cursor": "fn3:100"}`
+    - First 5 TEXT nodes on the page mentioning "Pricing":
+      `{"filters": {"node_types": ["TEXT"], "text_regex": "Pricing"}, "limit": 5, "stop_at_limit": true}`
     """
     try:
-        # Normalize filters to match bridge/plugin schema and avoid unrecognized_keys errors
-        allowed_filter_keys = {"name_regex", "text_regex", "node_types", "main_component_id", "style_id"}
-        normalized_filters: Dict[str, Any] = {}
-        removed_keys: List[str] = []
-
-        if isinstance(filters, dict):
-            temp = dict(filters)
-
-            # Map common alias 'characters' -> 'text_regex'
-            if "characters" in temp and "text_regex" not in temp:
-                try:
-                    temp["text_regex"] = str(temp.get("characters", ""))
-                except Exception:
-                    # Best-effort; if conversion fails, drop alias
-                    pass
-                finally:
-                    temp.pop("characters", None)
-
-            # Coerce node_types to array if a single string was provided
-            if isinstance(temp.get("node_types"), str):
-                temp["node_types"] = [temp["node_types"]]
-
-            # Keep only allowed keys; record removed ones for observability
-            for k, v in temp.items():
-                if k in allowed_filter_keys:
-                    normalized_filters[k] = v
-                else:
-                    removed_keys.append(k)
-
-        if removed_keys:
-            logger.info(
-                "🧹 Normalized find_nodes filters",
-                {"code": "normalized_find_nodes_filters", "removed_keys": removed_keys}
-            )
+        normalized_filters = _normalize_find_filters(filters)
 
         logger.info("🔎 Calling find_nodes", {"filters": normalized_filters or filters, "scope_node_id": scope_node_id})
         params: Dict[str, Any] = {"filters": normalized_filters if normalized_filters else (filters or {})}
@@ -294,8 +424,18 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
             params["scope_node_id"] = scope_node_id
         if highlight_results is not None:
             params["highlight_results"] = bool(highlight_results)
+        if limit is not None:
+            params["limit"] = max(1, min(1000, int(limit)))
+        if offset is not None:
+            params["offset"] = max(0, int(offset))
+        if cursor:
+            params["cursor"] = str(cursor)
+        if fields:
+            params["fields"] = list(fields)
+        if stop_at_limit and not cursor and offset is None:
+            return _to_json_string(await _stream_find_nodes(params), "find_nodes")
         result = await send_command("find_nodes", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "find_nodes")
     except ToolExecutionError:
         # Preserve structured tool errors for the agent to handle
         logger.error("❌ Tool find_nodes raised ToolExecutionError")
@@ -305,8 +445,42 @@ async def find_nodes(filters: Optional[Dict[str, Any]] = None, scope_node_id: Op
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call find_nodes: {str(e)}", "details": {"command": "find_nodes"}})
 
 
+async def _stream_find_nodes(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect streamed find_nodes batches, closing the stream once `limit` is reached."""
+    limit = params.get("limit") or 100
+    matches: List[Any] = []
+    async with stream_command("find_nodes", {**params, "stream": True}) as stream:
+        async for items in stream:
+            matches.extend(items)
+            if len(matches) >= limit:
+                break
+    final = stream.result if isinstance(stream.result, dict) else {}
+    if stream.completed and not final.get("streamed"):
+        # Index-served queries (style_id / main_component_id on the current page)
+        # ignore `stream` and return a regular paged result
+        result = dict(final)
+        page = result.get("matching_nodes")
+        if isinstance(page, list) and len(page) > limit:
+            result["matching_nodes"] = page[:limit]
+            result["has_more"] = True
+        logger.info(f"🌊 find_nodes answered without streaming: {len(result.get('matching_nodes') or [])} match(es)")
+        return result
+    stopped_early = not stream.completed or bool(final.get("has_more"))
+    if len(matches) > limit:
+        matches = matches[:limit]
+    logger.info(f"🌊 find_nodes streamed {len(matches)} match(es) in {stream.batches} batch(es) (stopped_early={stopped_early})")
+    return {
+        "matching_nodes": matches,
+        "total_count": None if stopped_early else len(matches),
+        "limit": limit,
+        "has_more": stopped_early,
+        "stopped_early": stopped_early,
+        "next_cursor": None,
+    }
+
+
 @function_tool
-async def get_node_details(node_ids: List[str]) -> str:
+async def get_node_details(node_ids: List[str], fields: Optional[List[str]] = None, include_image: bool = False) -> str:
     """Fetch deep, authoritative details for one or more nodes.
     Purpose & Use Case
     --------------------
@@ -319,9 +493,20 @@ async def get_node_details(node_ids: List[str]) -> str:
     ------------------
     node_ids (List[str]): A non-empty list of node IDs to inspect. It is
         recommended to keep the list short (1-5 nodes) to manage payload size.
+    fields (List[str], optional): Projection for the result. Names refer to
+        `target_node` keys (e.g. ["name", "fills", "auto_layout"]; use
+        "style_ids" for all applied style ids) plus the blocks
+        "parent_summary" and "children_summaries". Unrequested data is never
+        computed: the costly REST export only runs when `fills`,
+        `corner_radius`, `absolute_bounding_box`, `characters`, `style` or
+        `children` is requested. Defaults to the full shape.
+    include_image (bool, optional): When True, also export a 2x PNG preview of
+        each node. Defaults to False because the export is the slowest part of
+        inspection. Images are attached to your next turn as real image input,
+        not returned as text.
     Returns
     -------
-    (str): A JSON string with a single top-level key, "details". This key
+    (str): A JSON string with a top-level key, "details". This key
         contains a dictionary mapping each requested node ID to an object with:
         - `target_node` (dict): A rich data model of the node itself. This
           model combines properties from the Figma Plugin API with an exported
@@ -336,12 +521,13 @@ async def get_node_details(node_ids: List[str]) -> str:
             - `text_meta` (for TEXT nodes, content and typography)
             - `bound_variables` (if any variables are bound)
             - ... and many other properties depending on the node type.
-        - `exported_image` (str | None): A Base64-encoded PNG image of the
-          node, providing a visual preview.
         - `parent_summary` (RichNodeSummary | None): A summary of the node's
           immediate parent, or null if it's a top-level node.
         - `children_summaries` (List[RichNodeSummary]): A list of summaries for
           the node's direct children.
+        When `include_image` is True, a top-level `images` map (node ID ->
+        Base64 PNG) is also returned; the backend routes it to the model as
+        image input.
     Raises (Errors & Pitfalls)
     --------------------------
     ToolExecutionError: Propagated unchanged for plugin-side structured failures.
@@ -368,14 +554,22 @@ async def get_node_details(node_ids: List[str]) -> str:
           is for deep inspection, not discovery.
         - Avoid requesting a large number of nodes at once, as the returned
           payload can be very large and may exceed token limits.
+        - When you only need a few properties, pass `fields`; it is much faster
+          and keeps the output small.
+        - Leave `include_image` off unless you need to see the node; prefer
+          `get_image_of_node` for purely visual checks.
     """
     try:
         if not isinstance(node_ids, list) or len(node_ids) == 0:
             raise ToolExecutionError({"code": "missing_parameter", "message": "'node_ids' must be a non-empty list", "details": {"node_ids": node_ids}})
         logger.info("🔍 Calling get_node_details", {"node_ids": node_ids})
-        params = {"node_ids": node_ids}
+        params: Dict[str, Any] = {"node_ids": node_ids}
+        if fields:
+            params["fields"] = list(fields)
+        if include_image:
+            params["include_image"] = True
         result = await send_command("get_node_details", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "get_node_details")
     except ToolExecutionError:
         logger.error("❌ Tool get_node_details raised ToolExecutionError")
         raise
@@ -465,7 +659,7 @@ async def get_image_of_node(node_ids: List[str], export_settings: Optional[Dict[
         if export_settings is not None:
             params["export_settings"] = export_settings
         result = await send_command("get_image_of_node", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "get_image_of_node")
     except ToolExecutionError:
         logger.error("❌ Tool get_image_of_node raised ToolExecutionError")
         raise
@@ -554,7 +748,7 @@ async def get_node_ancestry(node_id: str) -> str:
         logger.info(f"🧭 Getting ancestry for node {node_id}")
         # Pass snake_case params to the plugin boundary (plugin expects snake_case keys)
         result = await send_command("get_node_ancestry", {"node_id": node_id})
-        return _to_json_string(result)
+        return _to_json_string(result, "get_node_ancestry")
     except ToolExecutionError as te:
         # Propagate structured tool errors unchanged so the agent core can react
         raise te
@@ -601,7 +795,7 @@ async def get_node_hierarchy(node_id: str) -> str:
     try:
         logger.info(f"🌳 Getting hierarchy for node {node_id}")
         result = await send_command("get_node_hierarchy", {"node_id": node_id})
-        return _to_json_string(result)
+        return _to_json_string(result, "get_node_hierarchy")
     except ToolExecutionError as te:
         raise te
     except Exception as e:
@@ -687,7 +881,7 @@ async def get_document_styles(style_types: Optional[List[str]] = None) -> str:
         # map to plugin-facing snake_case key (plugin accepts snake_case parameters)
         params = {"style_types": style_types} if style_types is not None else {}
         result = await send_command("get_document_styles", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "get_document_styles")
     except ToolExecutionError as te:
         raise te
     except Exception as e:
@@ -700,8 +894,8 @@ async def get_document_styles(style_types: Optional[List[str]] = None) -> str:
 
 
 @function_tool
-async def get_style_consumers(style_id: str) -> str:
-    """Find all nodes on the current page that consume the specified style.
+async def get_style_consumers(style_id: str, scope: Literal["page", "document"] = "document") -> str:
+    """Find all nodes that consume the specified style (whole document by default).
 
     Purpose & Use Case
     --------------------
@@ -712,13 +906,19 @@ async def get_style_consumers(style_id: str) -> str:
     - Identifying nodes that will be affected by style changes
     - Auditing style consumption for design system maintenance
 
-    The tool uses the Figma Plugins API's Style API for accurate detection, with
-    a fallback method that scans all nodes on the current page.
+    Document scope (the default) uses the Figma Style API, which covers every
+    page without a traversal; when that API is unavailable the current page's
+    style index is used instead. Page scope is answered from an inverted style
+    index the plugin maintains for the current page: it is built with one
+    traversal and then kept current from document change events, so repeated
+    calls do not rescan.
 
     Parameters (Args)
     ------------------
     style_id (str): The unique identifier of the style to analyze. Must be a
         non-empty string. This should be a valid style ID from the document.
+    scope ("page" | "document", optional): "document" (default) reports consumers
+        on every page; "page" reports consumers on the current page only.
 
     Returns
     -------
@@ -764,8 +964,11 @@ async def get_style_consumers(style_id: str) -> str:
     """
     try:
         logger.info(f"🔎 Getting style consumers for {style_id}")
-        result = await send_command("get_style_consumers", {"style_id": style_id})
-        return _to_json_string(result)
+        params: Dict[str, Any] = {"style_id": style_id}
+        if scope == "page":
+            params["scope"] = "page"
+        result = await send_command("get_style_consumers", params)
+        return _to_json_string(result, "get_style_consumers")
     except ToolExecutionError as te:
         raise te
     except Exception as e:
@@ -778,7 +981,7 @@ async def get_style_consumers(style_id: str) -> str:
 
 
 @function_tool
-async def get_document_components(published_filter: Optional[str] = None) -> str:
+async def get_document_components(published_filter: Optional[str] = None, include_instance_counts: bool = False) -> str:
     """List all local components and component sets in the current Figma document.
 
     Purpose & Use Case
@@ -801,6 +1004,10 @@ async def get_document_components(published_filter: Optional[str] = None) -> str
         - 'published_only': Returns only components that have been published to the team library
         - 'unpublished_only': Returns only local components not yet published
         - Any other value defaults to 'all'
+    include_instance_counts (bool, optional): When True, each entry also carries
+        `instance_count`, the number of its instances on the current page (a
+        component set sums its variants). Counts come from the plugin's cached
+        component -> instances index, so they are cheap after the first call.
 
     Returns
     -------
@@ -812,16 +1019,17 @@ async def get_document_components(published_filter: Optional[str] = None) -> str
                     "component_key": str | null,  # Team library key (null if unpublished)
                     "name": str,                  # Component name as shown in layers panel
                     "type": str,                  # Either "COMPONENT" or "COMPONENT_SET"
-                    "is_published": bool          # True if component has a key (published)
+                    "is_published": bool,         # True if component has a key (published)
+                    "instance_count": int         # Only with include_instance_counts
                 },
                 ...
-            ]
+            ],
+            "instance_counts_page_id": str  # Only with include_instance_counts
         }
 
     Technical Implementation Details
     --------------------------------
-    - Uses figma.root.findAll() to traverse the entire document tree
-    - Filters nodes by type: 'COMPONENT' and 'COMPONENT_SET'
+    - Uses figma.root.findAllWithCriteria() with types 'COMPONENT' and 'COMPONENT_SET'
     - Determines publication status by checking for the presence of a 'key' property
     - Component sets contain multiple component variants and are treated as single entities
     - Performance note: May be slow in documents with thousands of nodes
@@ -847,8 +1055,10 @@ async def get_document_components(published_filter: Optional[str] = None) -> str
         params: Dict[str, Any] = {}
         if isinstance(published_filter, str) and published_filter in {"all", "published_only", "unpublished_only"}:
             params["published_filter"] = published_filter
+        if include_instance_counts:
+            params["include_instance_counts"] = True
         result = await send_command("get_document_components", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "get_document_components")
     except ToolExecutionError as te:
         raise te
     except Exception as e:
@@ -1084,7 +1294,7 @@ async def create_frame(
             params["stroke_weight"] = stroke_weight
 
         result = await send_command("create_frame", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_frame")
 
     except ToolExecutionError as te:
         logger.error(f"❌ Tool execution failed for create_frame: {getattr(te, 'message', str(te))}")
@@ -1264,7 +1474,7 @@ async def create_text(
             }
 
         result = await send_command("create_text", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_text")
 
     except ToolExecutionError:
         # Re-raise tool execution errors so the Agent SDK can handle them properly
@@ -1282,7 +1492,7 @@ async def create_text(
 ### Sub-Category 3.2: Modify (General Properties)
 
 @function_tool(strict_mode=False)
-async def set_fills(node_ids: List[str], paints: List[Dict[str, Any]]) -> str:
+async def set_fills(node_ids: Optional[List[str]] = None, paints: Optional[List[Dict[str, Any]]] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set or remove the `fills` array on multiple nodes, fully replacing existing paints.
 
     What this does
@@ -1293,9 +1503,11 @@ async def set_fills(node_ids: List[str], paints: List[Dict[str, Any]]) -> str:
 
     Input parameters
     ----------------
-    - node_ids: List[str]
-      - Required, non-empty. Each must resolve to a node that has a `fills` property.
+    - node_ids: List[str] | None
+      - Non-empty unless `selector` is given. Each must resolve to a node that has a `fills` property.
       - Locked nodes are skipped and reported.
+    - selector: NodeSelector | None
+      - Alternative to `node_ids`; see `NodeSelector`.
     - paints: List[dict | string]
       - Required array describing paints to apply. Fully replaces the node's `fills`.
       - Convenience: Hex strings like "#RRGGBB" or "#RRGGBBAA" are accepted and converted to a SolidPaint via `figma.util.solidPaint` (or a safe fallback) where alpha maps to `opacity`.
@@ -1365,10 +1577,13 @@ async def set_fills(node_ids: List[str], paints: List[Dict[str, Any]]) -> str:
     - If instance overrides fail (non-overridable), consider editing the main component or detaching when appropriate.
     """
     try:
-        logger.info(f"🎨 set_fills: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "paints": paints}
+        targets = _node_targets("set_fills", node_ids, selector)
+        if paints is None:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide paints (an empty list removes all fills)", "details": {"command": "set_fills"}})
+        logger.info(f"🎨 set_fills: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = {**targets, "paints": paints}
         result = await send_command("set_fills", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_fills")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1377,7 +1592,7 @@ async def set_fills(node_ids: List[str], paints: List[Dict[str, Any]]) -> str:
 
 
 @function_tool(strict_mode=False)
-async def set_strokes(node_ids: List[str], paints: List[Dict[str, Any]], stroke_weight: Optional[float] = None, stroke_align: Optional[str] = None, dash_pattern: Optional[List[float]] = None) -> str:
+async def set_strokes(node_ids: Optional[List[str]] = None, paints: Optional[List[Dict[str, Any]]] = None, stroke_weight: Optional[float] = None, stroke_align: Optional[str] = None, dash_pattern: Optional[List[float]] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set stroke paints and stroke properties across multiple nodes.
 
     What this does
@@ -1387,8 +1602,10 @@ async def set_strokes(node_ids: List[str], paints: List[Dict[str, Any]], stroke_
 
     Input parameters
     ----------------
-    - node_ids: List[str]
-      - Required, non-empty. Each must resolve to a node with a `strokes` property.
+    - node_ids: List[str] | None
+      - Non-empty unless `selector` is given. Each must resolve to a node with a `strokes` property.
+    - selector: NodeSelector | None
+      - Alternative to `node_ids`; see `NodeSelector`.
     - paints: List[dict | string]
       - Required. Paints are normalized exactly as in `set_fills` (SOLID, GRADIENT_*, IMAGE, hex-string convenience).
     - stroke_weight: float | None
@@ -1420,13 +1637,16 @@ async def set_strokes(node_ids: List[str], paints: List[Dict[str, Any]], stroke_
     - If instance override restrictions apply, adjust strategy (edit main component or detach instance).
     """
     try:
-        logger.info(f"🖊️ set_strokes: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "paints": paints}
+        targets = _node_targets("set_strokes", node_ids, selector)
+        if paints is None:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide paints (an empty list removes all strokes)", "details": {"command": "set_strokes"}})
+        logger.info(f"🖊️ set_strokes: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = {**targets, "paints": paints}
         if stroke_weight is not None: params["stroke_weight"] = float(stroke_weight)
         if stroke_align is not None: params["stroke_align"] = stroke_align
         if dash_pattern is not None: params["dash_pattern"] = dash_pattern
         result = await send_command("set_strokes", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_strokes")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1434,14 +1654,15 @@ async def set_strokes(node_ids: List[str], paints: List[Dict[str, Any]], stroke_
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to set strokes: {str(e)}", "details": {"command": "set_strokes"}})
 
 
-@function_tool
+@function_tool(strict_mode=False)
 async def set_corner_radius(
-    node_ids: List[str],
+    node_ids: Optional[List[str]] = None,
     uniform_radius: Optional[float] = None,
     top_left: Optional[float] = None,
     top_right: Optional[float] = None,
     bottom_left: Optional[float] = None,
     bottom_right: Optional[float] = None,
+    selector: Optional[NodeSelector] = None,
 ) -> str:
     """Set uniform or per-corner radii on supported nodes (v2 spec).
 
@@ -1462,7 +1683,8 @@ async def set_corner_radius(
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Target node IDs to modify. Must be non-empty array.
+    node_ids (List[str] | None): Target node IDs to modify. Must be non-empty array.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     uniform_radius (float | None): Set all corners to this value (pixels). Must be non-negative 
                                   and can be fractional. When set, overrides individual corner values.
     top_left (float | None): Per-corner override for top-left corner (pixels). Must be non-negative 
@@ -1533,11 +1755,12 @@ async def set_corner_radius(
         - Continues processing remaining nodes even if some fail
     """
     try:
+        targets = _node_targets("set_corner_radius", node_ids, selector)
         logger.info(
-            f"📐 set_corner_radius: nodes={len(node_ids)} uniform={uniform_radius} TL={top_left} TR={top_right} BL={bottom_left} BR={bottom_right}"
+            f"📐 set_corner_radius: nodes={_target_count(targets)} uniform={uniform_radius} TL={top_left} TR={top_right} BL={bottom_left} BR={bottom_right}"
         )
 
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        params: Dict[str, Any] = dict(targets)
         if uniform_radius is not None:
             params["uniform_radius"] = float(uniform_radius)
         if top_left is not None:
@@ -1550,7 +1773,7 @@ async def set_corner_radius(
             params["bottom_right"] = float(bottom_right)
 
         result = await send_command("set_corner_radius", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_corner_radius")
 
     except ToolExecutionError:
         logger.error("❌ Tool execution failed for set_corner_radius")
@@ -1565,8 +1788,8 @@ async def set_corner_radius(
         })
 
 
-@function_tool
-async def set_size(node_ids: List[str], width: Optional[float] = None, height: Optional[float] = None) -> str:
+@function_tool(strict_mode=False)
+async def set_size(node_ids: Optional[List[str]] = None, width: Optional[float] = None, height: Optional[float] = None, selector: Optional[NodeSelector] = None) -> str:
     """Resize multiple nodes by width and/or height using Figma's resize() API.
 
     Purpose & Use Case
@@ -1580,7 +1803,8 @@ async def set_size(node_ids: List[str], width: Optional[float] = None, height: O
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of node IDs to resize. Each ID must be valid and reference an existing node.
+    node_ids (List[str] | None): Non-empty list of node IDs to resize. Each ID must be valid and reference an existing node.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     width (float | None): New width in pixels. If None, preserves current width.
     height (float | None): New height in pixels. If None, preserves current height.
     
@@ -1657,12 +1881,13 @@ async def set_size(node_ids: List[str], width: Optional[float] = None, height: O
     When to Use: For layout adjustments; prefer `set_auto_layout` for auto-layout containers.
     """
     try:
-        logger.info(f"📏 set_size: node_ids={len(node_ids)}, width={width}, height={height}")
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        targets = _node_targets("set_size", node_ids, selector)
+        logger.info(f"📏 set_size: node_ids={_target_count(targets)}, width={width}, height={height}")
+        params: Dict[str, Any] = dict(targets)
         if width is not None: params["width"] = float(width)
         if height is not None: params["height"] = float(height)
         result = await send_command("set_size", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_size")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1670,8 +1895,8 @@ async def set_size(node_ids: List[str], width: Optional[float] = None, height: O
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to set size: {str(e)}", "details": {"command": "set_size"}})
 
 
-@function_tool
-async def set_position(node_ids: List[str], x: float, y: float) -> str:
+@function_tool(strict_mode=False)
+async def set_position(node_ids: Optional[List[str]] = None, x: Optional[float] = None, y: Optional[float] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set absolute X/Y position for multiple nodes on the Figma canvas.
 
     Purpose & Use Case
@@ -1685,9 +1910,10 @@ async def set_position(node_ids: List[str], x: float, y: float) -> str:
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of node IDs to reposition. Each ID must be a 
+    node_ids (List[str] | None): Non-empty list of node IDs to reposition. Each ID must be a 
         valid node identifier (e.g., "1:23", "2:45"). The tool will process all valid 
         nodes and skip invalid ones, reporting which nodes were successfully moved.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     x (float): Absolute X coordinate in pixels from the left edge of the page. Can be
         negative for positioning outside the visible canvas area. Must be a number.
     y (float): Absolute Y coordinate in pixels from the top edge of the page. Can be
@@ -1742,10 +1968,13 @@ async def set_position(node_ids: List[str], x: float, y: float) -> str:
     - Consider layout constraints when moving nodes with children
     """
     try:
-        logger.info(f"📍 set_position: node_ids={len(node_ids)}, x={x}, y={y}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "x": float(x), "y": float(y)}
+        targets = _node_targets("set_position", node_ids, selector)
+        if x is None or y is None:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide both x and y", "details": {"x": x, "y": y}})
+        logger.info(f"📍 set_position: node_ids={_target_count(targets)}, x={x}, y={y}")
+        params: Dict[str, Any] = {**targets, "x": float(x), "y": float(y)}
         result = await send_command("set_position", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_position")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1754,8 +1983,8 @@ async def set_position(node_ids: List[str], x: float, y: float) -> str:
 
 
 
-@function_tool
-async def set_layer_properties(node_ids: List[str], name: Optional[str] = None, opacity: Optional[float] = None, visible: Optional[bool] = None, locked: Optional[bool] = None, blend_mode: Optional[str] = None) -> str:
+@function_tool(strict_mode=False)
+async def set_layer_properties(node_ids: Optional[List[str]] = None, name: Optional[str] = None, opacity: Optional[float] = None, visible: Optional[bool] = None, locked: Optional[bool] = None, blend_mode: Optional[str] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set common layer properties (name, opacity, visibility, lock, blend) on multiple nodes.
 
     Purpose & Use Case
@@ -1770,7 +1999,8 @@ async def set_layer_properties(node_ids: List[str], name: Optional[str] = None,
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of node IDs to modify. All nodes must exist and be accessible.
+    node_ids (List[str] | None): Non-empty list of node IDs to modify. All nodes must exist and be accessible.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     
     name (str | None): New layer name. If provided, updates the node.name property. Useful for:
         - Standardizing naming conventions ("Button/Primary", "Icon/Check")
@@ -1859,15 +2089,16 @@ async def set_layer_properties(node_ids: List[str], name: Optional[str] = None,
         - Bulk cleanup of layer organization and naming
     """
     try:
-        logger.info(f"🧱 set_layer_properties: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        targets = _node_targets("set_layer_properties", node_ids, selector)
+        logger.info(f"🧱 set_layer_properties: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = dict(targets)
         if name is not None: params["name"] = name
         if opacity is not None: params["opacity"] = float(opacity)
         if visible is not None: params["visible"] = bool(visible)
         if locked is not None: params["locked"] = bool(locked)
         if blend_mode is not None: params["blend_mode"] = blend_mode
         result = await send_command("set_layer_properties", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_layer_properties")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1876,7 +2107,7 @@ async def set_layer_properties(node_ids: List[str], name: Optional[str] = None,
 
 
 @function_tool(strict_mode=False)
-async def set_effects(node_ids: List[str], effects: List[Dict[str, Any]]) -> str:
+async def set_effects(node_ids: Optional[List[str]] = None, effects: Optional[List[Dict[str, Any]]] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set the effects array (shadows, blurs, noise, textures) on multiple nodes.
 
     Purpose & Use Case
@@ -1889,7 +2120,8 @@ async def set_effects(node_ids: List[str], effects: List[Dict[str, Any]]) -> str
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of node ids. Must be non-empty.
+    node_ids (List[str] | None): Non-empty list of node ids. Must be non-empty.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     effects (List[dict]): Array of Effect objects per Figma API. Each effect must have a 'type' field.
         Supported effect types:
         - DropShadowEffect: { "type": "DROP_SHADOW", "color": {...}, "offset": {...}, "radius": number, "spread": number, "showShadowBehindNode": boolean }
@@ -1944,10 +2176,13 @@ async def set_effects(node_ids: List[str], effects: List[Dict[str, Any]]) -> str
     - Remove all: []
     """
     try:
-        logger.info(f"✨ set_effects: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "effects": effects}
+        targets = _node_targets("set_effects", node_ids, selector)
+        if effects is None:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide effects (an empty list removes all effects)", "details": {"command": "set_effects"}})
+        logger.info(f"✨ set_effects: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = {**targets, "effects": effects}
         result = await send_command("set_effects", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_effects")
     except ToolExecutionError:
         raise
     except Exception as e:
@@ -1957,9 +2192,9 @@ async def set_effects(node_ids: List[str], effects: List[Dict[str, Any]]) -> str
 
 ### Sub-Category 3.3: Modify (Layout)
 
-@function_tool
+@function_tool(strict_mode=False)
 async def set_auto_layout(
-    node_ids: List[str],
+    node_ids: Optional[List[str]] = None,
     layout_mode: Optional[str] = None,
     padding_left: Optional[float] = None,
     padding_right: Optional[float] = None,
@@ -1970,6 +2205,7 @@ async def set_auto_layout(
     counter_axis_align_items: Optional[str] = None,
     primary_axis_sizing_mode: Optional[str] = None,
     counter_axis_sizing_mode: Optional[str] = None,
+    selector: Optional[NodeSelector] = None,
 ) -> str:
     """Configure auto-layout on container nodes.
 
@@ -1980,7 +2216,8 @@ async def set_auto_layout(
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of container node ids.
+    node_ids (List[str] | None): Non-empty list of container node ids.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     layout_mode (str | None): "HORIZONTAL" | "VERTICAL" | "NONE" | "GRID".
     padding_* (float | None): Padding values in px.
     item_spacing (float | None), primary/counter axis alignment and sizing.
@@ -1998,11 +2235,10 @@ async def set_auto_layout(
     When to Use: For configuring auto-layout on frames; call `get_node_details` first to confirm node supports auto-layout.
     """
     try:
-        if not isinstance(node_ids, list) or len(node_ids) == 0:
-            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide node_ids array", "details": {"received": node_ids}})
+        targets = _node_targets("set_auto_layout", node_ids, selector)
 
-        logger.info(f"📐 set_auto_layout: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        logger.info(f"📐 set_auto_layout: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = dict(targets)
         if layout_mode is not None: params["layout_mode"] = layout_mode
         if padding_left is not None: params["padding_left"] = float(padding_left)
         if padding_right is not None: params["padding_right"] = float(padding_right)
@@ -2015,7 +2251,7 @@ async def set_auto_layout(
         if counter_axis_sizing_mode is not None: params["counter_axis_sizing_mode"] = counter_axis_sizing_mode
 
         result = await send_command("set_auto_layout", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_auto_layout")
     except ToolExecutionError:
         # Preserve structured tool errors
         logger.error("❌ Tool set_auto_layout raised ToolExecutionError")
@@ -2025,12 +2261,13 @@ async def set_auto_layout(
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_auto_layout: {str(e)}", "details": {"command": "set_auto_layout"}})
 
 
-@function_tool
+@function_tool(strict_mode=False)
 async def set_auto_layout_child(
-    node_ids: List[str],
+    node_ids: Optional[List[str]] = None,
     layout_align: Optional[str] = None,
     layout_grow: Optional[int] = None,
     layout_positioning: Optional[str] = None,
+    selector: Optional[NodeSelector] = None,
 ) -> str:
     """Set auto-layout child properties on child nodes.
 
@@ -2040,7 +2277,8 @@ async def set_auto_layout_child(
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of child node ids.
+    node_ids (List[str] | None): Non-empty list of child node ids.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     layout_align (str | None): Alignment setting.
     layout_grow (int | None): 0 or 1.
     layout_positioning (str | None): "AUTO" or "ABSOLUTE".
@@ -2058,19 +2296,18 @@ async def set_auto_layout_child(
     When to Use: For tuning child behavior inside auto-layout containers.
     """
     try:
-        if not isinstance(node_ids, list) or len(node_ids) == 0:
-            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide node_ids array", "details": {"received": node_ids}})
+        targets = _node_targets("set_auto_layout_child", node_ids, selector)
         if layout_grow is not None and layout_grow not in (0, 1):
             raise ToolExecutionError({"code": "invalid_parameter", "message": "layout_grow must be 0 or 1", "details": {"layout_grow": layout_grow}})
 
-        logger.info(f"📐 set_auto_layout_child: node_ids={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        logger.info(f"📐 set_auto_layout_child: node_ids={_target_count(targets)}")
+        params: Dict[str, Any] = dict(targets)
         if layout_align is not None: params["layout_align"] = layout_align
         if layout_grow is not None: params["layout_grow"] = int(layout_grow)
         if layout_positioning is not None: params["layout_positioning"] = layout_positioning
 
         result = await send_command("set_auto_layout_child", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_auto_layout_child")
     except ToolExecutionError:
         logger.error("❌ Tool set_auto_layout_child raised ToolExecutionError")
         raise
@@ -2079,8 +2316,8 @@ async def set_auto_layout_child(
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_auto_layout_child: {str(e)}", "details": {"command": "set_auto_layout_child"}})
 
 
-@function_tool
-async def set_constraints(node_ids: List[str], horizontal: str, vertical: str) -> str:
+@function_tool(strict_mode=False)
+async def set_constraints(node_ids: Optional[List[str]] = None, horizontal: Optional[str] = None, vertical: Optional[str] = None, selector: Optional[NodeSelector] = None) -> str:
     """Set layout constraints (horizontal & vertical) on multiple nodes.
 
     Purpose & Use Case
@@ -2089,7 +2326,8 @@ async def set_constraints(node_ids: List[str], horizontal: str, vertical: str) -
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of node ids.
+    node_ids (List[str] | None): Non-empty list of node ids.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     horizontal (str): Constraint for horizontal axis.
     vertical (str): Constraint for vertical axis.
 
@@ -2106,15 +2344,14 @@ async def set_constraints(node_ids: List[str], horizontal: str, vertical: str) -
     When to Use: For responsive design adjustments; validate in multiple breakpoints if applicable.
     """
     try:
-        if not isinstance(node_ids, list) or len(node_ids) == 0:
-            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide node_ids array", "details": {"received": node_ids}})
+        targets = _node_targets("set_constraints", node_ids, selector)
         if not isinstance(horizontal, str) or not isinstance(vertical, str):
             raise ToolExecutionError({"code": "missing_parameter", "message": "Provide horizontal and vertical", "details": {"horizontal": horizontal, "vertical": vertical}})
 
-        logger.info(f"📐 set_constraints: node_ids={len(node_ids)} horizontal={horizontal} vertical={vertical}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "horizontal": horizontal, "vertical": vertical}
+        logger.info(f"📐 set_constraints: node_ids={_target_count(targets)} horizontal={horizontal} vertical={vertical}")
+        params: Dict[str, Any] = {**targets, "horizontal": horizontal, "vertical": vertical}
         result = await send_command("set_constraints", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_constraints")
     except ToolExecutionError:
         logger.error("❌ Tool set_constraints raised ToolExecutionError")
         raise
@@ -2160,7 +2397,7 @@ async def set_child_index(node_id: str, new_index: int) -> str:
         logger.info(f"↕️ set_child_index: node_id={node_id} new_index={new_index}")
         params: Dict[str, Any] = {"node_id": node_id, "new_index": int(new_index)}
         result = await send_command("set_child_index", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "set_child_index")
     except ToolExecutionError:
         logger.error("❌ Tool set_child_index raised ToolExecutionError")
         raise
@@ -2208,7 +2445,7 @@ async def set_text_characters(node_id: str, new_characters: str) -> str:
         logger.info(f"✏️ set_text_characters: node_id={node_id}")
         params = {"node_id": node_id, "new_characters": new_characters}
         result = await send_command("set_text_characters", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "set_text_characters")
     except ToolExecutionError:
         # Preserve structured tool errors for the agent core to handle
         logger.error(f"❌ Tool set_text_characters raised ToolExecutionError for node {node_id}")
@@ -2218,9 +2455,73 @@ async def set_text_characters(node_id: str, new_characters: str) -> str:
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_text_characters: {str(e)}", "details": {"command": "set_text_characters", "node_id": node_id}})
 
 
+@function_tool(strict_mode=False)
+async def set_multiple_text_contents(replacements: List[TextReplacement]) -> str:
+    """Replace the text of many TEXT nodes in one plugin call.
+
+    Purpose & Use Case
+    --------------------
+    Copy passes and localization: update every label on a screen at once instead
+    of one `set_text_characters` call per node. The plugin groups the targets by
+    font so each distinct font is loaded once, then applies all replacements.
+
+    Parameters (Args)
+    ------------------
+    replacements (List[TextReplacement]): Non-empty list of {"node_id": str, "text": str}.
+        Each `text` replaces the node's full characters. Each node_id may appear
+        only once.
+
+    Returns
+    -------
+    (str): JSON with
+        - success: true
+        - summary: string
+        - modified_node_ids: List[str]
+        - results: [{"node_id", "success", "error"?: {"code", "message"}}] in request order
+        - fonts_loaded: number of distinct fonts loaded
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `missing_parameter` for an empty list, `invalid_parameter`
+        for a malformed entry or a repeated node_id, and
+        `set_multiple_text_contents_failed` when no node could be updated (per-node
+        results in `details.results`). Partial failures do NOT raise: per-node codes
+        (`node_not_found`, `invalid_node_type`, `node_locked`, `font_load_failed`,
+        `set_characters_failed`) are reported in `results`. `communication_error`
+        on transport failures.
+
+    Agent Guidance
+    --------------
+    Prefer this over repeated `set_text_characters` whenever two or more TEXT nodes
+    change. Mixed-font nodes take the font of their first character, as with
+    `set_text_characters`. Check `results` and retry only the failed entries.
+    """
+    try:
+        items: List[Dict[str, Any]] = []
+        for index, r in enumerate(replacements or []):
+            entry = r.model_dump() if isinstance(r, BaseModel) else dict(r or {})
+            if not isinstance(entry.get("node_id"), str) or not entry["node_id"] or not isinstance(entry.get("text"), str):
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"replacements[{index}] needs a node_id and a text string", "details": {"index": index}})
+            if any(item["node_id"] == entry["node_id"] for item in items):
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"replacements[{index}] repeats node_id {entry['node_id']}; give each node one text", "details": {"index": index, "node_id": entry["node_id"]}})
+            items.append({"node_id": entry["node_id"], "text": entry["text"]})
+        if not items:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "'replacements' must be a non-empty list", "details": {}})
+
+        logger.info(f"✏️ set_multiple_text_contents: count={len(items)}")
+        result = await send_command("set_multiple_text_contents", {"replacements": items})
+        return _to_json_string(result, "set_multiple_text_contents")
+    except ToolExecutionError:
+        logger.error("❌ Tool set_multiple_text_contents raised ToolExecutionError")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Communication/system error in set_multiple_text_contents: {str(e)}")
+        raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_multiple_text_contents: {str(e)}", "details": {"command": "set_multiple_text_contents"}})
+
+
 @function_tool(strict_mode=False)
 async def set_text_style(
-    node_ids: List[str],
+    node_ids: Optional[List[str]] = None,
     font_size: Optional[float] = None,
     font_name: Optional[FontName] = None,
     text_align_horizontal: Optional[str] = None,
@@ -2229,6 +2530,7 @@ async def set_text_style(
     letter_spacing_percent: Optional[float] = None,
     text_case: Optional[str] = None,
     text_decoration: Optional[str] = None,
+    selector: Optional[NodeSelector] = None,
 ) -> str:
     """Apply common text-style properties to multiple TEXT nodes.
 
@@ -2240,7 +2542,8 @@ async def set_text_style(
 
     Parameters (Args)
     ------------------
-    node_ids (List[str]): Non-empty list of target TEXT node IDs.
+    node_ids (List[str] | None): Non-empty list of target TEXT node IDs.
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     font_size (float, optional): Font size in pixels.
     font_name (FontName, optional): Object with `family` and `style` keys.
     text_align_horizontal (str, optional): One of 'LEFT','CENTER','RIGHT','JUSTIFIED'.
@@ -2272,12 +2575,11 @@ async def set_text_style(
     together and verify with `get_node_details` after the mutation.
     """
     try:
-        if not isinstance(node_ids, list) or len(node_ids) == 0:
-            raise ToolExecutionError({"code": "missing_parameter", "message": "'node_ids' must be a non-empty list", "details": {"node_ids": node_ids}})
+        targets = _node_targets("set_text_style", node_ids, selector)
 
-        logger.info("🅰️ set_text_style", extra={"node_count": len(node_ids)})
+        logger.info("🅰️ set_text_style", extra={"node_count": _target_count(targets)})
 
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        params: Dict[str, Any] = dict(targets)
         if font_size is not None:
             params["font_size"] = float(font_size)
         if font_name is not None:
@@ -2297,7 +2599,7 @@ async def set_text_style(
             params["text_decoration"] = text_decoration
 
         result = await send_command("set_text_style", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_text_style")
     except ToolExecutionError:
         logger.error("❌ Tool set_text_style raised ToolExecutionError")
         raise
@@ -2340,7 +2642,7 @@ async def clone_nodes(node_ids: List[str]) -> str:
         logger.info("🧬 clone_nodes", extra={"node_count": len(node_ids)})
         params = {"node_ids": node_ids}
         result = await send_command("clone_nodes", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "clone_nodes")
     except ToolExecutionError:
         logger.error("❌ Tool clone_nodes raised ToolExecutionError")
         raise
@@ -2384,7 +2686,7 @@ async def reparent_nodes(node_ids_to_move: List[str], new_parent_id: str) -> str
         logger.info("🔀 reparent_nodes", extra={"count": len(node_ids_to_move), "new_parent_id": new_parent_id})
         params = {"node_ids_to_move": node_ids_to_move, "new_parent_id": new_parent_id}
         result = await send_command("reparent_nodes", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "reparent_nodes")
     except ToolExecutionError:
         logger.error("❌ Tool reparent_nodes raised ToolExecutionError")
         raise
@@ -2426,7 +2728,7 @@ async def reorder_nodes(node_ids: List[str], mode: str) -> str:
         logger.info("↕️ reorder_nodes", extra={"mode": mode, "count": len(node_ids)})
         params = {"node_ids": node_ids, "mode": mode}
         result = await send_command("reorder_nodes", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "reorder_nodes")
     except ToolExecutionError:
         logger.error("❌ Tool reorder_nodes raised ToolExecutionError")
         raise
@@ -2527,7 +2829,7 @@ async def create_component_from_node(node_id: str, name: str) -> str:
         logger.info(f"🧩 create_component_from_node: node_id={node_id}, name={name}")
         params: Dict[str, Any] = {"node_id": node_id, "name": name}
         result = await send_command("create_component_from_node", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_component_from_node")
     except ToolExecutionError:
         # Preserve structured tool errors
         logger.error("❌ Tool create_component_from_node raised ToolExecutionError")
@@ -2584,7 +2886,7 @@ async def create_component_instance(
         if y is not None: params["y"] = float(y)
         if parent_id is not None: params["parent_id"] = parent_id
         result = await send_command("create_component_instance", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_component_instance")
     except ToolExecutionError:
         logger.error("❌ Tool create_component_instance raised ToolExecutionError")
         raise
@@ -2594,13 +2896,14 @@ async def create_component_instance(
 
 
 @function_tool(strict_mode=False)
-async def set_instance_properties(node_ids: List[str], properties: Dict[str, Any]) -> str:
+async def set_instance_properties(node_ids: Optional[List[str]] = None, properties: Optional[Dict[str, Any]] = None, selector: Optional[NodeSelector] = None) -> str:
     """
     { "category": "components", "mutates_canvas": true, "description": "Set published instance properties (overrides) on one or more instance nodes." }
 
     Parameters
     ----------
-    node_ids (List[str]): List of instance node IDs to modify (required)
+    node_ids (List[str] | None): List of instance node IDs to modify (required unless `selector` is given)
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
     properties (dict): Mapping of propertyName[#id] -> value (required)
 
     Returns
@@ -2612,10 +2915,13 @@ async def set_instance_properties(node_ids: List[str], properties: Dict[str, Any
     ToolExecutionError: Structured errors from the plugin (e.g., `missing_parameter`, `no_instances_modified`, `unknown_plugin_error`, `communication_error`).
     """
     try:
-        logger.info(f"🔧 set_instance_properties: node_count={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "properties": properties}
+        targets = _node_targets("set_instance_properties", node_ids, selector)
+        if not isinstance(properties, dict):
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide a properties object", "details": {"properties": properties}})
+        logger.info(f"🔧 set_instance_properties: node_count={_target_count(targets)}")
+        params: Dict[str, Any] = {**targets, "properties": properties}
         result = await send_command("set_instance_properties", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "set_instance_properties")
     except ToolExecutionError:
         logger.error("❌ Tool set_instance_properties raised ToolExecutionError")
         raise
@@ -2624,14 +2930,15 @@ async def set_instance_properties(node_ids: List[str], properties: Dict[str, Any
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_instance_properties: {str(e)}", "details": {"command": "set_instance_properties"}})
 
 
-@function_tool
-async def detach_instance(node_ids: List[str]) -> str:
+@function_tool(strict_mode=False)
+async def detach_instance(node_ids: Optional[List[str]] = None, selector: Optional[NodeSelector] = None) -> str:
     """
     { "category": "components", "mutates_canvas": true, "description": "Detach one or more instances into regular frames/groups (materialize overrides)." }
 
     Parameters
     ----------
-    node_ids (List[str]): List of instance node IDs to detach (required)
+    node_ids (List[str] | None): List of instance node IDs to detach (required unless `selector` is given)
+    selector (NodeSelector | None): Alternative to `node_ids`; see `NodeSelector`.
 
     Returns
     -------
@@ -2642,10 +2949,11 @@ async def detach_instance(node_ids: List[str]) -> str:
     ToolExecutionError: Propagates plugin structured failures such as `missing_parameter`, `no_instances_detached`, or `communication_error`.
     """
     try:
-        logger.info(f"🔧 detach_instance: node_count={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids}
+        targets = _node_targets("detach_instance", node_ids, selector)
+        logger.info(f"🔧 detach_instance: node_count={_target_count(targets)}")
+        params: Dict[str, Any] = dict(targets)
         result = await send_command("detach_instance", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "detach_instance")
     except ToolExecutionError:
         logger.error("❌ Tool detach_instance raised ToolExecutionError")
         raise
@@ -2760,7 +3068,7 @@ async def create_style(name: str, type: str, style_properties: Dict[str, Any]) -
         logger.info(f"🎨 create_style: name={name}, type={type}")
         params: Dict[str, Any] = {"name": name, "type": type, "style_properties": style_properties}
         result = await send_command("create_style", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_style")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool create_style raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -2769,8 +3077,8 @@ async def create_style(name: str, type: str, style_properties: Dict[str, Any]) -
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call create_style: {str(e)}", "details": {"command": "create_style"}})
 
 
-@function_tool
-async def apply_style(node_ids: List[str], style_id: str, style_type: str) -> str:
+@function_tool(strict_mode=False)
+async def apply_style(node_ids: Optional[List[str]] = None, style_id: Optional[str] = None, style_type: Optional[str] = None, selector: Optional[NodeSelector] = None) -> str:
     """
     { "category": "styles", "mutates_canvas": true, "description": "Apply a named style to a set of nodes (fills, strokes, text, effects, grid)." }
 
@@ -2823,10 +3131,12 @@ async def apply_style(node_ids: List[str], style_id: str, style_type: str) -> st
 
     Parameters
     ----------
-    node_ids : List[str]
-        List of node IDs to apply the style to (required, non-empty).
+    node_ids : List[str] | None
+        List of node IDs to apply the style to (non-empty unless `selector` is given).
         Each ID must be a valid Figma node ID string. Invalid or missing nodes are silently skipped.
         Locked nodes are automatically skipped to prevent accidental modifications.
+    selector : NodeSelector | None
+        Alternative to `node_ids`; see `NodeSelector`.
     style_id : str
         ID of the style to apply (required). Must be a valid style ID from the current document.
         Style IDs can be obtained from `create_style` tool or `get_document_styles` tool.
@@ -2890,6 +3200,9 @@ async def apply_style(node_ids: List[str], style_id: str, style_type: str) -> st
     - For bulk style updates, modify the source style definition rather than re-applying to individual nodes
     """
     try:
+        targets = _node_targets("apply_style", node_ids, selector)
+        if not isinstance(style_id, str) or not style_id.strip():
+            raise ToolExecutionError({"code": "missing_parameter", "message": "Provide style_id", "details": {"style_id": style_id}})
         # Sanitize inputs for robustness against minor agent errors
         safe_style_id = (style_id or "").strip().rstrip(",")
         # Accept common synonyms from Figma docs vs our tool enum
@@ -2906,10 +3219,10 @@ async def apply_style(node_ids: List[str], style_id: str, style_type: str) -> st
                 "details": {"style_type": style_type}
             })
 
-        logger.info(f"🎨 apply_style: style_id={safe_style_id}, style_type={t}, node_count={len(node_ids)}")
-        params: Dict[str, Any] = {"node_ids": node_ids, "style_id": safe_style_id, "style_type": t}
+        logger.info(f"🎨 apply_style: style_id={safe_style_id}, style_type={t}, node_count={_target_count(targets)}")
+        params: Dict[str, Any] = {**targets, "style_id": safe_style_id, "style_type": t}
         result = await send_command("apply_style", params)
-        return _to_json_string(result)
+        return _to_json_string(_selector_output(result, selector), "apply_style")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool apply_style raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -2962,7 +3275,7 @@ async def create_variable_collection(name: str, initial_mode_name: Optional[str]
             params["initial_mode_name"] = initial_mode_name
 
         result = await send_command("create_variable_collection", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_variable_collection")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool create_variable_collection raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -3010,7 +3323,7 @@ async def create_variable(name: str, collection_id: str, resolved_type: str) ->
 
         params = {"name": name, "collection_id": collection_id, "resolved_type": resolved_type}
         result = await send_command("create_variable", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "create_variable")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool create_variable raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -3054,7 +3367,7 @@ async def set_variable_value(variable_id: str, mode_id: str, value: Any) -> str:
 
         params = {"variable_id": variable_id, "mode_id": mode_id, "value": value}
         result = await send_command("set_variable_value", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "set_variable_value")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool set_variable_value raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -3099,7 +3412,7 @@ async def bind_variable_to_property(node_id: str, property: str, variable_id: st
 
         params = {"node_id": node_id, "property": property, "variable_id": variable_id}
         result = await send_command("bind_variable_to_property", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "bind_variable_to_property")
     except ToolExecutionError as e:
         logger.error(f"❌ Tool bind_variable_to_property raised ToolExecutionError | code={getattr(e, 'code', None)} | details={getattr(e, 'details', {})}")
         raise
@@ -3109,6 +3422,242 @@ async def bind_variable_to_property(node_id: str, property: str, variable_id: st
 
 
 
+### Sub-Category 3.10: Batch Editing
+
+@function_tool(strict_mode=False)
+async def apply_edit_plan(
+    operations: List[EditPlanOperation],
+    atomic: bool = True,
+    reveal: Optional[Literal["always", "end_of_turn", "never"]] = None,
+) -> str:
+    """Apply an ordered plan of edit operations in one plugin call and one undo step.
+
+    Purpose & Use Case
+    --------------------
+    Build or restyle something that needs several mutations (a card: frame,
+    auto layout, texts, fills, radius, effects) without one tool call per step.
+    Each operation is an ordinary tool command with that tool's params; all of
+    them run sequentially inside a single plugin round-trip and undo group, and
+    the result of the plan is revealed once at the end.
+
+    Parameters (Args)
+    ------------------
+    operations (List[EditPlanOperation]): 1-100 operations, executed in order:
+        - command (str): Name of any mutation/inspection tool (e.g. "create_frame",
+          "set_auto_layout", "create_text", "set_fills"). `apply_edit_plan` and
+          `commit_undo_step` are not allowed.
+        - params (dict, optional): Exactly the params that tool accepts.
+        - ref (str, optional): Name for this operation's result so later params can
+          reference it. Letters, digits, `_` and `-`; unique within the plan.
+        Reference tokens are whole string values of the form "$<ref>.<key>":
+        - "$card.id": primary node created/affected by the `card` operation.
+        - "$card.node_ids": every node id that operation reported; inside a list it
+          is spliced in (["$a.id", "$b.node_ids"] → flat id list).
+        - "$coll.initial_mode_id" etc.: any other top-level field of that result.
+    atomic (bool, optional): Default True. The plan is applied as a transaction:
+        it becomes one undo step and any failing operation rolls back every
+        operation applied before it, leaving the canvas unchanged. Pass False to
+        keep the operations that succeeded before a failure.
+    reveal (str, optional): Viewport behaviour for this call, overriding the session
+        policy (see `set_reveal_policy`): "always", "end_of_turn" or "never".
+
+    Returns
+    -------
+    str: JSON with
+        - success: true
+        - summary: string
+        - atomic: boolean
+        - refs: {ref: id} for every declared ref
+        - results: [{index, command, ref?, result}] in plan order
+        - modified_node_ids: every node id the operations reported
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `invalid_parameter` for a malformed plan (checked before
+        sending) and `invalid_operation` for unknown/disallowed commands. When an
+        operation fails the plan stops and `details` carries `index`, `command` and
+        the underlying `cause`:
+        - atomic=True: `transaction_rolled_back`; `details.rollback.restored` tells
+          whether the canvas is back to its pre-plan state. Fix the cause and resend
+          the whole plan.
+        - atomic=False: `edit_plan_step_failed`; earlier operations stay applied and
+          `details` lists the `completed` results and `refs` to continue from.
+        `communication_error` on transport failures.
+
+    Agent Guidance
+    --------------
+    Prefer one plan over a chain of single mutations whenever the steps are known
+    up front. Give every node you will touch later a `ref`. Example:
+        [{"command": "create_frame", "params": {"name": "Card", "width": 320, "height": 200}, "ref": "card"},
+         {"command": "set_auto_layout", "params": {"node_ids": ["$card.id"], "layout_mode": "VERTICAL", "item_spacing": 8}},
+         {"command": "create_text", "params": {"parent_id": "$card.id", "characters": "Title"}, "ref": "title"},
+         {"command": "set_corner_radius", "params": {"node_ids": ["$card.id"], "uniform_radius": 12}}]
+    """
+    try:
+        ops: List[Dict[str, Any]] = []
+        declared: set = set()
+        for index, op in enumerate(operations or []):
+            entry = op.model_dump(exclude_none=True) if isinstance(op, BaseModel) else dict(op or {})
+            command = entry.get("command")
+            if not isinstance(command, str) or not command.strip():
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"operations[{index}] is missing 'command'", "details": {"index": index}})
+            if command in ("apply_edit_plan", "commit_undo_step"):
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"operations[{index}]: '{command}' is not allowed inside an edit plan", "details": {"index": index, "command": command}})
+            ref = entry.get("ref")
+            if ref is not None:
+                if ref in declared:
+                    raise ToolExecutionError({"code": "invalid_parameter", "message": f"operations[{index}]: ref '{ref}' is declared twice", "details": {"index": index, "ref": ref}})
+                declared.add(ref)
+            ops.append(entry)
+        if not ops:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "'operations' must be a non-empty list", "details": {}})
+
+        logger.info(f"🧩 apply_edit_plan: operations={len(ops)} refs={len(declared)} atomic={bool(atomic)}")
+        if atomic:
+            result = await run_transaction(ops, reveal=reveal)
+        else:
+            result = await send_command("apply_edit_plan", {"operations": ops}, reveal=reveal)
+        return _to_json_string(result, "apply_edit_plan")
+    except ToolExecutionError:
+        logger.error("❌ Tool apply_edit_plan raised ToolExecutionError")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Communication/system error in apply_edit_plan: {str(e)}")
+        raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call apply_edit_plan: {str(e)}", "details": {"command": "apply_edit_plan"}})
+
+
+### Sub-Category 3.11: Annotations & Connections
+
+@function_tool(strict_mode=False)
+async def set_annotations(annotations: List[Annotation], mode: Literal["append", "replace"] = "append") -> str:
+    """Attach Dev Mode annotations to many nodes in one plugin call.
+
+    Purpose & Use Case
+    --------------------
+    Handoff and review passes: label every measured element of a screen at once
+    instead of one call per node. Items targeting the same node are grouped so
+    each node's annotation list is written once.
+
+    Parameters (Args)
+    ------------------
+    annotations (List[Annotation]): Non-empty list of
+        {"node_id": str, "label_markdown": str, "category_id"?: str,
+         "properties"?: [{"name": str, "value": str}]}.
+        Property names Figma can display live (e.g. "width", "height", "fills",
+        "fontSize", "itemSpacing", "padding", "cornerRadius") are attached as
+        annotation properties; any other name/value pair is appended to the
+        label as `**name**: value`.
+    mode (str): "append" (default) keeps existing annotations on the node;
+        "replace" overwrites them with the new items.
+
+    Returns
+    -------
+    (str): JSON with
+        - success: true
+        - summary: string
+        - modified_node_ids: List[str]
+        - results: [{"index", "node_id", "success", "error"?: {"code", "message"}}] in request order
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `missing_parameter` for an empty list and
+        `set_annotations_failed` when nothing could be applied (per-item results
+        in `details.results`). Partial failures do NOT raise: per-item codes
+        (`node_not_found`, `invalid_node_type`, `set_annotations_failed`) are
+        reported in `results`. `communication_error` on transport failures.
+
+    Agent Guidance
+    --------------
+    Send all annotations for a screen in ONE call. Use "replace" only when you
+    intend to discard annotations someone else wrote. `category_id` must be an
+    existing annotation category of the file; omit it when unsure.
+    """
+    try:
+        items: List[Dict[str, Any]] = []
+        for index, a in enumerate(annotations or []):
+            entry = a.model_dump(exclude_none=True) if isinstance(a, BaseModel) else {k: v for k, v in dict(a or {}).items() if v is not None}
+            if not isinstance(entry.get("node_id"), str) or not entry["node_id"] or not isinstance(entry.get("label_markdown"), str):
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"annotations[{index}] needs a node_id and a label_markdown string", "details": {"index": index}})
+            items.append(entry)
+        if not items:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "'annotations' must be a non-empty list", "details": {}})
+        if mode not in ("append", "replace"):
+            raise ToolExecutionError({"code": "invalid_parameter", "message": "mode must be 'append' or 'replace'", "details": {"mode": mode}})
+
+        logger.info(f"📝 set_annotations: count={len(items)} mode={mode}")
+        result = await send_command("set_annotations", {"annotations": items, "mode": mode})
+        return _to_json_string(result, "set_annotations")
+    except ToolExecutionError:
+        logger.error("❌ Tool set_annotations raised ToolExecutionError")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Communication/system error in set_annotations: {str(e)}")
+        raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_annotations: {str(e)}", "details": {"command": "set_annotations"}})
+
+
+@function_tool(strict_mode=False)
+async def create_connections(connections: List[Connection]) -> str:
+    """Draw connections between many pairs of nodes in one plugin call.
+
+    Purpose & Use Case
+    --------------------
+    Flow diagrams, user journeys and annotated specs: link steps or call out
+    relationships in bulk. In FigJam each pair becomes a native connector bound to
+    both nodes; in Figma Design (no connector node) it becomes an arrow vector
+    between the nodes' edges, with an optional text label at its midpoint.
+
+    Parameters (Args)
+    ------------------
+    connections (List[Connection]): Non-empty list of
+        {"start_node_id": str, "end_node_id": str, "text"?: str}. The two nodes
+        must differ and, in Figma Design, be on the same page.
+
+    Returns
+    -------
+    (str): JSON with
+        - success: true
+        - summary: string
+        - created_node_ids: List[str] (connectors, or arrow vectors and labels)
+        - results: [{"index", "start_node_id", "end_node_id", "success",
+          "method"?: "connector" | "line", "connector_id"?, "line_id"?, "label_id"?,
+          "error"?: {"code", "message"}}] in request order
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `missing_parameter` for an empty list and
+        `create_connections_failed` when nothing was created (per-item results in
+        `details.results`). Partial failures do NOT raise: per-item codes
+        (`invalid_parameter`, `node_not_found`, `cross_page_connection`,
+        `create_connection_failed`) are reported in `results`.
+        `communication_error` on transport failures.
+
+    Agent Guidance
+    --------------
+    Arrow vectors in Figma Design are static: they do not follow the nodes if
+    those move later, so lay out the nodes first and connect them last.
+    """
+    try:
+        items: List[Dict[str, Any]] = []
+        for index, c in enumerate(connections or []):
+            entry = c.model_dump(exclude_none=True) if isinstance(c, BaseModel) else {k: v for k, v in dict(c or {}).items() if v is not None}
+            start, end = entry.get("start_node_id"), entry.get("end_node_id")
+            if not isinstance(start, str) or not start or not isinstance(end, str) or not end:
+                raise ToolExecutionError({"code": "invalid_parameter", "message": f"connections[{index}] needs start_node_id and end_node_id", "details": {"index": index}})
+            items.append(entry)
+        if not items:
+            raise ToolExecutionError({"code": "missing_parameter", "message": "'connections' must be a non-empty list", "details": {}})
+
+        logger.info(f"🔗 create_connections: count={len(items)}")
+        result = await send_command("create_connections", {"connections": items})
+        return _to_json_string(result, "create_connections")
+    except ToolExecutionError:
+        logger.error("❌ Tool create_connections raised ToolExecutionError")
+        raise
+    except Exception as e:
+        logger.error(f"❌ Communication/system error in create_connections: {str(e)}")
+        raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call create_connections: {str(e)}", "details": {"command": "create_connections"}})
+
+
 # ============================================
 # ======= Category 4: Meta & Utility =========
 # ============================================
@@ -3146,7 +3695,7 @@ async def scroll_and_zoom_into_view(node_ids: List[str]) -> str:
         logger.info(f"🔭 scroll_and_zoom_into_view: node_count={len(node_ids)}")
         params: Dict[str, Any] = {"node_ids": node_ids}
         result = await send_command("scroll_and_zoom_into_view", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "scroll_and_zoom_into_view")
     except ToolExecutionError:
         logger.error("❌ Tool scroll_and_zoom_into_view raised ToolExecutionError")
         raise
@@ -3188,7 +3737,7 @@ async def delete_nodes(node_ids: List[str]) -> str:
         logger.info(f"🗑️ delete_nodes: node_count={len(node_ids)}")
         params: Dict[str, Any] = {"node_ids": node_ids}
         result = await send_command("delete_nodes", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "delete_nodes")
     except ToolExecutionError:
         logger.error("❌ Tool delete_nodes raised ToolExecutionError")
         raise
@@ -3231,7 +3780,7 @@ async def show_notification(message: str, is_error: Optional[bool] = None) -> st
         if is_error is not None:
             params["is_error"] = bool(is_error)
         result = await send_command("show_notification", params)
-        return _to_json_string(result)
+        return _to_json_string(result, "show_notification")
     except ToolExecutionError:
         logger.error("❌ Tool show_notification raised ToolExecutionError")
         raise
@@ -3266,7 +3815,7 @@ async def commit_undo_step() -> str:
     try:
         logger.info("🔁 commit_undo_step")
         result = await send_command("commit_undo_step", {})
-        return _to_json_string(result)
+        return _to_json_string(result, "commit_undo_step")
     except ToolExecutionError:
         logger.error("❌ Tool commit_undo_step raised ToolExecutionError")
         raise
@@ -3275,3 +3824,72 @@ async def commit_undo_step() -> str:
         raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call commit_undo_step: {str(e)}", "details": {"command": "commit_undo_step"}})
 
 
+@function_tool
+async def set_reveal_policy(policy: Literal["always", "end_of_turn", "never"]) -> str:
+    """
+    Choose when the plugin moves the viewport to the nodes a tool call touched.
+
+    Purpose & Use Case
+    --------------------
+    By default every successful step switches to the node's page, selects it and
+    zooms to it. During rapid multi-step edits that viewport work is slow and it
+    changes the user's selection between steps. This sets the policy for the rest
+    of the session; it does not call the plugin.
+
+    Parameters (Args)
+    ------------------
+    policy (str): One of:
+        - "always": reveal after every step (default).
+        - "end_of_turn": remember touched nodes and reveal them once after your reply.
+        - "never": leave the viewport and selection alone.
+
+    Returns
+    -------
+    str: JSON: {"success": true, "policy": "...", "previous_policy": "..."}
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `invalid_parameter` for an unknown policy,
+        `communication_error` when the plugin connection is not initialized.
+
+    Agent Guidance
+    --------------
+    Switch to "end_of_turn" before a long sequence of edits; use `scroll_and_zoom_into_view`
+    when the user must see something specific under "never".
+    """
+    try:
+        previous = get_communicator().set_reveal_policy(policy)
+        logger.info(f"🔭 set_reveal_policy: {previous} -> {policy}")
+        return _to_json_string({"success": True, "policy": policy, "previous_policy": previous}, "set_reveal_policy")
+    except ValueError as e:
+        raise ToolExecutionError({"code": "invalid_parameter", "message": str(e), "details": {"policy": policy}})
+    except Exception as e:
+        logger.error(f"❌ Communication/system error in set_reveal_policy: {str(e)}")
+        raise ToolExecutionError({"code": "communication_error", "message": f"Failed to call set_reveal_policy: {str(e)}", "details": {"command": "set_reveal_policy"}})
+
+
+@function_tool
+async def get_tool_guide(tool_name: str) -> str:
+    """
+    Return the full documentation of a tool whose description was shortened.
+
+    Descriptions only carry a summary and parameter hints; the guide adds
+    return shapes, error codes and usage guidance.
+
+    Parameters (Args)
+    ------------------
+    tool_name (str): Exact tool name, e.g. "set_fills".
+
+    Returns
+    -------
+    str: JSON: {"success": true, "tool_name": "...", "guide": "<full docstring>"}
+
+    Raises (Errors & Pitfalls)
+    --------------------------
+    ToolExecutionError: `invalid_parameter` for an unknown name; `details.available` lists valid names.
+    """
+    guide = get_guide(tool_name)
+    if guide is None:
+        raise ToolExecutionError({"code": "invalid_parameter", "message": f"No guide for tool '{tool_name}'", "details": {"tool_name": tool_name, "available": guide_names()}})
+    logger.info(f"📖 get_tool_guide: {tool_name} ({len(guide)} chars)")
+    return _to_json_string({"success": True, "tool_name": tool_name, "guide": guide}, "get_tool_guide")
@@ -16,8 +16,8 @@ load_dotenv()
 
 
 # Import agents SDK - required, no fallback
-from agents import Agent, Runner, ModelSettings
-from agents.agent import StopAtTools
+from agents import Agent, Runner, ModelSettings, FunctionToolResult, RunContextWrapper
+from agents.agent import ToolsToFinalOutputResult
 from agents.extensions.models.litellm_model import LitellmModel
 
 from agents.tracing import set_tracing_disabled
@@ -26,6 +26,9 @@ set_tracing_disabled(True)
 
 # Import tools and communicator
 from figma_communicator import FigmaCommunicator, set_communicator
+from scene_index import SceneIndex
+from tool_router import ToolRouter, set_router
+from tool_guides import compact_tool_descriptions
 from conversation import ConversationStore, Packer, UsageSnapshot
 import figma_tools as figma_tools
 
@@ -45,8 +48,38 @@ MESSAGE_TYPE_SYSTEM = "system"
 MESSAGE_TYPE_PROGRESS_UPDATE = "progress_update"
 MESSAGE_TYPE_USER_PROMPT = "user_prompt"
 MESSAGE_TYPE_TOOL_RESPONSE = "tool_response"
+MESSAGE_TYPE_TOOL_PARTIAL = "tool_partial"
 MESSAGE_TYPE_ERROR = "error"
 MESSAGE_TYPE_NEW_CHAT = "new_chat"
+MESSAGE_TYPE_DOCUMENT_CHANGE = "document_change"
+
+# Tools whose output is always an image payload for the multimodal follow-up run
+IMAGE_TOOL_NAMES = {"get_image_of_node"}
+
+
+def _has_images_payload(output: Any) -> bool:
+    """True when a tool output is a JSON object carrying a non-empty top-level `images` map."""
+    if not isinstance(output, str) or '"images"' not in output:
+        return False
+    try:
+        parsed = json.loads(output)
+    except Exception:
+        return False
+    return isinstance(parsed, dict) and isinstance(parsed.get("images"), dict) and len(parsed["images"]) > 0
+
+
+def stop_on_image_output(context: RunContextWrapper[Any], tool_results: list[FunctionToolResult]) -> ToolsToFinalOutputResult:
+    """Stop the run when a tool returned images so they can be re-sent as model image input.
+
+    Covers the dedicated image tool as well as opt-in previews such as
+    `get_node_details(include_image=True)`.
+    """
+    for result in tool_results:
+        name = getattr(getattr(result, "tool", None), "name", "")
+        if name in IMAGE_TOOL_NAMES or _has_images_payload(result.output):
+            return ToolsToFinalOutputResult(is_final_output=True, final_output=result.output)
+    return ToolsToFinalOutputResult(is_final_output=False, final_output=None)
+
 
 class FigmaAgent:
     def __init__(self, bridge_url: str, channel: str, model: str, api_key: str):
@@ -68,6 +101,8 @@ class FigmaAgent:
         self._turn_tool_output_tokens_est: int = 0
         self._per_tool_output_tokens: Dict[str, int] = {}
         self._last_selection_reference_text: Optional[str] = None
+        # Fonts already warmed in the plugin's session font cache (family, style)
+        self._preloaded_fonts: set[tuple[str, str]] = set()
         
         
         # Initialize Agent using SDK
@@ -151,13 +186,19 @@ class FigmaAgent:
         if not all_tools:
             logger.warning("⚠️ No decorated tools discovered in figma_tools. Tools will be unavailable.")
 
+        # Tool descriptions are resent with every model call: keep a compact
+        # summary in the schema and serve the full docstrings via get_tool_guide
+        if os.getenv("COMPACT_TOOL_DESCRIPTIONS", "true").lower() not in ("0", "false", "no"):
+            chars_before, chars_after = compact_tool_descriptions(all_tools)
+            logger.info(f"📉 Tool descriptions compacted: ≈{chars_before // 4} → ≈{chars_after // 4} tokens per model call")
+
         self.agent = Agent(
             name="FigmaCopilot",
             instructions=instructions,
             model=LitellmModel(model=model, api_key=api_key),
             model_settings=ModelSettings(include_usage=True),
             tools=all_tools,
-            tool_use_behavior=StopAtTools(stop_at_tool_names=["get_image_of_node"])
+            tool_use_behavior=stop_on_image_output
         )
 
         # Keep names for later bridge progress update
@@ -165,6 +206,14 @@ class FigmaAgent:
             self.tool_names = [t.name for t in all_tools]
         except Exception:
             self.tool_names = []
+
+        # Per-turn tool subsetting: each run gets a clone of the agent with the
+        # tools the turn needs (plus load_more_tools); see tool_router.py
+        routing_enabled = os.getenv("TOOL_ROUTING", "true").lower() not in ("0", "false", "no")
+        self.tool_router = ToolRouter(all_tools, enabled=routing_enabled)
+        set_router(self.tool_router)
+        self._turn_agent: Optional[Agent] = None
+        logger.info(f"🧭 Tool routing {'enabled' if routing_enabled else 'disabled'}")
         
         # Manual conversation store + packer (text-only, multimodal-ready stubs)
         last_k = int(os.getenv("CONVO_LAST_K", "8"))
@@ -193,6 +242,7 @@ class FigmaAgent:
             self._turn_tool_input_tokens_est = 0
             self._turn_tool_output_tokens_est = 0
             self._per_tool_output_tokens = {}
+            self._turn_agent = self._route_tools(user_prompt, snapshot)
             if self.communicator:
                 # Inform communicator about current turn id so it can tag progress updates
                 self.communicator.current_turn_id = self._current_turn_id
@@ -331,6 +381,27 @@ class FigmaAgent:
             raise
         except Exception as e:
             logger.error(f"❌ Orchestrated stream failed: {e}")
+        finally:
+            self.tool_router.finish_turn()
+            self._turn_agent = None
+        await self._flush_deferred_reveal()
+
+    def _route_tools(self, user_prompt: str, snapshot: Optional[Dict[str, Any]]) -> Agent:
+        """Clone the agent with this turn's tool subset; falls back to the full agent."""
+        try:
+            return self.agent.clone(tools=self.tool_router.select(user_prompt, snapshot))
+        except Exception as e:
+            logger.warning(f"⚠️ Tool routing failed, offering all tools: {e}")
+            return self.agent
+
+    async def _flush_deferred_reveal(self) -> None:
+        """Reveal the nodes touched this turn when reveal was deferred to the end of the turn."""
+        if not self.communicator:
+            return
+        try:
+            await self.communicator.flush_reveal()
+        except Exception as e:
+            logger.warning(f"⚠️ Deferred reveal failed: {e}")
 
         
         
@@ -411,7 +482,18 @@ class FigmaAgent:
             
             # Initialize communicator for tool calls with configurable timeout
             tool_timeout = float(os.getenv("FIGMA_TOOL_TIMEOUT", "30.0"))
-            self.communicator = FigmaCommunicator(self.websocket, timeout=tool_timeout)
+            self.communicator = FigmaCommunicator(
+                self.websocket,
+                timeout=tool_timeout,
+                min_timeout=float(os.getenv("FIGMA_TOOL_TIMEOUT_MIN", "2.0")),
+                max_timeout=float(os.getenv("FIGMA_TOOL_TIMEOUT_MAX", "120.0")),
+                adaptive_timeouts=os.getenv("FIGMA_ADAPTIVE_TIMEOUTS", "true").lower() not in ("0", "false", "no"),
+                max_in_flight=int(os.getenv("FIGMA_MAX_IN_FLIGHT", "2")),
+                # Fresh mirror per connection/channel; nothing learned earlier is trusted
+                scene_index=SceneIndex(ttl_seconds=float(os.getenv("SCENE_INDEX_TTL_SECONDS", "30")))
+                if os.getenv("SCENE_INDEX", "true").lower() not in ("0", "false", "no") else None,
+                reveal_policy=os.getenv("REVEAL_POLICY", "always").lower(),
+            )
             set_communicator(self.communicator)
             logger.info(f"Initialized FigmaCommunicator for tool calls (timeout: {tool_timeout}s)")
             # Announce loaded tools to the bridge/plugin
@@ -447,7 +529,9 @@ class FigmaAgent:
             MESSAGE_TYPE_PROGRESS_UPDATE: self._handle_progress_update,
             MESSAGE_TYPE_USER_PROMPT: self._handle_user_prompt,
             MESSAGE_TYPE_TOOL_RESPONSE: self._handle_tool_response,
+            MESSAGE_TYPE_TOOL_PARTIAL: self._handle_tool_partial,
             MESSAGE_TYPE_NEW_CHAT: self._handle_new_chat,
+            MESSAGE_TYPE_DOCUMENT_CHANGE: self._handle_document_change,
             MESSAGE_TYPE_ERROR: self._handle_bridge_error,
         }
 
@@ -459,6 +543,8 @@ class FigmaAgent:
         logger.info(f"🔧 System message: {sys_msg}")
         try:
             if isinstance(sys_msg, str) and 'disconnected' in sys_msg.lower() and 'plugin' in sys_msg.lower():
+                # A reconnecting plugin starts with an empty font cache
+                self._preloaded_fonts.clear()
                 await self.cancel_active_operations(reason="plugin_disconnected")
         except Exception as e:
             logger.error(f"Cancel on disconnect failed: {e}")
@@ -484,6 +570,8 @@ class FigmaAgent:
             except Exception:
                 logger.info("📸 Snapshot received")
 
+        self._schedule_font_preload(snapshot)
+
         try:
             logger.info("🚀 Starting orchestrated stream in background task")
             task = asyncio.create_task(self._run_orchestrated_stream(prompt, snapshot))
@@ -507,6 +595,62 @@ class FigmaAgent:
         else:
             logger.warning("Received tool_response but communicator not initialized")
 
+    async def _handle_tool_partial(self, message: Dict[str, Any]) -> None:
+        if self.communicator:
+            self.communicator.handle_tool_partial(message)
+        else:
+            logger.warning("Received tool_partial but communicator not initialized")
+
+    def _schedule_font_preload(self, snapshot: Optional[Dict[str, Any]]) -> None:
+        """Warm the plugin font cache with the selection's fonts while the model is thinking."""
+        if not self.communicator or not isinstance(snapshot, dict):
+            return
+        if os.getenv("FONT_PRELOAD", "true").lower() in ("0", "false", "no"):
+            return
+        summary = snapshot.get("selection_summary")
+        fonts = summary.get("fonts") if isinstance(summary, dict) else None
+        pending = [
+            {"family": f["family"], "style": f["style"]}
+            for f in (fonts or [])
+            if isinstance(f, dict) and isinstance(f.get("family"), str) and isinstance(f.get("style"), str)
+            and (f["family"], f["style"]) not in self._preloaded_fonts
+        ]
+        if not pending:
+            return
+        keys = {(f["family"], f["style"]) for f in pending}
+        self._preloaded_fonts.update(keys)
+
+        async def _preload() -> None:
+            try:
+                result = await self.communicator.send_command("preload_fonts", {"fonts": pending})
+                failed = result.get("failed_fonts") if isinstance(result, dict) else None
+                for f in failed or []:
+                    self._preloaded_fonts.discard((f.get("family"), f.get("style")))
+                logger.info(f"🔤 Preloaded {len(pending) - len(failed or [])}/{len(pending)} selection font(s)")
+            except asyncio.CancelledError:
+                self._preloaded_fonts.difference_update(keys)
+                raise
+            except Exception as e:
+                self._preloaded_fonts.difference_update(keys)
+                logger.warning(f"⚠️ Font preload failed: {e}")
+
+        task = asyncio.create_task(_preload())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _handle_document_change(self, message: Dict[str, Any]) -> None:
+        """Apply a coalesced canvas change batch to agent-side caches."""
+        changes = message.get("changes") or []
+        logger.info(
+            f"🔔 document_change seq={message.get('seq')} changes={len(changes)} "
+            f"overflow={bool(message.get('overflow'))} selection_changed={bool(message.get('selection_changed'))}"
+        )
+        if self.communicator and self.communicator.scene_index is not None:
+            try:
+                self.communicator.scene_index.apply_document_changes(message)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to apply document changes to scene index: {e}")
+
     async def _handle_bridge_error(self, message: Dict[str, Any]) -> None:
         error_msg = message.get("message", "Unknown error")
         logger.error(f"Bridge error: {error_msg}")
@@ -522,6 +666,7 @@ class FigmaAgent:
             await self.cancel_active_operations("new_chat")
             # Clear manual conversation store
             self.store.clear()
+            self.tool_router.reset()
             logger.info("🧼 Cleared ConversationStore for new chat")
         except Exception as e:
             logger.error(f"Failed to clear session for new chat: {e}")
@@ -548,6 +693,7 @@ class FigmaAgent:
         *,
         add_user_to_store: bool = True,
         depth: int = 0,
+        context_texts: Optional[list[str]] = None,
     ) -> None:
         """Async helper for streaming with manual conversation management"""
         # Persist current user turn into our store first (so we never lose it)
@@ -566,6 +712,7 @@ class FigmaAgent:
                 user_images_data_urls=images_data_urls,
                 include_summary=True,
                 include_state_facts=True,
+                user_context_texts=context_texts,
             )
             img_count = len(images_data_urls or [])
             if img_count > 0:
@@ -579,6 +726,8 @@ class FigmaAgent:
                 content = []
                 if user_prompt:
                     content.append({"type": "input_text", "text": user_prompt})
+                for extra in (context_texts or []):
+                    content.append({"type": "input_text", "text": extra})
                 for url in (images_data_urls or []):
                     content.append({"type": "input_image", "image_url": url})
                 input_items = [{"role": "user", "content": content or (user_prompt or "")}]
@@ -587,7 +736,7 @@ class FigmaAgent:
 
         # Run streaming with manual inputs (no Session)
         stream_result = Runner.run_streamed(
-            self.agent,
+            self._turn_agent or self.agent,
             input=input_items,
             session=None,
             max_turns=self.max_turns,
@@ -617,6 +766,8 @@ class FigmaAgent:
                 try:
                     if getattr(event, "type", "") == "run_item_stream_event":
                         item = getattr(event, "item", None)
+                        if item is not None and getattr(item, "type", "") == "tool_call_item":
+                            self.tool_router.note_used(getattr(getattr(item, "raw_item", None), "name", None))
                         if item is not None and getattr(item, "type", "") == "tool_call_output_item":
                             output = getattr(item, "output", None)
                             if isinstance(output, str):
@@ -698,7 +849,7 @@ class FigmaAgent:
                                 "type": MESSAGE_TYPE_PROGRESS_UPDATE,
                                 "message": {
                                     "kind": "attached_images",
-                                    "source": "get_image_of_node",
+                                    "source": "tool_images",
                                     "count": len(selected_urls),
                                     "note": "stopped_on_tool_and_resumed"
                                 }
@@ -711,11 +862,21 @@ class FigmaAgent:
                             logger.info("🔁 Starting follow-up run for multimodal reasoning (depth=1), base64 not embedded in text; sent as input_image")
                         except Exception:
                             pass
+                        # Keep the rest of the stopped tool's output (e.g. get_node_details
+                        # `details`) so the model does not have to call the tool again
+                        tool_text = {k: v for k, v in parsed.items() if k != "images"}
+                        context_texts = None
+                        if set(tool_text) - {"success"}:
+                            context_texts = [
+                                "Output of the tool call that returned the attached image(s), images omitted:\n"
+                                + json.dumps(tool_text, ensure_ascii=False)
+                            ]
                         await self._stream_response_async(
                             user_prompt,
                             images_data_urls=trimmed,
                             add_user_to_store=False,
                             depth=depth + 1,
+                            context_texts=context_texts,
                         )
                         ran_followup = True
                     else:
@@ -866,7 +1027,7 @@ class FigmaAgent:
             # Cancel pending tool calls, if any
             if self.communicator:
                 try:
-                    self.communicator.cleanup_pending_requests()
+                    self.communicator.cleanup_pending_requests(reason=reason or "cancel_active_operations")
                 except Exception as e:
                     logger.warning(f"Failed to cleanup pending tool requests: {e}")
     
@@ -963,7 +1124,7 @@ class FigmaAgent:
         
         # Clean up communicator
         if self.communicator:
-            self.communicator.cleanup_pending_requests()
+            self.communicator.cleanup_pending_requests(reason="shutdown")
             logger.info("Cleaned up pending tool calls")
         
         if self.websocket:
@@ -0,0 +1,381 @@
+"""
+Scene Index - Mirrored scene graph per channel
+
+This module keeps a partial, incrementally updated mirror of the Figma document
+(id -> parent, type, name, style ids, component linkage) on the agent side. It is
+populated from tool results that pass through the communicator, so discovery
+questions the plugin has already answered (ancestry, hierarchy, style consumers,
+repeated find_nodes queries) can be served locally without another walk of
+Figma's tree on the plugin main thread.
+
+Entries are trusted for `ttl_seconds` and are invalidated by our own mutations
+and by plugin change events. Anything not fully known is a miss and goes to the
+plugin as before.
+"""
+
+import copy
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Commands that never change the document
+READ_ONLY_COMMANDS = {
+    "get_canvas_snapshot",
+    "find_nodes",
+    "get_node_details",
+    "get_image_of_node",
+    "get_node_ancestry",
+    "get_node_hierarchy",
+    "get_document_styles",
+    "get_style_consumers",
+    "get_document_components",
+    "scroll_and_zoom_into_view",
+    "show_notification",
+    "commit_undo_step",
+    "preload_fonts",
+    "flush_reveal",
+}
+
+# Mutations that only change properties of the listed nodes; everything else
+# (create, delete, clone, reparent, reorder, ...) may change the tree shape.
+PROPERTY_COMMANDS = {
+    "set_fills",
+    "set_strokes",
+    "set_corner_radius",
+    "set_size",
+    "set_position",
+    "set_layer_properties",
+    "set_effects",
+    "set_auto_layout",
+    "set_auto_layout_child",
+    "set_constraints",
+    "set_text_characters",
+    "set_text_style",
+    "set_multiple_text_contents",
+    "set_annotations",
+    "set_instance_properties",
+    "apply_style",
+    "bind_variable_to_property",
+}
+
+STYLE_ID_KEYS = ("fillStyleId", "strokeStyleId", "effectStyleId", "textStyleId")
+
+# Plugin node-change properties that touch what the index stores
+INDEXED_PROPERTIES = {"name", "type", "mainComponent", *STYLE_ID_KEYS}
+
+
+@dataclass
+class IndexedNode:
+    """What we know about one node. `None` means unknown, not absent."""
+
+    id: str
+    name: Optional[str] = None
+    type: Optional[str] = None
+    parent_id: Optional[str] = None
+    parent_known: bool = False
+    has_children: Optional[bool] = None
+    children_ids: Optional[List[str]] = None
+    style_ids: Dict[str, str] = field(default_factory=dict)
+    main_component_id: Optional[str] = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def basic_summary(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name, "type": self.type, "has_children": bool(self.has_children)}
+
+
+class SceneIndex:
+    """Partial mirror of the document, answering read-only commands on hits."""
+
+    def __init__(self, ttl_seconds: float = 30.0, max_nodes: int = 200_000, max_queries: int = 64) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_nodes = max_nodes
+        self.max_queries = max_queries
+        self._nodes: Dict[str, IndexedNode] = {}
+        # Whole answers keyed by (command, canonical params) -> (stored_at, result)
+        self._queries: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "ingested": 0, "invalidations": 0}
+
+    # Public API
+    def lookup(self, command: str, params: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """Return a locally computed result for `command`, or None on a miss."""
+        params = params or {}
+        result: Optional[Any] = None
+        if command == "get_node_ancestry":
+            result = self._answer_ancestry(params.get("node_id"))
+        elif command == "get_node_hierarchy":
+            result = self._answer_hierarchy(params.get("node_id"))
+        elif command in ("get_style_consumers", "find_nodes") and self._memoizable(command, params):
+            result = self._query_hit(command, params)
+        else:
+            return None
+        self.stats["hits" if result is not None else "misses"] += 1
+        return result
+
+    def ingest(self, command: str, params: Optional[Dict[str, Any]], result: Any) -> None:
+        """Learn from a successful plugin result and apply our own mutations."""
+        params = params or {}
+        try:
+            if command not in READ_ONLY_COMMANDS:
+                self._apply_mutation(command, params, result)
+                return
+            if not isinstance(result, dict):
+                return
+            if command == "get_node_ancestry":
+                self._ingest_ancestry(params.get("node_id"), result.get("ancestors"))
+            elif command == "get_node_hierarchy":
+                self._ingest_hierarchy(params.get("node_id"), result.get("parent_summary"), result.get("children"))
+            elif command == "get_node_details":
+                self._ingest_details(result.get("details"))
+            elif command == "get_style_consumers":
+                for entry in result.get("consuming_nodes") or []:
+                    if isinstance(entry, dict):
+                        self._upsert_summary(entry.get("node"))
+            elif command == "find_nodes":
+                for summary in result.get("matching_nodes") or []:
+                    self._upsert_summary(summary)
+            if command in ("get_style_consumers", "find_nodes") and self._memoizable(command, params):
+                self._store_query(command, params, result)
+            self._enforce_bounds()
+        except Exception as e:
+            logger.debug(f"🗂️ Scene index ingest skipped for {command}: {e}")
+
+    def forget(self, node_ids: Iterable[str]) -> None:
+        """Drop entries for nodes reported missing or changed."""
+        for node_id in node_ids:
+            if isinstance(node_id, str):
+                self._nodes.pop(node_id, None)
+        self._queries.clear()
+        self.stats["invalidations"] += 1
+
+    def apply_document_changes(self, batch: Dict[str, Any]) -> None:
+        """Invalidate entries named in a plugin `document_change` batch.
+
+        Whole-page batches (overflow or page switch) clear everything. Created,
+        deleted or reparented nodes drop the affected children lists; property
+        changes drop the node only when an indexed property changed. Any node
+        change voids memoized query answers.
+        """
+        if batch.get("overflow") or batch.get("page_changed"):
+            self.clear()
+            return
+        changes = [c for c in batch.get("changes") or [] if isinstance(c, dict) and isinstance(c.get("id"), str)]
+        if not changes:
+            return
+        self._queries.clear()
+        for change in changes:
+            node_id = change["id"]
+            kinds = set(change.get("kinds") or [])
+            properties = set(change.get("properties") or [])
+            structural = bool(kinds & {"CREATE", "DELETE"}) or "parent" in properties
+            node = self._nodes.get(node_id)
+            if structural:
+                parent = self._nodes.get(node.parent_id) if node is not None and node.parent_id else None
+                if kinds == {"DELETE"} and parent is not None:
+                    parent.children_ids = None
+                else:
+                    # The (new) parent is unknown: any cached children list may now be wrong
+                    for entry in self._nodes.values():
+                        entry.children_ids = None
+                self._nodes.pop(node_id, None)
+            elif node is not None and (not properties or properties & INDEXED_PROPERTIES):
+                self._nodes.pop(node_id, None)
+        self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._nodes.clear()
+        self._queries.clear()
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "nodes": len(self._nodes), "queries": len(self._queries)}
+
+    # Lookups
+    def _fresh(self, entry: Optional[IndexedNode], now: float) -> bool:
+        return entry is not None and (now - entry.updated_at) <= self.ttl_seconds
+
+    def _answer_ancestry(self, node_id: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(node_id, str):
+            return None
+        now = time.monotonic()
+        node = self._nodes.get(node_id)
+        if not self._fresh(node, now) or not node.parent_known:
+            return None
+        ancestors: List[Dict[str, Any]] = []
+        current_id = node.parent_id
+        while current_id:
+            current = self._nodes.get(current_id)
+            if not self._fresh(current, now) or current.type is None:
+                return None
+            ancestors.append(current.basic_summary())
+            if current.type == "PAGE":
+                return {"ancestors": ancestors}
+            if not current.parent_known:
+                return None
+            current_id = current.parent_id
+        return None
+
+    def _answer_hierarchy(self, node_id: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(node_id, str):
+            return None
+        now = time.monotonic()
+        node = self._nodes.get(node_id)
+        if not self._fresh(node, now) or not node.parent_known or node.children_ids is None:
+            return None
+        parent_summary = None
+        if node.parent_id:
+            parent = self._nodes.get(node.parent_id)
+            if not self._fresh(parent, now) or parent.type is None:
+                return None
+            parent_summary = parent.basic_summary()
+        children: List[Dict[str, Any]] = []
+        for child_id in node.children_ids:
+            child = self._nodes.get(child_id)
+            if not self._fresh(child, now) or child.type is None or child.has_children is None:
+                return None
+            children.append(child.basic_summary())
+        return {"parent_summary": parent_summary, "children": children}
+
+    @staticmethod
+    def _memoizable(command: str, params: Dict[str, Any]) -> bool:
+        # Cursor continuations are stateful on the plugin side; streamed results arrive in partials;
+        # highlight_results asks for a canvas side effect a cached answer would skip
+        return not (command == "find_nodes" and (params.get("cursor") or params.get("stream") or params.get("highlight_results")))
+
+    @staticmethod
+    def _query_key(command: str, params: Dict[str, Any]) -> Tuple[str, str]:
+        return command, json.dumps(params, sort_keys=True, default=str)
+
+    def _query_hit(self, command: str, params: Dict[str, Any]) -> Optional[Any]:
+        key = self._query_key(command, params)
+        stored = self._queries.get(key)
+        if stored is None:
+            return None
+        stored_at, result = stored
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self._queries.pop(key, None)
+            return None
+        return copy.deepcopy(result)
+
+    def _store_query(self, command: str, params: Dict[str, Any], result: Any) -> None:
+        if len(self._queries) >= self.max_queries:
+            oldest = min(self._queries.items(), key=lambda kv: kv[1][0])[0]
+            self._queries.pop(oldest, None)
+        self._queries[self._query_key(command, params)] = (time.monotonic(), copy.deepcopy(result))
+
+    # Ingestion
+    def _entry(self, node_id: str) -> IndexedNode:
+        entry = self._nodes.get(node_id)
+        if entry is None:
+            entry = IndexedNode(id=node_id)
+            self._nodes[node_id] = entry
+        entry.updated_at = time.monotonic()
+        return entry
+
+    def _upsert_summary(self, summary: Any) -> Optional[IndexedNode]:
+        if not isinstance(summary, dict) or not isinstance(summary.get("id"), str):
+            return None
+        entry = self._entry(summary["id"])
+        if "name" in summary:
+            entry.name = summary.get("name")
+        if "type" in summary:
+            entry.type = summary.get("type")
+        if "has_children" in summary:
+            entry.has_children = bool(summary.get("has_children"))
+        if "parent_id" in summary:
+            entry.parent_id = summary.get("parent_id")
+            entry.parent_known = True
+        self.stats["ingested"] += 1
+        return entry
+
+    def _set_parent(self, child_id: str, parent_id: Optional[str]) -> None:
+        entry = self._entry(child_id)
+        entry.parent_id = parent_id
+        entry.parent_known = True
+
+    def _ingest_ancestry(self, node_id: Any, ancestors: Any) -> None:
+        if not isinstance(node_id, str) or not isinstance(ancestors, list):
+            return
+        chain = [a for a in ancestors if isinstance(a, dict) and isinstance(a.get("id"), str)]
+        previous = node_id
+        for summary in chain:
+            self._upsert_summary(summary)
+            self._set_parent(previous, summary["id"])
+            previous = summary["id"]
+
+    def _ingest_hierarchy(self, node_id: Any, parent_summary: Any, children: Any) -> None:
+        if not isinstance(node_id, str):
+            return
+        parent = self._upsert_summary(parent_summary)
+        self._set_parent(node_id, parent.id if parent else None)
+        if isinstance(children, list):
+            child_ids: List[str] = []
+            for summary in children:
+                child = self._upsert_summary(summary)
+                if child is not None:
+                    self._set_parent(child.id, node_id)
+                    child_ids.append(child.id)
+            node = self._entry(node_id)
+            node.children_ids = child_ids
+            node.has_children = len(child_ids) > 0
+
+    def _ingest_details(self, details: Any) -> None:
+        if not isinstance(details, dict):
+            return
+        for node_id, entry_data in details.items():
+            if not isinstance(entry_data, dict):
+                continue
+            target = entry_data.get("target_node")
+            node = self._upsert_summary(target) if isinstance(target, dict) else self._entry(node_id)
+            if node is None:
+                continue
+            if isinstance(target, dict):
+                for key in STYLE_ID_KEYS:
+                    if isinstance(target.get(key), str):
+                        node.style_ids[key] = target[key]
+                main = (target.get("component_meta") or {}).get("mainComponent") if isinstance(target.get("component_meta"), dict) else None
+                if isinstance(main, dict) and isinstance(main.get("id"), str):
+                    node.main_component_id = main["id"]
+            if "parent_summary" in entry_data:
+                parent = self._upsert_summary(entry_data.get("parent_summary"))
+                self._set_parent(node.id, parent.id if parent else None)
+            children = entry_data.get("children_summaries")
+            if isinstance(children, list):
+                child_ids = []
+                for summary in children:
+                    child = self._upsert_summary(summary)
+                    if child is not None:
+                        self._set_parent(child.id, node.id)
+                        child_ids.append(child.id)
+                node.children_ids = child_ids
+
+    def _apply_mutation(self, command: str, params: Dict[str, Any], result: Any = None) -> None:
+        if command in PROPERTY_COMMANDS:
+            ids: List[str] = []
+            if params.get("selector") is not None:
+                # Targets were resolved in the plugin; only the result names them
+                if not isinstance(result, dict) or not isinstance(result.get("modified_node_ids"), list):
+                    self.clear()
+                    return
+                ids.extend(result["modified_node_ids"])
+            if isinstance(params.get("node_ids"), list):
+                ids.extend(params["node_ids"])
+            if isinstance(params.get("node_id"), str):
+                ids.append(params["node_id"])
+            for entry in (params.get("replacements") or []) + (params.get("annotations") or []):
+                if isinstance(entry, dict):
+                    ids.append(entry.get("node_id"))
+            self.forget(ids)
+        else:
+            self.clear()
+
+    def _enforce_bounds(self) -> None:
+        if len(self._nodes) <= self.max_nodes:
+            return
+        # Evict the stalest quarter in one pass
+        by_age = sorted(self._nodes.values(), key=lambda n: n.updated_at)
+        for entry in by_age[: len(by_age) // 4]:
+            self._nodes.pop(entry.id, None)
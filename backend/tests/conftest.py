@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other as top-level modules (e.g. `from conversation import ...`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,44 @@
+import re
+
+from conversation import ToolOutputCompactor
+
+
+def _find_nodes_rows(count):
+    return [
+        {
+            "id": f"1:{i}",
+            "name": f"Button {i}",
+            "type": "FRAME",
+            "absolute_bounding_box": {"x": i * 10, "y": 0, "width": 120, "height": 40},
+            "children": ["a", "b", "c", "d", "e", "f"],
+        }
+        for i in range(count)
+    ]
+
+
+def test_truncate_arrays_drops_whole_table_rows():
+    compactor = ToolOutputCompactor()
+    out = compactor.encode_tables({"matching_nodes": _find_nodes_rows(40), "total_count": 40}, "find_nodes")
+    table = out["matching_nodes"]
+    width = len(table["columns"])
+    notes = {"elided_base64": 0, "dropped_fields": 0, "truncated_arrays": []}
+
+    compactor._truncate_arrays(out, notes, budget=100)
+
+    assert len(table["columns"]) == width
+    assert 0 < len(table["rows"]) < 40
+    assert all(len(row) == width for row in table["rows"])
+    paths = [t["path"] for t in notes["truncated_arrays"]]
+    assert "matching_nodes.rows" in paths
+    # Lists inside cells may shrink; the columns list and the row lists never do
+    assert not any(p.endswith(".columns") or re.fullmatch(r"matching_nodes\.rows\[\d+\]", p) for p in paths)
+
+
+def test_compact_keeps_table_rows_aligned_under_budget():
+    compactor = ToolOutputCompactor(default_budget_tokens=100)
+    compactor.TOOL_BUDGETS = {}
+    out = compactor.compact({"matching_nodes": _find_nodes_rows(40), "total_count": 40}, "find_nodes")
+    table = out["matching_nodes"]
+
+    assert all(len(row) == len(table["columns"]) for row in table["rows"])
+    assert out["_compaction"]["truncated_arrays"][0]["path"] == "matching_nodes.rows"
@@ -0,0 +1,159 @@
+"""
+Tool Guides - Compact tool descriptions with on-demand full guidance
+
+The figma_tools docstrings (purpose, parameters, error codes, guidance and
+examples) become the tool descriptions the model receives, and every tool
+description is resent with every model call. At agent build time this module
+replaces each long description with a compact one (summary line plus one line
+per parameter) and keeps the full docstring here, served on demand by the
+`get_tool_guide` tool.
+
+Run `python backend/tool_guides.py` for a before/after size report; it parses
+figma_tools.py statically and does not need the agent runtime installed.
+"""
+
+import ast
+import inspect
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Descriptions at or under this size are already compact and are left alone
+COMPACT_MIN_CHARS = 600
+
+# Per-parameter hint length in the compact description
+PARAM_HINT_MAX_CHARS = 140
+
+# An entry line that holds only a type ("List[str] | None"); the hint starts below it
+_TYPE_ONLY = re.compile(r"^(?:[A-Za-z_][\w.]*(?:\[[^\]]*\])?)(?:\s*\|\s*[A-Za-z_][\w.]*(?:\[[^\]]*\])?)*$")
+
+# Headers that open the parameter section in the figma_tools docstring styles
+_PARAM_SECTION = re.compile(r"^\s*(?:#+\s*)?(?:parameters|input parameters|args)\b", re.IGNORECASE)
+
+# Full docstrings by tool name (filled by compact_tool_descriptions)
+_guides: Dict[str, str] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, the same heuristic the ConversationStore uses."""
+    return max(1, int(len(text) / 4)) if text else 0
+
+
+def _param_hint(lines: List[str], name: str) -> Optional[str]:
+    """First sentence documenting `name`, from its entry line and its indented continuation."""
+    entry = re.compile(r"^(\s*)(?:[-*]\s*)?`?" + re.escape(name) + r"`?\s*(?:\([^)]*\))?\s*:\s*(.*)$")
+    for i, line in enumerate(lines):
+        match = entry.match(line)
+        if not match:
+            continue
+        indent = len(match.group(1))
+        rest = match.group(2).strip()
+        parts = [] if _TYPE_ONLY.match(rest) and ("[" in rest or "|" in rest) else [rest]
+        for follow in lines[i + 1:]:
+            if not follow.strip() or len(follow) - len(follow.lstrip()) <= indent:
+                break
+            parts.append(follow.strip().lstrip("-* ").strip())
+        text = " ".join(p for p in parts if p)
+        sentence = re.split(r"(?<!e\.g\.)(?<!i\.e\.)(?<=[.!?])\s", text, maxsplit=1)[0]
+        if len(sentence) > PARAM_HINT_MAX_CHARS:
+            sentence = sentence[: PARAM_HINT_MAX_CHARS - 1].rstrip() + "…"
+        return sentence or None
+    return None
+
+
+def compact_description(name: str, doc: str, param_names: Sequence[str], skip_params: Iterable[str] = ()) -> str:
+    """Summary line, one hint per parameter and a pointer to `get_tool_guide`."""
+    doc = inspect.cleandoc(doc or "")
+    lines = doc.splitlines()
+    summary = next((line.strip() for line in lines if line.strip()), name)
+
+    start = next((i + 1 for i, line in enumerate(lines) if _PARAM_SECTION.match(line)), 0)
+    section = lines[start:]
+    skip = set(skip_params)
+    hints: List[str] = []
+    for param in param_names:
+        if param in skip:
+            continue
+        hint = _param_hint(section, param) or _param_hint(lines, param)
+        if hint:
+            hints.append(f"- {param}: {hint}")
+
+    parts = [summary]
+    if hints:
+        parts.append("Params:\n" + "\n".join(hints))
+    parts.append(f'Errors, return shape and usage guidance: get_tool_guide("{name}").')
+    return "\n".join(parts)
+
+
+def compact_tool_descriptions(tools: Sequence[Any]) -> Tuple[int, int]:
+    """Swap long tool descriptions for compact ones in place; returns (chars_before, chars_after).
+
+    Parameters whose JSON schema already carries a description are not repeated.
+    """
+    before = after = 0
+    for tool in tools:
+        name = getattr(tool, "name", None)
+        description = getattr(tool, "description", None)
+        if not name or not isinstance(description, str):
+            continue
+        before += len(description)
+        if len(description) <= COMPACT_MIN_CHARS:
+            after += len(description)
+            continue
+        properties = (getattr(tool, "params_json_schema", None) or {}).get("properties") or {}
+        described = [p for p, schema in properties.items() if isinstance(schema, dict) and schema.get("description")]
+        compact = compact_description(name, description, list(properties), described)
+        _guides[name] = inspect.cleandoc(description)
+        try:
+            tool.description = compact
+        except Exception as e:
+            logger.warning(f"⚠️ Could not compact description of {name}: {e}")
+            _guides.pop(name, None)
+            after += len(description)
+            continue
+        after += len(compact)
+    return before, after
+
+
+def get_guide(tool_name: str) -> Optional[str]:
+    """Full docstring of a compacted tool, or None."""
+    return _guides.get(tool_name)
+
+
+def guide_names() -> List[str]:
+    """Names of the tools with a full guide available."""
+    return sorted(_guides)
+
+
+def _report(figma_tools_path: str) -> None:
+    """Print per-tool description sizes of figma_tools.py before and after compaction."""
+    with open(figma_tools_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    rows: List[Tuple[str, int, int]] = []
+    for node in tree.body:
+        if not isinstance(node, ast.AsyncFunctionDef) or node.name.startswith("_"):
+            continue
+        if not any("function_tool" in ast.unparse(d) for d in node.decorator_list):
+            continue
+        doc = inspect.cleandoc(ast.get_docstring(node) or "")
+        params = [a.arg for a in node.args.args + node.args.kwonlyargs]
+        compact = doc if len(doc) <= COMPACT_MIN_CHARS else compact_description(node.name, doc, params)
+        rows.append((node.name, estimate_tokens(doc), estimate_tokens(compact)))
+
+    width = max((len(r[0]) for r in rows), default=4)
+    print(f"{'tool'.ljust(width)}  {'before':>7}  {'after':>6}")
+    for name, full, compact in sorted(rows, key=lambda r: -r[1]):
+        print(f"{name.ljust(width)}  {full:>7}  {compact:>6}")
+    total_before = sum(r[1] for r in rows)
+    total_after = sum(r[2] for r in rows)
+    saved = 100 * (total_before - total_after) / total_before if total_before else 0
+    print(f"{'TOTAL'.ljust(width)}  {total_before:>7}  {total_after:>6}  (-{saved:.0f}% description tokens per model call, {len(rows)} tools)")
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    _report(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "figma_tools.py"))
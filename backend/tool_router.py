@@ -0,0 +1,269 @@
+"""
+Tool Router - Per-turn tool subsetting
+
+Every enabled tool (name, parameter schema and its docstring as description) is
+sent with every model call of a run, so the full figma_tools catalogue is a
+fixed input-token tax on each step. This module picks the tools a turn is likely
+to need from the user prompt, the selection snapshot and the tools used in the
+last few turns, and always adds `load_more_tools`, through which the model can
+pull in any missing group mid-run.
+
+The selected list is handed to `agent.clone(tools=...)` for the turn. The SDK
+re-reads `agent.tools` before every model call, so tools that `load_more_tools`
+appends to that list are callable from the model's next step on.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from agents import function_tool
+from figma_communicator import ToolExecutionError
+
+logger = logging.getLogger(__name__)
+
+# Always offered: orientation, inspection and the most common edits, including
+# the tools the system prompt asks for on every frame-building turn
+CORE_TOOLS: Tuple[str, ...] = (
+    "get_canvas_snapshot",
+    "find_nodes",
+    "get_node_details",
+    "get_image_of_node",
+    "get_node_ancestry",
+    "get_node_hierarchy",
+    "create_frame",
+    "create_text",
+    "set_fills",
+    "set_size",
+    "set_position",
+    "set_layer_properties",
+    "set_auto_layout",
+    "set_auto_layout_child",
+    "set_text_characters",
+    "set_multiple_text_contents",
+    "apply_edit_plan",
+    "delete_nodes",
+    "scroll_and_zoom_into_view",
+    "set_reveal_policy",
+    "get_tool_guide",
+)
+
+TOOL_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "style": ("set_strokes", "set_corner_radius", "set_effects", "get_document_styles", "get_style_consumers", "create_style", "apply_style"),
+    "layout": ("set_constraints", "set_child_index"),
+    "text": ("set_text_style",),
+    "structure": ("clone_nodes", "reparent_nodes", "reorder_nodes"),
+    "components": ("get_document_components", "create_component_from_node", "create_component_instance", "set_instance_properties", "detach_instance"),
+    "variables": ("create_variable_collection", "create_variable", "set_variable_value", "bind_variable_to_property"),
+    "annotations": ("set_annotations", "create_connections"),
+    "utility": ("show_notification", "commit_undo_step"),
+}
+
+# Prompt keywords that pull in a group (matched case-insensitively at word starts)
+GROUP_KEYWORDS: Dict[str, re.Pattern] = {
+    group: re.compile(r"\b(?:" + pattern + r")", re.IGNORECASE)
+    for group, pattern in {
+        "style": r"style|stroke|border|outline|radius|radii|corner|round|shadow|blur|effect|elevation|glass|design system|consisten",
+        "layout": r"layout|align|padding|spacing|gap|constraint|responsive|resiz|stack|fill container|hug|grow|stretch|order",
+        "text": r"text|font|typograph|heading|title|label|copy|bold|italic|underline|uppercase|line height|letter",
+        "structure": r"duplicat|clone|copy|move|group|nest|wrap|reorder|bring to|send to|to front|to back|forward|backward|hierarch|parent|child|layer",
+        "components": r"component|instance|variant|override|swap|detach|library",
+        "variables": r"variable|token|modes?\b|theme|dark mode|light mode|bind",
+        "annotations": r"annotat|handoff|hand-off|spec|redline|note|connect|arrow|flow|diagram|journey|sticky",
+        "utility": r"notif|toast|undo|checkpoint",
+    }.items()
+}
+
+# Selection node types (selection_summary.types_count) that pull in a group
+SNAPSHOT_TYPE_GROUPS: Dict[str, str] = {
+    "TEXT": "text",
+    "INSTANCE": "components",
+    "COMPONENT": "components",
+    "COMPONENT_SET": "components",
+    "STICKY": "annotations",
+    "CONNECTOR": "annotations",
+    "SHAPE_WITH_TEXT": "annotations",
+}
+
+# How many past turns of tool usage keep their tools offered
+RECENT_TURNS = 3
+
+LOAD_ALL = "all"
+
+
+def _schema_chars(tool: Any) -> int:
+    """Approximate size of what the model receives for one tool (description + parameter schema)."""
+    try:
+        return len(getattr(tool, "name", "")) + len(getattr(tool, "description", "") or "") + len(json.dumps(getattr(tool, "params_json_schema", {}) or {}))
+    except Exception:
+        return 0
+
+
+class ToolRouter:
+    """Chooses the tool subset for each turn and extends it on `load_more_tools` calls.
+
+    Tools that no group claims are always offered, so a newly added tool is never
+    unreachable just because the routing tables were not updated.
+    """
+
+    def __init__(self, tools: Sequence[Any], enabled: bool = True):
+        self.tools: Dict[str, Any] = {}
+        for tool in tools:
+            name = getattr(tool, "name", None)
+            if name and name not in self.tools:
+                self.tools[name] = tool
+        self.enabled = enabled
+        grouped: Set[str] = set(CORE_TOOLS).union(*TOOL_GROUPS.values())
+        self.ungrouped: List[str] = [name for name in self.tools if name not in grouped]
+        missing = sorted(name for name in grouped if name not in self.tools)
+        if missing:
+            logger.warning(f"⚠️ Tool routing tables name unknown tools: {', '.join(missing)}")
+        self._recent: List[Set[str]] = []
+        self._turn_used: Set[str] = set()
+        self._active: Optional[List[Any]] = None
+
+    # Public API
+    def select(self, prompt: Optional[str], snapshot: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Return this turn's tool list; `load_more_tools` may extend the same list object."""
+        if not self.enabled:
+            groups = set(TOOL_GROUPS)
+        else:
+            groups = self._groups_for_prompt(prompt or "") | self._groups_for_snapshot(snapshot)
+        names: Set[str] = set(CORE_TOOLS) | set(self.ungrouped)
+        for group in groups:
+            names.update(TOOL_GROUPS.get(group, ()))
+        for used in self._recent:
+            names.update(used)
+
+        self._active = [tool for name, tool in self.tools.items() if name in names]
+        if self.enabled:
+            self._active.append(load_more_tools)
+            selected = sum(_schema_chars(t) for t in self._active)
+            total = sum(_schema_chars(t) for t in self.tools.values())
+            logger.info(
+                f"🧭 Tool routing: {len(self._active)}/{len(self.tools)} tools, groups={sorted(groups) or '-'}, "
+                f"schema≈{selected // 4} tokens (all≈{total // 4})"
+            )
+        return self._active
+
+    def load(self, names: Iterable[str]) -> Dict[str, Any]:
+        """Add groups (or individual tools) to the active turn's tool list."""
+        if self._active is None:
+            raise ToolExecutionError({"code": "no_active_turn", "message": "No turn is running; tools cannot be loaded now", "details": {}})
+        requested = [str(n).strip() for n in names or [] if str(n).strip()]
+        if any(n.lower() == LOAD_ALL for n in requested):
+            requested = list(TOOL_GROUPS)
+        active_names = {getattr(t, "name", None) for t in self._active}
+        loaded: List[str] = []
+        unknown: List[str] = []
+        for entry in requested:
+            group = entry.lower()
+            if group in TOOL_GROUPS:
+                candidates: Tuple[str, ...] = TOOL_GROUPS[group]
+            elif entry in self.tools:
+                candidates = (entry,)
+            else:
+                unknown.append(entry)
+                continue
+            for name in candidates:
+                if name in self.tools and name not in active_names:
+                    self._active.append(self.tools[name])
+                    active_names.add(name)
+                    loaded.append(name)
+        logger.info(f"🧭 load_more_tools: loaded={loaded or '-'} unknown={unknown or '-'}")
+        return {"success": True, "loaded_tools": loaded, "unknown": unknown, "available_groups": self.describe_groups()}
+
+    def note_used(self, tool_name: Optional[str]) -> None:
+        """Record a tool call of the running turn (kept offered for RECENT_TURNS turns)."""
+        if tool_name and tool_name in self.tools:
+            self._turn_used.add(tool_name)
+
+    def finish_turn(self) -> None:
+        """Close the running turn: fold its tool usage into the recent history."""
+        if self._turn_used:
+            self._recent.append(self._turn_used)
+            self._recent = self._recent[-RECENT_TURNS:]
+        self._turn_used = set()
+        self._active = None
+
+    def reset(self) -> None:
+        """Forget tool usage history (new chat)."""
+        self._recent = []
+        self._turn_used = set()
+
+    def describe_groups(self) -> Dict[str, List[str]]:
+        """Group name -> tool names, as offered to the model by `load_more_tools`."""
+        return {group: [n for n in names if n in self.tools] for group, names in TOOL_GROUPS.items()}
+
+    # Internals
+    @staticmethod
+    def _groups_for_prompt(prompt: str) -> Set[str]:
+        return {group for group, pattern in GROUP_KEYWORDS.items() if pattern.search(prompt)}
+
+    @staticmethod
+    def _groups_for_snapshot(snapshot: Optional[Dict[str, Any]]) -> Set[str]:
+        if not isinstance(snapshot, dict):
+            return set()
+        summary = snapshot.get("selection_summary")
+        if not isinstance(summary, dict):
+            return set()
+        groups: Set[str] = set()
+        types_count = summary.get("types_count")
+        if isinstance(types_count, dict):
+            groups.update(SNAPSHOT_TYPE_GROUPS[t] for t in types_count if t in SNAPSHOT_TYPE_GROUPS)
+        hints = summary.get("hints")
+        if isinstance(hints, dict):
+            if hints.get("has_instances") or hints.get("has_variants"):
+                groups.add("components")
+            if hints.get("has_auto_layout"):
+                groups.add("layout")
+            if hints.get("sticky_note_count"):
+                groups.add("annotations")
+        return groups
+
+
+# Global router instance (will be set by main.py)
+_router: Optional[ToolRouter] = None
+
+def set_router(router: ToolRouter) -> None:
+    """Set the global tool router instance."""
+    global _router
+    _router = router
+
+def get_router() -> ToolRouter:
+    """Get the global tool router instance."""
+    if _router is None:
+        raise RuntimeError("Tool router not initialized. Call set_router() first.")
+    return _router
+
+
+async def load_more_tools(names: List[str]) -> str:
+    try:
+        result = get_router().load(names)
+        return json.dumps(result, ensure_ascii=False)
+    except ToolExecutionError:
+        logger.error("❌ Tool load_more_tools raised ToolExecutionError")
+        raise
+    except Exception as e:
+        logger.error(f"❌ System error in load_more_tools: {str(e)}")
+        raise ToolExecutionError({"code": "unknown_error", "message": f"Failed to load tools: {str(e)}", "details": {"names": names}})
+
+
+load_more_tools.__doc__ = """Make more tools available for the rest of this turn.
+
+    Only the tools relevant to this request are offered. When the tool you need
+    is missing, call this with one or more group names (or exact tool names) and
+    use the tool from your next step on. Pass ["all"] to load every group.
+
+    Groups:
+{groups}
+
+    Args:
+        names: Group names or tool names to load.
+
+    Returns:
+        JSON with `loaded_tools` (newly available), `unknown` and `available_groups`.
+    """.format(groups="\n".join(f"        - {group}: {', '.join(names)}" for group, names in TOOL_GROUPS.items()))
+# Decorated after the docstring is filled in: the group list is part of the tool description
+load_more_tools = function_tool(load_more_tools)
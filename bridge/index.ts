@@ -34,7 +34,7 @@ export function assertScrollAndZoomIntoViewParams(input: unknown): asserts input
 
 
 // === Tools: Category 1 - Scoping & Orientation ===
-export interface GetCanvasSnapshotParams { include_images?: boolean }
+export interface GetCanvasSnapshotParams { include_images?: boolean; fields?: string[] }
 export interface BasicNodeSummary { id: string; name: string; type: string; has_children: boolean }
 export interface RichNodeSummary {
   id: string;
@@ -55,6 +55,8 @@ export interface SelectionSummary {
     total_text_chars: number;
   };
   nodes: Array<{ id: string; name: string; type: string }>;
+  // Distinct fonts used by text in the selection (capped); fed to preload_fonts
+  fonts?: Array<{ family: string; style: string }>;
 }
 export interface GetCanvasSnapshotResult {
   page: { id: string; name: string };
@@ -65,7 +67,7 @@ export interface GetCanvasSnapshotResult {
   selection_signature?: string;
   selection_summary?: SelectionSummary;
 }
-export const GetCanvasSnapshotParamsSchema = z.object({ include_images: z.boolean().optional() }).strict();
+export const GetCanvasSnapshotParamsSchema = z.object({ include_images: z.boolean().optional(), fields: z.array(z.string().min(1)).nonempty().optional() }).strict();
 
 export function isGetCanvasSnapshotParams(input: unknown): input is GetCanvasSnapshotParams { try { GetCanvasSnapshotParamsSchema.parse(input); return true; } catch { return false; } }
 export function assertGetCanvasSnapshotParams(input: unknown): asserts input is GetCanvasSnapshotParams { GetCanvasSnapshotParamsSchema.parse(input); }
@@ -78,8 +80,20 @@ export interface FindNodesFilters {
   main_component_id?: string;
   style_id?: string;
 }
-export interface FindNodesParams { filters: FindNodesFilters; scope_node_id?: string | null; highlight_results?: boolean }
-export interface FindNodesResult { matching_nodes: Array<{ id: string; name: string; type: string; has_children: boolean; absolute_bounding_box: { x: number; y: number; width: number; height: number }; auto_layout_mode: string | null }> }
+export interface FindNodesParams { filters: FindNodesFilters; scope_node_id?: string | null; highlight_results?: boolean; limit?: number; offset?: number; cursor?: string; fields?: string[]; stream?: boolean }
+export interface FindNodesResult {
+  matching_nodes: Array<{ id: string; name: string; type: string; has_children: boolean; absolute_bounding_box: { x: number; y: number; width: number; height: number }; auto_layout_mode: string | null }>;
+  total_count: number | null;
+  offset?: number;
+  limit?: number;
+  has_more: boolean;
+  next_cursor: string | null;
+  // Streaming mode: matches arrive as tool_partial batches; these are counters only
+  streamed?: boolean;
+  streamed_count?: number;
+  batches?: number;
+  visited?: number;
+}
 export const FindNodesParamsSchema = z.object({
   filters: z.object({
     name_regex: z.string().optional(),
@@ -90,11 +104,31 @@ export const FindNodesParamsSchema = z.object({
   }).strict(),
   scope_node_id: z.union([z.string(), z.null()]).optional(),
   highlight_results: z.boolean().optional(),
+  limit: z.number().int().positive().max(1000).optional(),
+  offset: z.number().int().min(0).optional(),
+  cursor: z.string().min(1).optional(),
+  fields: z.array(z.string().min(1)).nonempty().optional(),
+  stream: z.boolean().optional(),
 }).strict();
 
-export interface GetNodeDetailsParams { node_ids: string[] }
-export interface GetNodeDetailsResult { details: Record<string, { target_node: any; parent_summary: any | null; children_summaries: any[] }> }
-export const GetNodeDetailsParamsSchema = z.object({ node_ids: z.array(z.string()).nonempty() }).strict();
+// Node selector: bulk mutations may pass `selector` (the find_nodes query shape)
+// instead of `node_ids`; the plugin resolves it without shipping ids through the agent.
+export interface NodeSelector { filters: FindNodesFilters; scope_node_id?: string | null; max_nodes?: number }
+export const NodeSelectorSchema = z.object({
+  filters: FindNodesParamsSchema.shape.filters,
+  scope_node_id: z.union([z.string(), z.null()]).optional(),
+  max_nodes: z.number().int().positive().max(5000).optional(),
+}).strict().refine((s) => Object.keys(s.filters).length > 0 || !!s.scope_node_id, { message: "selector needs at least one filter or a scope_node_id" });
+export const SELECTOR_COMMANDS = new Set<string>([
+  "set_fills", "set_strokes", "set_corner_radius", "set_size", "set_position",
+  "set_layer_properties", "set_effects", "set_auto_layout", "set_auto_layout_child",
+  "set_constraints", "set_text_style", "set_instance_properties", "detach_instance",
+  "apply_style",
+]);
+
+export interface GetNodeDetailsParams { node_ids: string[]; fields?: string[]; include_image?: boolean }
+export interface GetNodeDetailsResult { details: Record<string, { target_node: any; parent_summary?: any | null; children_summaries?: any[] }>; images?: Record<string, string> }
+export const GetNodeDetailsParamsSchema = z.object({ node_ids: z.array(z.string()).nonempty(), fields: z.array(z.string().min(1)).nonempty().optional(), include_image: z.boolean().optional() }).strict();
 
 export interface GetImageOfNodeParams {
   node_ids: string[];
@@ -128,16 +162,17 @@ export interface GetDocumentStylesParams { style_types?: Array<"PAINT"|"TEXT"|"E
 export interface GetDocumentStylesResult { styles: Array<{ id: string; name: string; type: string }> }
 export const GetDocumentStylesParamsSchema = z.object({ style_types: z.array(z.enum(["PAINT","TEXT","EFFECT","GRID"]) ).optional().nullable() }).strict();
 
-export interface GetStyleConsumersParams { style_id: string }
+export interface GetStyleConsumersParams { style_id: string; scope?: "page" | "document" }
 export interface GetStyleConsumersResult { consuming_nodes: Array<{ node: any; fields: string[] }> }
-export const GetStyleConsumersParamsSchema = z.object({ style_id: z.string() }).strict();
+export const GetStyleConsumersParamsSchema = z.object({ style_id: z.string(), scope: z.enum(["page", "document"]).optional() }).strict();
 
 // Observation: Components & Prototyping
 export type PublishedFilter = "all" | "published_only" | "unpublished_only";
-export interface GetDocumentComponentsParams { published_filter?: PublishedFilter }
-export interface GetDocumentComponentsResult { components: Array<{ id: string; component_key: string | null; name: string; type: string; is_published: boolean }> }
+export interface GetDocumentComponentsParams { published_filter?: PublishedFilter; include_instance_counts?: boolean }
+export interface GetDocumentComponentsResult { components: Array<{ id: string; component_key: string | null; name: string; type: string; is_published: boolean; instance_count?: number }>; instance_counts_page_id?: string | null }
 export const GetDocumentComponentsParamsSchema = z.object({
   published_filter: z.enum(["all","published_only","unpublished_only"]).optional(),
+  include_instance_counts: z.boolean().optional(),
 }).strict();
 
 
@@ -200,6 +235,52 @@ export const BindVariableToPropertyParamsSchema = z.object({
   variable_id: z.string().min(1),
 }).strict();
 
+// --- Subcategory 3.11: Annotations & Connections ---
+export interface AnnotationProperty { name: string; value: string }
+export interface AnnotationInput { node_id: string; label_markdown: string; category_id?: string | null; properties?: AnnotationProperty[] | null }
+export interface SetAnnotationsParams { annotations: AnnotationInput[]; mode?: "append" | "replace" }
+export interface SetAnnotationsResult {
+  success: true;
+  summary: string;
+  modified_node_ids: string[];
+  results: Array<{ index: number; node_id: string; success: boolean; error?: { code: string; message: string } }>;
+}
+export const SetAnnotationsParamsSchema = z.object({
+  annotations: z.array(z.object({
+    node_id: z.string().min(1),
+    label_markdown: z.string(),
+    category_id: z.string().min(1).optional().nullable(),
+    properties: z.array(z.object({ name: z.string().min(1), value: z.string() }).strict()).optional().nullable(),
+  }).strict()).nonempty(),
+  mode: z.enum(["append", "replace"]).optional(),
+}).strict();
+
+export interface ConnectionInput { start_node_id: string; end_node_id: string; text?: string | null }
+export interface CreateConnectionsParams { connections: ConnectionInput[] }
+export interface CreateConnectionsResult {
+  success: true;
+  summary: string;
+  created_node_ids: string[];
+  results: Array<{
+    index: number;
+    start_node_id: string;
+    end_node_id: string;
+    success: boolean;
+    method?: "connector" | "line";
+    connector_id?: string;
+    line_id?: string;
+    label_id?: string;
+    error?: { code: string; message: string };
+  }>;
+}
+export const CreateConnectionsParamsSchema = z.object({
+  connections: z.array(z.object({
+    start_node_id: z.string().min(1),
+    end_node_id: z.string().min(1),
+    text: z.string().optional().nullable(),
+  }).strict()).nonempty(),
+}).strict();
+
 // === Tools: Category 3 - Mutation & Creation ===
 // --- Subcategory 3.2: Modify (General Properties) ---
 export interface SetFillsParams { node_ids: string[]; paints: any[] }
@@ -275,6 +356,19 @@ export function assertSetEffectsParams(input: unknown): asserts input is SetEffe
 export interface SetTextCharactersParams { node_id: string; new_characters: string }
 export const SetTextCharactersParamsSchema = z.object({ node_id: z.string().min(1), new_characters: z.string() }).strict();
 
+export interface TextReplacement { node_id: string; text: string }
+export interface SetMultipleTextContentsParams { replacements: TextReplacement[] }
+export interface SetMultipleTextContentsResult {
+  success: true;
+  summary: string;
+  modified_node_ids: string[];
+  results: Array<{ node_id: string; success: boolean; error?: { code: string; message: string } }>;
+  fonts_loaded: number;
+}
+export const SetMultipleTextContentsParamsSchema = z.object({
+  replacements: z.array(z.object({ node_id: z.string().min(1), text: z.string() }).strict()).nonempty(),
+}).strict();
+
 export interface FontName { family: string; style: string }
 export interface SetTextStyleParams {
   node_ids: string[];
@@ -475,6 +569,19 @@ export const ShowNotificationParamsSchema = z
 
 export const CommitUndoStepParamsSchema = z.object({}).strict();
 
+// Reveal policy carried in tool_call `options` ("end_of_turn" defers to flush_reveal)
+export type RevealPolicy = "always" | "end_of_turn" | "never";
+export interface ToolCallOptions { reveal?: RevealPolicy }
+export const ToolCallOptionsSchema = z.object({ reveal: z.enum(["always", "end_of_turn", "never"]).optional() }).strict();
+export const FlushRevealParamsSchema = z.object({}).strict();
+
+// Session font cache warm-up: explicit fonts and/or fonts of TEXT nodes under node_ids
+export interface PreloadFontsParams { fonts?: Array<{ family: string; style: string }>; node_ids?: string[] }
+export const PreloadFontsParamsSchema = z.object({
+  fonts: z.array(z.object({ family: z.string().min(1), style: z.string().min(1) }).strict()).optional(),
+  node_ids: z.array(z.string()).optional(),
+}).strict().refine((d: PreloadFontsParams) => (d.fonts?.length || 0) + (d.node_ids?.length || 0) > 0, { message: "Provide fonts or node_ids" });
+
  
 
 
@@ -496,6 +603,32 @@ export const ReparentNodesParamsSchema = z.object({
   new_parent_id: z.string().min(1),
 }).strict();
 
+// Batch editing: apply_edit_plan
+// Each operation is a regular tool command. String params may reference values
+// produced by an earlier operation that declared `ref`, e.g. "$card.id".
+// `atomic: true` rolls the whole plan back when any operation fails.
+export interface EditPlanOperation { command: string; params?: Record<string, any>; ref?: string }
+export interface ApplyEditPlanParams { operations: EditPlanOperation[]; atomic?: boolean }
+export interface ApplyEditPlanResult {
+  success: true;
+  summary: string;
+  atomic: boolean;
+  refs: Record<string, string | null>;
+  results: Array<{ index: number; command: string; ref?: string; result: any }>;
+  modified_node_ids: string[];
+}
+export const EDIT_PLAN_MAX_OPERATIONS = 100;
+const EDIT_PLAN_EXCLUDED_COMMANDS = new Set(["apply_edit_plan", "commit_undo_step"]);
+const EDIT_PLAN_TOKEN_PATTERN = /^\$([A-Za-z_][A-Za-z0-9_-]*)\.([A-Za-z_][A-Za-z0-9_]*)$/;
+export const ApplyEditPlanParamsSchema = z.object({
+  operations: z.array(z.object({
+    command: z.string().min(1),
+    params: z.record(z.any()).optional(),
+    ref: z.string().regex(/^[A-Za-z_][A-Za-z0-9_-]*$/).optional(),
+  }).strict()).nonempty().max(EDIT_PLAN_MAX_OPERATIONS),
+  atomic: z.boolean().optional(),
+}).strict();
+
 
 // === Config & Constants ===
 const PORT = 3055;
@@ -565,6 +698,8 @@ interface ToolCallMessage {
   id: string;
   command: string;
   params: any;
+  // Per-call execution options; `reveal` overrides the plugin's reveal-after-step behaviour
+  options?: ToolCallOptions;
 }
 
 interface ToolResponseMessage {
@@ -575,6 +710,32 @@ interface ToolResponseMessage {
   // provide `error_structured` for explicit structured errors.
   error?: any;
   error_structured?: any;
+  // Plugin-side execution timings: { exec_start_ms, exec_end_ms, exec_ms, phases, ui_relay_ms }
+  timings?: any;
+}
+// Streamed batch of results for an in-flight tool_call (plugin -> agent)
+interface ToolPartialMessage {
+  type: "tool_partial";
+  id: string;
+  seq?: number;
+  items: any[];
+}
+// Cancellation of an abandoned tool_call (agent -> plugin); honored cooperatively
+interface ToolCancelMessage {
+  type: "tool_cancel";
+  id: string;
+  reason?: string;
+}
+// Coalesced canvas changes (plugin -> agent) used to invalidate agent-side caches
+interface DocumentChangeMessage {
+  type: "document_change";
+  seq?: number;
+  page_id?: string | null;
+  changes: Array<{ id: string; kinds: string[]; properties?: string[] }>;
+  overflow?: boolean;
+  selection_changed?: boolean;
+  page_changed?: boolean;
+  ts?: number;
 }
 // Progress updates from plugin UI to be forwarded to agent
 interface ProgressUpdateMessage {
@@ -584,7 +745,7 @@ interface ProgressUpdateMessage {
   message?: any;
 }
 
-type Message = JoinMessage | NewChatMessage | UserPromptMessage | AgentResponseMessage | AgentResponseChunkMessage | SystemMessage | ErrorMessage | PingMessage | PongMessage | ToolCallMessage | ToolResponseMessage | ProgressUpdateMessage;
+type Message = JoinMessage | NewChatMessage | UserPromptMessage | AgentResponseMessage | AgentResponseChunkMessage | SystemMessage | ErrorMessage | PingMessage | PongMessage | ToolCallMessage | ToolResponseMessage | ToolPartialMessage | ToolCancelMessage | DocumentChangeMessage | ProgressUpdateMessage;
 
 // === Helpers: logging, file I/O, and message utilities ===
 // === Logging & File I/O ===
@@ -698,6 +859,18 @@ function persistToolEventIfNeeded(message: any, senderChannel: string, senderRol
         text: command,
         meta: { id, tool: command, params }
       });
+    } else if (message.type === "tool_cancel") {
+      const m = message as any;
+      const tracked = TOOL_CALL_TRACKER.get(m.id);
+      logToFile({
+        channel: senderChannel,
+        from: senderRole,
+        type: "tool_cancel",
+        text: tracked ? tracked.command : "<unknown_tool>",
+        meta: { id: m.id, tool: tracked ? tracked.command : undefined, reason: m.reason, elapsed_ms: tracked ? Date.now() - tracked.start_ts : undefined }
+      });
+      // The plugin may still answer with a late `cancelled` error; keep the tracker
+      // entry so that response is logged with its full duration.
     } else if (message.type === "tool_response") {
       const m = message as any;
       const id = m.id;
@@ -725,6 +898,14 @@ function persistToolEventIfNeeded(message: any, senderChannel: string, senderRol
         params,
       };
 
+      // Split the bridge-observed round trip into plugin execution vs. transport/relay time
+      if (m.timings && typeof m.timings === "object") {
+        verbose_meta.timings = m.timings;
+        if (typeof duration_ms === "number" && typeof m.timings.exec_ms === "number") {
+          verbose_meta.transit_ms = Math.max(0, duration_ms - m.timings.exec_ms);
+        }
+      }
+
       if (ok) {
         verbose_meta.result = m.result;
       } else {
@@ -1024,6 +1205,7 @@ const TOOL_SCHEMAS: Record<string, any> = {
 
   // Subcategory 3.4: Modify (Text)
   set_text_characters: SetTextCharactersParamsSchema,
+  set_multiple_text_contents: SetMultipleTextContentsParamsSchema,
   set_text_style: SetTextStyleParamsSchema,
 
   // Subcategory 3.5: Hierarchy & Structure
@@ -1051,13 +1233,80 @@ const TOOL_SCHEMAS: Record<string, any> = {
   // Subcategory 3.9: Prototyping
   
 
+  // Subcategory 3.11: Annotations & Connections
+  set_annotations: SetAnnotationsParamsSchema,
+  create_connections: CreateConnectionsParamsSchema,
+
   // Category 4: Meta & Utility
   scroll_and_zoom_into_view: ScrollAndZoomIntoViewParamsSchema,
   delete_nodes: DeleteNodesParamsSchema,
   show_notification: ShowNotificationParamsSchema,
   commit_undo_step: CommitUndoStepParamsSchema,
+  preload_fonts: PreloadFontsParamsSchema,
+  flush_reveal: FlushRevealParamsSchema,
+  apply_edit_plan: ApplyEditPlanParamsSchema,
 };
 
+// Validate a `selector` and return the params as the command schema expects them:
+// a placeholder id list stands in for the ids the plugin resolves from it.
+function selectorPlaceholderParams(command: string, params: any): { params: any; problem: string | null } {
+  if (!params || typeof params !== "object" || params.selector === undefined || params.selector === null) return { params, problem: null };
+  if (!SELECTOR_COMMANDS.has(command)) return { params, problem: `${command} does not accept a selector` };
+  if (params.node_ids !== undefined) return { params, problem: "Provide either node_ids or selector, not both" };
+  try { NodeSelectorSchema.parse(params.selector); }
+  catch (e) { return { params, problem: `selector: ${(e as Error).message}` }; }
+  const { selector: _selector, ...rest } = params;
+  return { params: { ...rest, node_ids: ["<selector>"] }, problem: null };
+}
+
+// Validate every operation of an edit plan against its own command schema.
+// "$ref.key" tokens must name a ref declared by an earlier operation; since
+// their values are only known in the plugin, "$ref.node_ids" stands in for a
+// one-element id list and any other token for a single id string.
+function validateEditPlanOperations(params: ApplyEditPlanParams): string | null {
+  const declared = new Set<string>();
+  for (let i = 0; i < params.operations.length; i++) {
+    const op = params.operations[i];
+    if (EDIT_PLAN_EXCLUDED_COMMANDS.has(op.command)) return `operations[${i}]: '${op.command}' is not allowed inside an edit plan`;
+    const schema = TOOL_SCHEMAS[op.command];
+    if (!schema) return `operations[${i}]: unknown command '${op.command}'`;
+
+    let problem: string | null = null;
+    const placeholder = (value: any, inArray: boolean): any => {
+      if (typeof value === "string") {
+        const m = EDIT_PLAN_TOKEN_PATTERN.exec(value);
+        if (!m) return value;
+        if (!declared.has(m[1]) && !problem) problem = `operations[${i}]: '${value}' references an undeclared ref`;
+        return (m[2] === "node_ids" && !inArray) ? [value] : value;
+      }
+      if (Array.isArray(value)) return value.map((v) => placeholder(v, true));
+      if (value && typeof value === "object") {
+        const out: Record<string, any> = {};
+        for (const [k, v] of Object.entries(value)) out[k] = placeholder(v, false);
+        return out;
+      }
+      return value;
+    };
+    const selected = selectorPlaceholderParams(op.command, placeholder(op.params || {}, false));
+    if (problem) return problem;
+    if (selected.problem) return `operations[${i}] (${op.command}): ${selected.problem}`;
+    const candidate = selected.params;
+    if (op.command === "set_constraints") {
+      candidate.horizontal = normalizeConstraintEnum(candidate.horizontal, "horizontal");
+      candidate.vertical = normalizeConstraintEnum(candidate.vertical, "vertical");
+      if (op.params) { op.params.horizontal = candidate.horizontal; op.params.vertical = candidate.vertical; }
+    }
+    try { schema.parse(candidate); }
+    catch (e) { return `operations[${i}] (${op.command}): ${(e as Error).message}`; }
+
+    if (op.ref) {
+      if (declared.has(op.ref)) return `operations[${i}]: ref '${op.ref}' is declared twice`;
+      declared.add(op.ref);
+    }
+  }
+  return null;
+}
+
 function validateMessage(data: any): data is Message {
   if (!data || typeof data !== "object" || !data.type) {
     return false;
@@ -1100,6 +1349,10 @@ function validateMessage(data: any): data is Message {
       if (!(typeof data.id === "string" && typeof data.command === "string" && data.params !== undefined)) {
         return false;
       }
+      if (data.options !== undefined) {
+        try { ToolCallOptionsSchema.parse(data.options); }
+        catch (e) { log("warn", `Invalid options for ${data.command}`, { error: (e as Error).message }); return false; }
+      }
       // Backwards-compatibility shims and human-synonym normalization
       try {
         if (data.command === "set_constraints" && data.params && typeof data.params === "object") {
@@ -1113,15 +1366,27 @@ function validateMessage(data: any): data is Message {
         }
       } catch (_) {}
 
+      const selected = selectorPlaceholderParams(data.command, data.params);
+      if (selected.problem) { log("warn", `Invalid selector for ${data.command}`, { error: selected.problem }); return false; }
       const schema = TOOL_SCHEMAS[data.command];
       if (schema) {
-        try { schema.parse(data.params); }
+        try { schema.parse(selected.params); }
         catch (e) { log("warn", `Invalid params for ${data.command}`, { error: (e as Error).message }); return false; }
       }
+      if (data.command === "apply_edit_plan") {
+        const problem = validateEditPlanOperations(data.params as ApplyEditPlanParams);
+        if (problem) { log("warn", "Invalid edit plan", { error: problem }); return false; }
+      }
       return true;
     case "tool_response":
       return typeof data.id === "string" &&
              (data.result !== undefined || data.error !== undefined);
+    case "tool_partial":
+      return typeof data.id === "string" && data.id.length > 0 && Array.isArray(data.items);
+    case "tool_cancel":
+      return typeof data.id === "string" && data.id.length > 0;
+    case "document_change":
+      return Array.isArray(data.changes) && data.changes.every((c: any) => c && typeof c.id === "string" && Array.isArray(c.kinds));
     case "progress_update":
       // Allow pass-through progress updates without strict validation
       return true;
@@ -1276,7 +1541,7 @@ function handleJoin(ws: ServerWebSocket<unknown>, message: JoinMessage) {
   });
 }
 
-function handleMessage(ws: ServerWebSocket<unknown>, message: NewChatMessage | UserPromptMessage | AgentResponseMessage | AgentResponseChunkMessage | ToolCallMessage | ToolResponseMessage | ProgressUpdateMessage) {
+function handleMessage(ws: ServerWebSocket<unknown>, message: NewChatMessage | UserPromptMessage | AgentResponseMessage | AgentResponseChunkMessage | ToolCallMessage | ToolResponseMessage | ToolPartialMessage | ToolCancelMessage | DocumentChangeMessage | ProgressUpdateMessage) {
   const membership = findSocketMembership(ws);
   if (!membership) {
     const errorMsg: ErrorMessage = { type: "error", message: "Socket not joined to any channel" };
@@ -1377,7 +1642,7 @@ serve({
         
         if (data.type === "join") {
           handleJoin(ws, data);
-        } else if (data.type === "user_prompt" || data.type === "agent_response" || data.type === "agent_response_chunk" || data.type === "tool_call" || data.type === "tool_response" || data.type === "progress_update" || data.type === "new_chat") {
+        } else if (data.type === "user_prompt" || data.type === "agent_response" || data.type === "agent_response_chunk" || data.type === "tool_call" || data.type === "tool_response" || data.type === "tool_partial" || data.type === "tool_cancel" || data.type === "document_change" || data.type === "progress_update" || data.type === "new_chat") {
           handleMessage(ws, data);
         } else if (data.type === "ping") {
           // Respond to ping with pong
@@ -60,74 +60,88 @@ function registerDefaultCommands() {
   commandsRegistered = true;
 
   // TOOL SET
-  commandRegistry.set("get_canvas_snapshot", (p) => getCanvasSnapshot(p));
+  commandRegistry.set("get_canvas_snapshot", (p, ctx) => getCanvasSnapshot(p, ctx));
 
-  commandRegistry.set("find_nodes", (p) => findNodes(p));
-  commandRegistry.set("get_node_details", (p) => getNodeDetails(p));
-  commandRegistry.set("get_image_of_node", (p) => getImageOfNode(p));
+  commandRegistry.set("find_nodes", (p, ctx) => findNodes(p, ctx));
+  commandRegistry.set("get_node_details", (p, ctx) => getNodeDetails(p, ctx));
+  commandRegistry.set("get_image_of_node", (p, ctx) => getImageOfNode(p, ctx));
   commandRegistry.set("get_node_ancestry", (p) => getNodeAncestry(p));
   commandRegistry.set("get_node_hierarchy", (p) => getNodeHierarchy(p));
   commandRegistry.set("get_document_styles", (p) => getDocumentStyles(p));
-  commandRegistry.set("get_style_consumers", (p) => getStyleConsumers(p));
-  commandRegistry.set("get_document_components", (p) => getDocumentComponents(p));
+  commandRegistry.set("get_style_consumers", (p, ctx) => getStyleConsumers(p, ctx));
+  commandRegistry.set("get_document_components", (p, ctx) => getDocumentComponents(p, ctx));
 
-  commandRegistry.set("create_frame", (p) => createFrame(p));
-  commandRegistry.set("create_text", (p) => createText(p));
+  commandRegistry.set("create_frame", (p, ctx) => createFrame(p, ctx));
+  commandRegistry.set("create_text", (p, ctx) => createText(p, ctx));
 
-  commandRegistry.set("set_fills", (p) => set_fills(p));
-  commandRegistry.set("set_strokes", (p) => set_strokes(p));
-  commandRegistry.set("set_corner_radius", (p) => set_corner_radius(p));
-  commandRegistry.set("set_size", (p) => set_size(p));
-  commandRegistry.set("set_position", (p) => set_position(p));
-  commandRegistry.set("set_layer_properties", (p) => set_layer_properties(p));
-  commandRegistry.set("set_effects", (p) => set_effects(p));
+  commandRegistry.set("set_fills", (p, ctx) => set_fills(p, ctx));
+  commandRegistry.set("set_strokes", (p, ctx) => set_strokes(p, ctx));
+  commandRegistry.set("set_corner_radius", (p, ctx) => set_corner_radius(p, ctx));
+  commandRegistry.set("set_size", (p, ctx) => set_size(p, ctx));
+  commandRegistry.set("set_position", (p, ctx) => setPosition(p, ctx));
+  commandRegistry.set("set_layer_properties", (p, ctx) => set_layer_properties(p, ctx));
+  commandRegistry.set("set_effects", (p, ctx) => set_effects(p, ctx));
 
-  commandRegistry.set("set_auto_layout", (p) => set_auto_layout(p));
-  commandRegistry.set("set_auto_layout_child", (p) => set_auto_layout_child(p));
-  commandRegistry.set("set_constraints", (p) => set_constraints(p));
-  commandRegistry.set("set_child_index", (p) => set_child_index(p));
+  commandRegistry.set("set_auto_layout", (p, ctx) => set_auto_layout(p, ctx));
+  commandRegistry.set("set_auto_layout_child", (p, ctx) => set_auto_layout_child(p, ctx));
+  commandRegistry.set("set_constraints", (p, ctx) => set_constraints(p, ctx));
+  commandRegistry.set("set_child_index", (p, ctx) => set_child_index(p, ctx));
 
-  commandRegistry.set("set_text_characters", (p) => setTextCharacters(p));
-  commandRegistry.set("set_text_style", (p) => setTextStyle(p));
+  commandRegistry.set("set_text_characters", (p, ctx) => setTextCharacters(p, ctx));
+  commandRegistry.set("set_text_style", (p, ctx) => setTextStyle(p, ctx));
+  commandRegistry.set("set_multiple_text_contents", (p, ctx) => setMultipleTextContents(p, ctx));
 
-  commandRegistry.set("clone_nodes", (p) => clone_nodes(p));
-  commandRegistry.set("reparent_nodes", (p) => reparent_nodes(p));
-  commandRegistry.set("reorder_nodes", (p) => reorder_nodes(p));
+  commandRegistry.set("clone_nodes", (p, ctx) => clone_nodes(p, ctx));
+  commandRegistry.set("reparent_nodes", (p, ctx) => reparent_nodes(p, ctx));
+  commandRegistry.set("reorder_nodes", (p, ctx) => reorder_nodes(p, ctx));
 
 
   commandRegistry.set("create_component_from_node", (p) => createComponentFromNode(p));
   commandRegistry.set("create_component_instance", (p) => createComponentInstance(p));
-  commandRegistry.set("set_instance_properties", (p) => setInstanceProperties(p));
-  commandRegistry.set("detach_instance", (p) => detachInstance(p));
+  commandRegistry.set("set_instance_properties", (p, ctx) => setInstanceProperties(p, ctx));
+  commandRegistry.set("detach_instance", (p, ctx) => detachInstance(p, ctx));
 
   commandRegistry.set("create_style", (p) => createStyle(p));
-  commandRegistry.set("apply_style", (p) => applyStyle(p));
+  commandRegistry.set("apply_style", (p, ctx) => applyStyle(p, ctx));
 
   commandRegistry.set("create_variable_collection", (p) => createVariableCollection(p));
   commandRegistry.set("create_variable", (p) => createVariable(p));
   commandRegistry.set("set_variable_value", (p) => setVariableValue(p));
   commandRegistry.set("bind_variable_to_property", (p) => bindVariableToProperty(p));
 
+  commandRegistry.set("set_annotations", (p, ctx) => setAnnotations(p, ctx));
+  commandRegistry.set("create_connections", (p, ctx) => createConnections(p, ctx));
 
-  commandRegistry.set("scroll_and_zoom_into_view", (p) => scroll_and_zoom_into_view(p));
-  commandRegistry.set("delete_nodes", (p) => delete_nodes(p));
+
+  commandRegistry.set("scroll_and_zoom_into_view", (p, ctx) => scroll_and_zoom_into_view(p, ctx));
+  commandRegistry.set("delete_nodes", (p, ctx) => delete_nodes(p, ctx));
 
   commandRegistry.set("show_notification", (p) => show_notification(p));
   commandRegistry.set("commit_undo_step", () => commit_undo_step());
+  commandRegistry.set("preload_fonts", (p, ctx) => preloadFonts(p, ctx));
+  commandRegistry.set("flush_reveal", (p, ctx) => flushReveal(p, ctx));
+  commandRegistry.set("apply_edit_plan", (p, ctx) => applyEditPlan(p, ctx));
 
 }
 
 // ======================================================
 // Command Router
 // ======================================================
-async function handleCommand(command, params) {
+async function handleCommand(command, params, ctx) {
   registerDefaultCommands();
+  const commandCtx = ctx || createCommandContext(null, command);
 
   // Resolve the action/handler to execute
   let action = null;
   const handler = commandRegistry.get(command);
   if (handler) {
-    action = () => handler(params || {});
+    const hasSelector = !!(params && params.selector);
+    params = await resolveSelectorParams(command, params || {}, commandCtx);
+    action = async () => {
+      const result = await handler(params, commandCtx);
+      if (hasSelector && result && typeof result === "object") result.selector = { matched_count: params.node_ids.length };
+      return result;
+    };
   } else {
     const payload = { code: "unknown_command", message: `Unknown command: ${command}`, details: { command } };
     try { logger.error("unknown command", { code: payload.code, originalError: payload.message, details: payload.details }); } catch (_) {}
@@ -137,9 +151,10 @@ async function handleCommand(command, params) {
   // Compute a human-friendly step label for logging/undo grouping
   const stepLabel = (params && (params.stepLabel || params.label || params.name || params.toolName)) || command;
 
-  // Avoid redundant reveal for viewport-only commands
-  const viewportOnly = new Set(["zoom", "center", "scroll_and_zoom_into_view"]);
+  // Avoid redundant reveal for viewport-only and background commands
+  const viewportOnly = new Set(["zoom", "center", "scroll_and_zoom_into_view", "preload_fonts", "flush_reveal"]);
   const autoReveal = !(params && params.autoReveal === false) && !viewportOnly.has(command);
+  const revealPolicy = commandCtx.reveal || "always";
 
   // Wrap the execution in an undo group for atomic step semantics and UX reveal
   // Provide candidate ids from params so reveal can still work for read-only commands
@@ -154,8 +169,9 @@ async function handleCommand(command, params) {
   } catch (_) {}
 
   return await withUndoGroup(stepLabel, async () => {
+    throwIfCancelled(commandCtx);
     return await action();
-  }, { autoReveal, candidate_ids });
+  }, { autoReveal, revealPolicy, candidate_ids, ctx: commandCtx });
 }
 
 // ======================================================
@@ -209,6 +225,161 @@ function delay(ms) {
 }
 
 
+// ======================================================
+// Command execution context & timings
+// ======================================================
+// Each tool_call gets a small context object that travels with the handler.
+// Handlers record sub-phase timings (exports, traversals) into it and the
+// aggregate is returned alongside the tool_response for backend profiling.
+function createCommandContext(id, command, options) {
+  const reveal = (options && REVEAL_POLICIES.has(options.reveal)) ? options.reveal : null;
+  return { id: id || null, command, started_at: Date.now(), phases: {}, cancelled: false, cancel_reason: null, reveal };
+}
+
+// Per-command node resolution: ids are looked up in parallel once and memoized on
+// the command context, so a handler, the operations of an edit plan and the
+// reveal step in withUndoGroup share one getNodeByIdAsync per id. Nodes removed
+// after they were resolved read as missing.
+function _nodeCacheFor(ctx) {
+  if (!ctx) return new Map();
+  if (!ctx.nodeCache) ctx.nodeCache = new Map();
+  return ctx.nodeCache;
+}
+
+function _lookupNode(cache, id) {
+  let pending = cache.get(id);
+  if (!pending) {
+    pending = figma.getNodeByIdAsync(id).catch(() => null);
+    cache.set(id, pending);
+  }
+  return pending;
+}
+
+async function resolveNode(id, ctx) {
+  if (typeof id !== "string" || id.length === 0) return null;
+  const node = await _lookupNode(_nodeCacheFor(ctx), id);
+  return (node && !node.removed) ? node : null;
+}
+
+// Resolve ids in parallel ahead of a handler's loop; later resolveNode calls hit the cache
+async function prefetchNodes(ids, ctx) {
+  if (!ctx || !Array.isArray(ids) || ids.length === 0) return;
+  const cache = _nodeCacheFor(ctx);
+  const pending = [];
+  for (const id of ids) {
+    if (typeof id === "string" && id.length > 0 && !cache.has(id)) pending.push(_lookupNode(cache, id));
+  }
+  if (pending.length > 0) await timePhase(ctx, "resolve_nodes", () => Promise.all(pending));
+}
+
+// Node selectors: bulk mutations may take `selector` ({ filters, scope_node_id,
+// max_nodes? } — the find_nodes query shape) instead of `node_ids`. The plugin
+// resolves it in place, so the matched ids never travel through the agent.
+// Matched nodes seed the command's node cache for the handler that follows.
+// delete_nodes is deliberately absent: irreversible deletes stay explicit by id.
+const SELECTOR_COMMANDS = new Set([
+  "set_fills", "set_strokes", "set_corner_radius", "set_size", "set_position",
+  "set_layer_properties", "set_effects", "set_auto_layout", "set_auto_layout_child",
+  "set_constraints", "set_text_style", "set_instance_properties", "detach_instance",
+  "apply_style",
+]);
+const SELECTOR_DEFAULT_MAX_NODES = 1000;
+const SELECTOR_MAX_NODES = 5000;
+
+async function resolveSelectorParams(command, params, ctx) {
+  if (!params || params.selector === undefined || params.selector === null) return params;
+  const selector = params.selector;
+  const fail = (code, message, details) => {
+    const payload = { code, message, details: details || {} };
+    logger.error(`❌ ${command} selector failed`, { code, originalError: message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  };
+  if (!SELECTOR_COMMANDS.has(command)) fail("invalid_parameter", `${command} does not accept a selector`, { command });
+  if (Array.isArray(params.node_ids) && params.node_ids.length > 0) fail("invalid_parameter", "Provide either node_ids or selector, not both", { command });
+  if (!selector || typeof selector !== "object" || !selector.filters || typeof selector.filters !== "object") {
+    fail("invalid_parameter", "selector needs a filters object", { command });
+  }
+  const maxNodes = Math.min(SELECTOR_MAX_NODES, (typeof selector.max_nodes === "number" && selector.max_nodes > 0) ? Math.floor(selector.max_nodes) : SELECTOR_DEFAULT_MAX_NODES);
+
+  const { nodes } = await timePhase(ctx, "selector", () => collectFindNodesMatches(selector.filters, selector.scope_node_id, ctx, null));
+  if (nodes.length === 0) {
+    fail("selector_no_matches", "The selector matched no nodes", { filters: selector.filters, scope_node_id: selector.scope_node_id || null });
+  }
+  if (nodes.length > maxNodes) {
+    fail("selector_too_broad", `The selector matched ${nodes.length} nodes (max_nodes ${maxNodes}); narrow the filters or scope`, { matched_count: nodes.length, max_nodes: maxNodes });
+  }
+  const cache = _nodeCacheFor(ctx);
+  for (const node of nodes) cache.set(node.id, Promise.resolve(node));
+  logger.info(`🎯 ${command} selector resolved`, { matched: nodes.length, scope: selector.scope_node_id || "page" });
+  const { selector: _unused, ...rest } = params;
+  return { ...rest, node_ids: nodes.map((n) => n.id) };
+}
+
+// Contexts of commands currently executing, keyed by tool_call id (for tool_cancel)
+const activeCommandContexts = new Map();
+// Ids cancelled before their tool_call arrived or started (bounded)
+const cancelledCommandIds = new Set();
+const MAX_CANCELLED_IDS = 200;
+// Long loops yield to the event loop every N items so a tool_cancel can be observed
+const CANCEL_CHECK_INTERVAL = 500;
+
+function markCommandCancelled(id, reason) {
+  if (typeof id !== 'string' || id.length === 0) return false;
+  const ctx = activeCommandContexts.get(id);
+  if (ctx) {
+    ctx.cancelled = true;
+    ctx.cancel_reason = reason || null;
+    return true;
+  }
+  cancelledCommandIds.add(id);
+  if (cancelledCommandIds.size > MAX_CANCELLED_IDS) {
+    const oldest = cancelledCommandIds.values().next().value;
+    cancelledCommandIds.delete(oldest);
+  }
+  return false;
+}
+
+function throwIfCancelled(ctx) {
+  if (ctx && ctx.cancelled) {
+    const payload = { code: "cancelled", message: `Command cancelled: ${ctx.command}`, details: { id: ctx.id, command: ctx.command, reason: ctx.cancel_reason } };
+    throw new Error(JSON.stringify(payload));
+  }
+}
+
+// Yield once so queued UI messages (e.g. tool_cancel) get delivered, then bail if cancelled
+async function cooperativeCheckpoint(ctx) {
+  if (!ctx || !ctx.id) return;
+  await delay(0);
+  throwIfCancelled(ctx);
+}
+
+// Run fn and accumulate its wall time under ctx.phases[name] = { ms, count }
+async function timePhase(ctx, name, fn) {
+  const t0 = Date.now();
+  try {
+    return await fn();
+  } finally {
+    if (ctx && ctx.phases) {
+      const entry = ctx.phases[name] || { ms: 0, count: 0 };
+      entry.ms += Date.now() - t0;
+      entry.count += 1;
+      ctx.phases[name] = entry;
+    }
+  }
+}
+
+function buildCommandTimings(ctx) {
+  const ended_at = Date.now();
+  const started_at = (ctx && typeof ctx.started_at === 'number') ? ctx.started_at : ended_at;
+  return {
+    exec_start_ms: started_at,
+    exec_end_ms: ended_at,
+    exec_ms: ended_at - started_at,
+    phases: (ctx && ctx.phases) || {},
+  };
+}
+
+
 
 
 // ============================================
@@ -223,9 +394,11 @@ function delay(ms) {
 const CANVAS_SNAPSHOT_TTL_MS = 60000;
 let _lastCanvasSnapshot = null; // { signature, include_images, ts, payload }
 
-async function getCanvasSnapshot(params) {
+async function getCanvasSnapshot(params, ctx) {
   try {
     const include_images = !!(params && params.include_images);
+    const fieldSet = normalizeFieldSelection(params && params.fields);
+    const fieldsKey = fieldSet ? Array.from(fieldSet).sort().join(",") : "";
     const page = figma.currentPage;
     if (!page) {
       const payload = { code: "page_unavailable", message: "Current page unavailable", details: {} };
@@ -236,7 +409,7 @@ async function getCanvasSnapshot(params) {
     const selection = Array.isArray(page.selection) ? page.selection : [];
     const signature = computeSelectionSignature(selection || []);
 
-    if (_lastCanvasSnapshot && _lastCanvasSnapshot.signature === signature && _lastCanvasSnapshot.include_images === include_images) {
+    if (_lastCanvasSnapshot && _lastCanvasSnapshot.signature === signature && _lastCanvasSnapshot.include_images === include_images && _lastCanvasSnapshot.fields_key === fieldsKey) {
       const age = Date.now() - _lastCanvasSnapshot.ts;
       if (age <= CANVAS_SNAPSHOT_TTL_MS) {
         logger.info("✅ get_canvas_snapshot cache_hit", { signature, ageMs: age });
@@ -245,18 +418,22 @@ async function getCanvasSnapshot(params) {
     }
 
     const pageInfo = { id: page.id, name: page.name };
-    const selectionSummaries = (selection || []).map(_toRichNodeSummary);
-    const selectionSummary = buildSelectionSummary(selection || []);
+    const selectionSummaries = (selection || []).map((n) => _toProjectedNodeSummary(n, fieldSet));
 
-    const roots = selectionSummaries.length === 0 && Array.isArray(page.children) ? page.children.map(_toBasicNodeSummary) : [];
+    const roots = selectionSummaries.length === 0 && Array.isArray(page.children)
+      ? page.children.map((n) => fieldSet ? _toProjectedNodeSummary(n, fieldSet) : _toBasicNodeSummary(n))
+      : [];
 
     const payload = {
       page: pageInfo,
       selection: selectionSummaries,
       root_nodes_on_page: roots,
       selection_signature: signature,
-      selection_summary: selectionSummary,
     };
+    // The aggregated selection summary is the costliest part; skip it unless requested under a projection
+    if (!fieldSet || fieldSet.has("selection_summary")) {
+      payload.selection_summary = buildSelectionSummary(selection || []);
+    }
 
     // Optionally include lightweight exported images for the current selection
     if (include_images && Array.isArray(selection) && selection.length > 0) {
@@ -269,9 +446,10 @@ async function getCanvasSnapshot(params) {
         let exportedCount = 0;
         for (const node of selection) {
           if (exportedCount >= maxExports) break;
+          throwIfCancelled(ctx);
           try {
             if (node && typeof node.exportAsync === 'function') {
-              const bytes = await node.exportAsync({ format: fmt, constraint, useAbsoluteBounds });
+              const bytes = await timePhase(ctx, 'png_export', () => node.exportAsync({ format: fmt, constraint, useAbsoluteBounds }));
               images[node.id] = customBase64Encode(bytes);
               exportedCount++;
             }
@@ -288,7 +466,7 @@ async function getCanvasSnapshot(params) {
       }
     }
 
-    _lastCanvasSnapshot = { signature, include_images, ts: Date.now(), payload };
+    _lastCanvasSnapshot = { signature, include_images, fields_key: fieldsKey, ts: Date.now(), payload };
 
     logger.info("✅ get_canvas_snapshot succeeded", { selectionCount: selectionSummaries.length, roots: roots.length });
     return payload;
@@ -312,100 +490,457 @@ async function getCanvasSnapshot(params) {
 // ============================================
 
 
-// -------- TOOL : find_nodes --------
-async function findNodes(params) {
+// -------- Page node index --------
+// Inverted indexes over the current page, built with one traversal on first use
+// and then kept current from `nodechange` events (see Document Change Stream):
+// changed ids are marked dirty and re-read lazily on the next lookup.
+//   styles:    style_id -> Map<node_id, Set<field>>   (fillStyleId, strokeStyleId, ...)
+//   instances: main_component_id -> Set<instance_id>
+const PAGE_INDEX_STYLE_FIELDS = ["fillStyleId", "strokeStyleId", "effectStyleId", "textStyleId"];
+const PAGE_INDEX_COMPONENT_PROPS = ["mainComponent", "componentProperties"];
+const PAGE_INDEX_MAX_DIRTY = 5000;
+let pageNodeIndex = null; // { pageId, styles, nodeStyles, instances, nodeComponent, dirty:Set<string>, built_at }
+
+// Main component of an instance; async under dynamic-page document access
+async function _readMainComponentId(node) {
   try {
-    const { filters, scope_node_id, highlight_results } = params || {};
-    const f = (filters && typeof filters === "object") ? filters : {};
-
-    // Resolve scope
-    let scope = null;
-    if (typeof scope_node_id === "string" && scope_node_id.length > 0) {
-      scope = await figma.getNodeByIdAsync(scope_node_id);
-      if (!scope) {
-        const payload = { code: "scope_not_found", message: `Scope node not found: ${scope_node_id}`, details: { scope_node_id } };
-        logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
-        throw new Error(JSON.stringify(payload));
-      }
+    if (typeof node.getMainComponentAsync === "function") {
+      const mc = await node.getMainComponentAsync();
+      return mc ? mc.id : null;
+    }
+    return node.mainComponent ? node.mainComponent.id : null;
+  } catch (_) {
+    return null;
+  }
+}
+
+function _unindexInstance(index, nodeId) {
+  const prev = index.nodeComponent.get(nodeId);
+  if (prev === undefined) return;
+  const set = index.instances.get(prev);
+  if (set) {
+    set.delete(nodeId);
+    if (set.size === 0) index.instances.delete(prev);
+  }
+  index.nodeComponent.delete(nodeId);
+}
+
+function _indexInstance(index, nodeId, mainComponentId) {
+  _unindexInstance(index, nodeId);
+  if (!mainComponentId) return;
+  index.nodeComponent.set(nodeId, mainComponentId);
+  let set = index.instances.get(mainComponentId);
+  if (!set) { set = new Set(); index.instances.set(mainComponentId, set); }
+  set.add(nodeId);
+}
+
+// Index the main components of a batch of INSTANCE nodes in parallel
+async function _indexInstances(index, nodes, ctx) {
+  const instances = nodes.filter((n) => n && n.type === "INSTANCE");
+  if (instances.length === 0) return;
+  const ids = await timePhase(ctx, 'index_components', () => Promise.all(instances.map((n) => _readMainComponentId(n))));
+  for (let i = 0; i < instances.length; i++) _indexInstance(index, instances[i].id, ids[i]);
+}
+
+function _readNodeStyleRefs(node) {
+  const refs = {};
+  for (const field of PAGE_INDEX_STYLE_FIELDS) {
+    if (field === "textStyleId" && node.type !== "TEXT") continue;
+    try {
+      if (field in node && typeof node[field] === "string" && node[field].length > 0) refs[field] = node[field];
+    } catch (_) {}
+  }
+  return refs;
+}
+
+function _unindexNode(index, nodeId) {
+  const prev = index.nodeStyles.get(nodeId);
+  if (!prev) return;
+  for (const field of Object.keys(prev)) {
+    const consumers = index.styles.get(prev[field]);
+    if (consumers) {
+      consumers.delete(nodeId);
+      if (consumers.size === 0) index.styles.delete(prev[field]);
+    }
+  }
+  index.nodeStyles.delete(nodeId);
+}
+
+function _indexNode(index, node) {
+  _unindexNode(index, node.id);
+  const refs = _readNodeStyleRefs(node);
+  const fields = Object.keys(refs);
+  if (fields.length === 0) return;
+  index.nodeStyles.set(node.id, refs);
+  for (const field of fields) {
+    let consumers = index.styles.get(refs[field]);
+    if (!consumers) { consumers = new Map(); index.styles.set(refs[field], consumers); }
+    let set = consumers.get(node.id);
+    if (!set) { set = new Set(); consumers.set(node.id, set); }
+    set.add(field);
+  }
+}
+
+// Called for every raw node change on the watched page
+function pageIndexOnNodeChange(id, kind, properties) {
+  const index = pageNodeIndex;
+  if (!index) return;
+  if (kind === "DELETE") { _unindexNode(index, id); _unindexInstance(index, id); index.dirty.delete(id); return; }
+  const props = Array.isArray(properties) ? properties : [];
+  const relevant = (p) => PAGE_INDEX_STYLE_FIELDS.indexOf(p) !== -1 || PAGE_INDEX_COMPONENT_PROPS.indexOf(p) !== -1;
+  if (kind === "CREATE" || props.length === 0 || props.some(relevant)) {
+    index.dirty.add(id);
+    // A huge burst is cheaper to rebuild than to replay
+    if (index.dirty.size > PAGE_INDEX_MAX_DIRTY) pageNodeIndex = null;
+  }
+}
+
+function invalidatePageNodeIndex() {
+  pageNodeIndex = null;
+}
+
+async function ensurePageNodeIndex(ctx) {
+  const page = figma.currentPage;
+  if (!page) return null;
+  // Without change events the index cannot be kept current; rebuild per call
+  if (!documentChangeState.watching) pageNodeIndex = null;
+  if (!pageNodeIndex || pageNodeIndex.pageId !== page.id) {
+    const index = { pageId: page.id, styles: new Map(), nodeStyles: new Map(), instances: new Map(), nodeComponent: new Map(), dirty: new Set(), built_at: Date.now() };
+    const nodes = await timePhase(ctx, 'index_build', () => page.findAll(() => true));
+    for (let i = 0; i < nodes.length; i++) {
+      if (i > 0 && i % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+      _indexNode(index, nodes[i]);
+    }
+    await _indexInstances(index, nodes, ctx);
+    pageNodeIndex = index;
+    logger.info("🗂️ page node index built", { pageId: page.id, nodes: nodes.length, styles: index.styles.size, components: index.instances.size });
+    return index;
+  }
+  const index = pageNodeIndex;
+  if (index.dirty.size > 0) {
+    const ids = Array.from(index.dirty);
+    index.dirty.clear();
+    const resolved = await timePhase(ctx, 'index_refresh', () => Promise.all(ids.map((id) => figma.getNodeByIdAsync(id).catch(() => null))));
+    const live = [];
+    for (let i = 0; i < ids.length; i++) {
+      const node = resolved[i];
+      if (!node || node.removed) { _unindexNode(index, ids[i]); _unindexInstance(index, ids[i]); }
+      else { _indexNode(index, node); _unindexInstance(index, node.id); live.push(node); }
+    }
+    await _indexInstances(index, live, ctx);
+  }
+  return index;
+}
+
+// Resolve the consumers of `styleId` on the current page: [{ node, fields }]
+async function lookupStyleConsumers(styleId, ctx) {
+  const index = await ensurePageNodeIndex(ctx);
+  const consumers = index ? index.styles.get(styleId) : null;
+  if (!consumers || consumers.size === 0) return [];
+  const ids = Array.from(consumers.keys());
+  const nodes = await timePhase(ctx, 'resolve_nodes', () => Promise.all(ids.map((id) => figma.getNodeByIdAsync(id).catch(() => null))));
+  const out = [];
+  for (let i = 0; i < ids.length; i++) {
+    if (nodes[i] && !nodes[i].removed) out.push({ node: nodes[i], fields: Array.from(consumers.get(ids[i])) });
+  }
+  return out;
+}
+
+// Resolve the instances of `mainComponentId` on the current page
+async function lookupComponentInstances(mainComponentId, ctx) {
+  const index = await ensurePageNodeIndex(ctx);
+  const ids = index && index.instances.has(mainComponentId) ? Array.from(index.instances.get(mainComponentId)) : [];
+  if (ids.length === 0) return [];
+  const nodes = await timePhase(ctx, 'resolve_nodes', () => Promise.all(ids.map((id) => figma.getNodeByIdAsync(id).catch(() => null))));
+  return nodes.filter((n) => n && !n.removed);
+}
+
+function _isWithin(node, root) {
+  let current = node;
+  while (current) {
+    if (current === root || current.id === root.id) return true;
+    current = current.parent;
+  }
+  return false;
+}
+
+// -------- TOOL : find_nodes --------
+// Results are paginated. When a search has more matches than `limit`, the full
+// list of matched ids is kept in a short-lived cursor so follow-up pages are
+// served without re-traversing the document.
+const FIND_NODES_DEFAULT_LIMIT = 100;
+const FIND_NODES_MAX_LIMIT = 1000;
+const FIND_NODES_CURSOR_TTL_MS = 5 * 60 * 1000;
+const FIND_NODES_MAX_CURSORS = 10;
+const findNodesCursors = new Map(); // cursor_id -> { ids: string[], created_at: number }
+let findNodesCursorSeq = 0;
+
+function normalizeFindNodesPaging(params) {
+  const p = params || {};
+  let limit = (typeof p.limit === "number" && isFinite(p.limit)) ? Math.floor(p.limit) : FIND_NODES_DEFAULT_LIMIT;
+  limit = Math.max(1, Math.min(FIND_NODES_MAX_LIMIT, limit));
+  const offset = (typeof p.offset === "number" && isFinite(p.offset) && p.offset > 0) ? Math.floor(p.offset) : 0;
+  return { limit, offset, hasExplicitOffset: typeof p.offset === "number" };
+}
+
+function storeFindNodesCursor(ids, nextOffset) {
+  const now = Date.now();
+  for (const [key, entry] of findNodesCursors) {
+    if (now - entry.created_at > FIND_NODES_CURSOR_TTL_MS) findNodesCursors.delete(key);
+  }
+  while (findNodesCursors.size >= FIND_NODES_MAX_CURSORS) {
+    findNodesCursors.delete(findNodesCursors.keys().next().value);
+  }
+  findNodesCursorSeq += 1;
+  const cursorId = `fn${findNodesCursorSeq}`;
+  findNodesCursors.set(cursorId, { ids, created_at: now });
+  return `${cursorId}:${nextOffset}`;
+}
+
+// Streaming mode (`stream: true`): walk the scope depth-first in document order
+// instead of materializing findAll(), post matches to the agent in `tool_partial`
+// batches, yield to Figma's event loop periodically, and stop once `limit`
+// matches were found. The final tool_response only carries counters.
+const FIND_NODES_STREAM_BATCH = 50;
+const FIND_NODES_STREAM_YIELD_EVERY = 1000;
+
+async function streamFindNodes(root, matches, limit, fieldSet, ctx) {
+  const stack = [];
+  const pushChildren = (node) => {
+    if (!("children" in node) || !Array.isArray(node.children)) return;
+    for (let i = node.children.length - 1; i >= 0; i--) stack.push(node.children[i]);
+  };
+  pushChildren(root);
+  let visited = 0;
+  let matched = 0;
+  let seq = 0;
+  let batch = [];
+  let stoppedAtLimit = false;
+  const flush = () => {
+    if (batch.length === 0) return;
+    seq += 1;
+    figma.ui.postMessage({ type: "tool_partial", id: ctx.id, seq, items: batch });
+    batch = [];
+  };
+  const walkStart = Date.now();
+  while (stack.length > 0) {
+    const node = stack.pop();
+    visited += 1;
+    if (matches(node)) {
+      batch.push(_toProjectedNodeSummary(node, fieldSet));
+      matched += 1;
+      if (batch.length >= FIND_NODES_STREAM_BATCH) flush();
+      if (matched >= limit) { stoppedAtLimit = true; break; }
+    }
+    pushChildren(node);
+    if (visited % FIND_NODES_STREAM_YIELD_EVERY === 0) {
+      flush();
+      await cooperativeCheckpoint(ctx);
     }
+  }
+  flush();
+  if (ctx && ctx.phases) ctx.phases.stream_walk = { ms: Date.now() - walkStart, count: visited };
+  const has_more = stoppedAtLimit && stack.length > 0;
+  logger.info("✅ find_nodes streamed", { matched, visited, batches: seq, has_more });
+  return { matching_nodes: [], streamed: true, streamed_count: matched, batches: seq, visited, total_count: has_more ? null : matched, has_more, next_cursor: null };
+}
 
-    const root = scope || figma.currentPage;
-    if (!root || (root !== figma.currentPage && !("findAll" in root) && !("findAllWithCriteria" in root))) {
-      const payload = { code: "invalid_scope", message: "Scope does not support search", details: { scope_node_id } };
+// Serve a follow-up page from a stored cursor ("<cursor_id>:<offset>")
+async function continueFindNodesCursor(cursor, params, ctx) {
+  const [cursorId, rawOffset] = String(cursor).split(":");
+  const entry = findNodesCursors.get(cursorId);
+  if (!entry || (Date.now() - entry.created_at) > FIND_NODES_CURSOR_TTL_MS) {
+    if (entry) findNodesCursors.delete(cursorId);
+    const payload = { code: "cursor_expired", message: "find_nodes cursor is unknown or expired; re-run the search without a cursor", details: { cursor } };
+    logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  }
+  const paging = normalizeFindNodesPaging(params);
+  const offset = paging.hasExplicitOffset ? paging.offset : Math.max(0, parseInt(rawOffset, 10) || 0);
+  const limit = paging.limit;
+  const total_count = entry.ids.length;
+  const pageIds = entry.ids.slice(offset, offset + limit);
+
+  const resolved = await timePhase(ctx, 'resolve_nodes', () => Promise.all(pageIds.map((id) => figma.getNodeByIdAsync(id).catch(() => null))));
+  const nodes = resolved.filter((n) => !!n);
+  const fieldSet = normalizeFieldSelection(params && params.fields);
+  const summaries = nodes.map((n) => _toProjectedNodeSummary(n, fieldSet));
+  const nextOffset = offset + pageIds.length;
+  const has_more = nextOffset < total_count;
+
+  const payload = {
+    matching_nodes: summaries,
+    total_count,
+    offset,
+    limit,
+    has_more,
+    next_cursor: has_more ? `${cursorId}:${nextOffset}` : null,
+  };
+  if (nodes.length < pageIds.length) payload.removed_since_search = pageIds.length - nodes.length;
+  logger.info("✅ find_nodes page served from cursor", { details: { cursor: cursorId, offset, returned: summaries.length, total_count } });
+  return payload;
+}
+
+// Resolve the scope and apply the AND-composed filters of a find_nodes query.
+// Returns { scope, nodes } with every match in document order, or
+// { scope, streamed } when `stream` ({ limit, fieldSet }) is given and the query
+// is not served from the page index. Shared by find_nodes and node selectors.
+async function collectFindNodesMatches(filters, scope_node_id, ctx, stream) {
+  const f = (filters && typeof filters === "object") ? filters : {};
+
+  // Resolve scope
+  let scope = null;
+  if (typeof scope_node_id === "string" && scope_node_id.length > 0) {
+    scope = await figma.getNodeByIdAsync(scope_node_id);
+    if (!scope) {
+      const payload = { code: "scope_not_found", message: `Scope node not found: ${scope_node_id}`, details: { scope_node_id } };
       logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
       throw new Error(JSON.stringify(payload));
     }
+  }
 
-    // Build initial candidate set
-    let candidates = [];
-    const nodeTypes = Array.isArray(f.node_types) ? Array.from(new Set(f.node_types.filter((t) => typeof t === "string" && t.length > 0))) : null;
-    if (nodeTypes && nodeTypes.length > 0 && "findAllWithCriteria" in root) {
-      try {
-        candidates = root.findAllWithCriteria({ types: nodeTypes });
-      } catch (e) {
-        // Fallback to full scan if criteria fails in certain scopes
+  const root = scope || figma.currentPage;
+  if (!root || (root !== figma.currentPage && !("findAll" in root) && !("findAllWithCriteria" in root))) {
+    const payload = { code: "invalid_scope", message: "Scope does not support search", details: { scope_node_id } };
+    logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  }
+
+  // Build initial candidate set
+  let candidates = [];
+  const nodeTypes = Array.isArray(f.node_types) ? Array.from(new Set(f.node_types.filter((t) => typeof t === "string" && t.length > 0))) : null;
+  const indexedStyleId = (typeof f.style_id === "string" && f.style_id.length > 0) ? f.style_id : null;
+  const indexedComponentId = (typeof f.main_component_id === "string" && f.main_component_id.length > 0) ? f.main_component_id : null;
+  // Instance membership from the page index (also used by the filter below)
+  let indexedInstanceIds = null;
+  // The page index only covers the current page; scopes elsewhere still traverse
+  const indexable = root === figma.currentPage || _isWithin(root, figma.currentPage);
+  const useIndex = indexable && !!(indexedStyleId || indexedComponentId);
+  // Streaming replaces the up-front traversal; index-served queries are already cheap
+  const streaming = !!stream && !useIndex && !!(ctx && ctx.id);
+  if (useIndex) {
+    // Candidates come from the page index instead of a traversal; the
+    // remaining filters below still apply to this (much smaller) set.
+    let indexed;
+    if (indexedStyleId) {
+      indexed = (await lookupStyleConsumers(indexedStyleId, ctx)).map((c) => c.node);
+    } else {
+      indexed = await lookupComponentInstances(indexedComponentId, ctx);
+    }
+    if (indexedComponentId) {
+      const index = await ensurePageNodeIndex(ctx);
+      indexedInstanceIds = (index && index.instances.get(indexedComponentId)) || new Set();
+    }
+    const typeSet = nodeTypes && nodeTypes.length > 0 ? new Set(nodeTypes) : null;
+    candidates = indexed.filter((n) => (!typeSet || typeSet.has(n.type)) && (root === figma.currentPage || (n !== root && _isWithin(n, root))));
+  } else if (!streaming) {
+    await timePhase(ctx, 'find_all', () => {
+      if (nodeTypes && nodeTypes.length > 0 && "findAllWithCriteria" in root) {
         try {
-          logger.warn("⚠️ findAllWithCriteria failed; falling back to findAll", { error: (e && e.message) || String(e), node_types: nodeTypes, scope: scope ? scope.id : null });
-        } catch (_) {}
+          candidates = root.findAllWithCriteria({ types: nodeTypes });
+        } catch (e) {
+          // Fallback to full scan if criteria fails in certain scopes
+          try {
+            logger.warn("⚠️ findAllWithCriteria failed; falling back to findAll", { error: (e && e.message) || String(e), node_types: nodeTypes, scope: scope ? scope.id : null });
+          } catch (_) {}
+          candidates = root.findAll(() => true);
+        }
+      } else {
         candidates = root.findAll(() => true);
       }
-    } else {
-      candidates = root.findAll(() => true);
-    }
+    });
+  }
 
-    // Compile regex filters
-    let nameRegex = null;
-    if (typeof f.name_regex === "string" && f.name_regex.length > 0) {
-      try { nameRegex = new RegExp(f.name_regex); } catch (e) {
-        const payload = { code: "invalid_regex", message: `Invalid name_regex: ${(e && e.message) || String(e)}`, details: { name_regex: f.name_regex } };
-        logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
-        throw new Error(JSON.stringify(payload));
-      }
+  // Compile regex filters
+  let nameRegex = null;
+  if (typeof f.name_regex === "string" && f.name_regex.length > 0) {
+    try { nameRegex = new RegExp(f.name_regex); } catch (e) {
+      const payload = { code: "invalid_regex", message: `Invalid name_regex: ${(e && e.message) || String(e)}`, details: { name_regex: f.name_regex } };
+      logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
+      throw new Error(JSON.stringify(payload));
     }
-    let textRegex = null;
-    if (typeof f.text_regex === "string" && f.text_regex.length > 0) {
-      try { textRegex = new RegExp(f.text_regex); } catch (e) {
-        const payload = { code: "invalid_regex", message: `Invalid text_regex: ${(e && e.message) || String(e)}`, details: { text_regex: f.text_regex } };
-        logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
-        throw new Error(JSON.stringify(payload));
-      }
+  }
+  let textRegex = null;
+  if (typeof f.text_regex === "string" && f.text_regex.length > 0) {
+    try { textRegex = new RegExp(f.text_regex); } catch (e) {
+      const payload = { code: "invalid_regex", message: `Invalid text_regex: ${(e && e.message) || String(e)}`, details: { text_regex: f.text_regex } };
+      logger.error("❌ find_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
+      throw new Error(JSON.stringify(payload));
     }
+  }
 
-    const mainComponentId = (typeof f.main_component_id === "string" && f.main_component_id.length > 0) ? f.main_component_id : null;
-    const styleId = (typeof f.style_id === "string" && f.style_id.length > 0) ? f.style_id : null;
-
-    // Apply AND-composed filters
-    let results = candidates.filter((n) => {
-      if (nameRegex && !(typeof n.name === "string" && nameRegex.test(n.name))) return false;
-      if (textRegex) {
-        if (n.type !== "TEXT") return false;
-        const chars = ("characters" in n) ? (n.characters || "") : "";
-        if (!textRegex.test(chars)) return false;
-      }
-      if (mainComponentId) {
-        if (n.type !== "INSTANCE") return false;
-        try {
-          const mc = ("mainComponent" in n && n.mainComponent) ? n.mainComponent : null;
-          if (!mc || mc.id !== mainComponentId) return false;
-        } catch (_) { return false; }
-      }
-      if (styleId) {
-        const hasStyle = ("fillStyleId" in n && n.fillStyleId === styleId)
-          || ("strokeStyleId" in n && n.strokeStyleId === styleId)
-          || ("effectStyleId" in n && n.effectStyleId === styleId)
-          || (n.type === "TEXT" && "textStyleId" in n && n.textStyleId === styleId);
-        if (!hasStyle) return false;
-      }
-      return true;
-    });
+  const mainComponentId = (typeof f.main_component_id === "string" && f.main_component_id.length > 0) ? f.main_component_id : null;
+  const styleId = (typeof f.style_id === "string" && f.style_id.length > 0) ? f.style_id : null;
+
+  // Apply AND-composed filters
+  const filterStart = Date.now();
+  const matchesStyle = (n) => {
+    if (!styleId) return true;
+    return ("fillStyleId" in n && n.fillStyleId === styleId)
+      || ("strokeStyleId" in n && n.strokeStyleId === styleId)
+      || ("effectStyleId" in n && n.effectStyleId === styleId)
+      || (n.type === "TEXT" && "textStyleId" in n && n.textStyleId === styleId);
+  };
+  const matchesFilters = (n) => {
+    if (nameRegex && !(typeof n.name === "string" && nameRegex.test(n.name))) return false;
+    if (textRegex) {
+      if (n.type !== "TEXT") return false;
+      const chars = ("characters" in n) ? (n.characters || "") : "";
+      if (!textRegex.test(chars)) return false;
+    }
+    if (mainComponentId) {
+      if (n.type !== "INSTANCE") return false;
+      if (indexedInstanceIds) return indexedInstanceIds.has(n.id) && matchesStyle(n);
+      try {
+        const mc = ("mainComponent" in n && n.mainComponent) ? n.mainComponent : null;
+        if (!mc || mc.id !== mainComponentId) return false;
+      } catch (_) { return false; }
+    }
+    return matchesStyle(n);
+  };
+  if (streaming) {
+    const typeSet = nodeTypes && nodeTypes.length > 0 ? new Set(nodeTypes) : null;
+    const streamed = await streamFindNodes(root, (n) => (!typeSet || typeSet.has(n.type)) && matchesFilters(n), stream.limit, stream.fieldSet, ctx);
+    return { scope, streamed };
+  }
+  const nodes = [];
+  for (let i = 0; i < candidates.length; i++) {
+    if (i > 0 && i % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+    if (matchesFilters(candidates[i])) nodes.push(candidates[i]);
+  }
+  if (ctx && ctx.phases) ctx.phases.filter = { ms: Date.now() - filterStart, count: candidates.length };
+  return { scope, nodes };
+}
 
-    const summaries = results.map((n) => _toRichNodeSummary(n));
+async function findNodes(params, ctx) {
+  try {
+    const { filters, scope_node_id, highlight_results, cursor } = params || {};
+
+    if (typeof cursor === "string" && cursor.length > 0) {
+      return await continueFindNodesCursor(cursor, params, ctx);
+    }
+    const { limit, offset } = normalizeFindNodesPaging(params);
+    const stream = (params && params.stream === true) ? { limit, fieldSet: normalizeFieldSelection(params.fields) } : null;
+    const matched = await collectFindNodesMatches(filters, scope_node_id, ctx, stream);
+    if (matched.streamed) return matched.streamed;
+    const scope = matched.scope;
+    const results = matched.nodes;
+
+    // Paginate: only the requested window is summarized and returned
+    const total_count = results.length;
+    const pageNodes = results.slice(offset, offset + limit);
+    const nextOffset = offset + pageNodes.length;
+    const has_more = nextOffset < total_count;
+    const next_cursor = has_more ? storeFindNodesCursor(results.map((n) => n.id), nextOffset) : null;
+    const fieldSet = normalizeFieldSelection(params && params.fields);
+    const summaries = pageNodes.map((n) => _toProjectedNodeSummary(n, fieldSet));
 
     // Optional brief highlight
     if (highlight_results === true) {
       const MAX_HIGHLIGHTS = 25;
-      const toHighlight = results.slice(0, MAX_HIGHLIGHTS);
+      const toHighlight = pageNodes.slice(0, MAX_HIGHLIGHTS);
       for (const node of toHighlight) {
+        if (ctx && ctx.cancelled) break;
         try {
           if (!("fills" in node)) continue;
           const originalFills = JSON.parse(JSON.stringify(node.fills));
@@ -416,8 +951,8 @@ async function findNodes(params) {
       }
     }
 
-    const payload = { matching_nodes: summaries };
-    logger.info("✅ find_nodes succeeded", { matched: summaries.length, scope: scope ? scope.id : "page" });
+    const payload = { matching_nodes: summaries, total_count, offset, limit, has_more, next_cursor };
+    logger.info("✅ find_nodes succeeded", { matched: total_count, returned: summaries.length, scope: scope ? scope.id : "page" });
     return payload;
   } catch (error) {
     try {
@@ -434,7 +969,7 @@ async function findNodes(params) {
 }
 
 // -------- TOOL : get_node_details --------
-async function getNodeDetails(params) {
+async function getNodeDetails(params, ctx) {
   try {
     const { node_ids } = params || {};
     if (!Array.isArray(node_ids) || node_ids.length === 0) {
@@ -443,29 +978,41 @@ async function getNodeDetails(params) {
       throw new Error(JSON.stringify(payload));
     }
 
+    // Optional projection: target_node keys plus "parent_summary" / "children_summaries" blocks
+    const fieldSet = normalizeFieldSelection(params && params.fields);
+    const wantBlock = (key) => !fieldSet || fieldSet.has(key);
+    const includeImage = params && params.include_image === true;
+
     const details = {};
+    const images = {};
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
+      throwIfCancelled(ctx);
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) continue;
         // Reuse existing rich inspection
-        const obs = await buildNodeDetailsInternal(id, false);
-        const parent_summary = node.parent ? _toRichNodeSummary(node.parent) : null;
-        let children_summaries = [];
-        if ("children" in node && Array.isArray(node.children)) {
-          children_summaries = node.children.map((c) => _toRichNodeSummary(c));
+        const obs = await buildNodeDetailsInternal(id, false, ctx, { fields: fieldSet, includeImage });
+        if (includeImage && obs && obs.exported_image) images[id] = obs.exported_image;
+        const entry = { target_node: obs && obs.target_node ? obs.target_node : null };
+        if (wantBlock("parent_summary")) {
+          entry.parent_summary = node.parent ? _toRichNodeSummary(node.parent) : null;
         }
-        details[id] = {
-          target_node: obs && obs.target_node ? obs.target_node : null,
-          parent_summary,
-          children_summaries,
-        };
+        if (wantBlock("children_summaries")) {
+          let children_summaries = [];
+          if ("children" in node && Array.isArray(node.children)) {
+            children_summaries = node.children.map((c) => _toRichNodeSummary(c));
+          }
+          entry.children_summaries = children_summaries;
+        }
+        details[id] = entry;
       } catch (e) {
         // skip this id
       }
     }
-    logger.info("✅ get_node_details succeeded", { count: Object.keys(details).length });
-    return { details };
+    logger.info("✅ get_node_details succeeded", { count: Object.keys(details).length, images: Object.keys(images).length });
+    // Images travel in a top-level map so the backend can attach them as model input instead of text
+    return includeImage ? { details, images } : { details };
   } catch (error) {
     try {
       const maybe = JSON.parse(error && error.message ? error.message : String(error));
@@ -481,7 +1028,7 @@ async function getNodeDetails(params) {
 }
 
 // -------- TOOL : get_image_of_node --------
-async function getImageOfNode(params) {
+async function getImageOfNode(params, ctx) {
   try {
     const { node_ids, export_settings } = params || {};
     if (!Array.isArray(node_ids) || node_ids.length === 0) {
@@ -513,14 +1060,16 @@ async function getImageOfNode(params) {
       : true;
 
     const images = {};
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
+      throwIfCancelled(ctx);
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node || typeof node.exportAsync !== 'function') {
           images[id] = null;
           continue;
         }
-        const bytes = await node.exportAsync({ format: fmt, constraint, useAbsoluteBounds });
+        const bytes = await timePhase(ctx, 'image_export', () => node.exportAsync({ format: fmt, constraint, useAbsoluteBounds }));
         images[id] = customBase64Encode(bytes);
       } catch (e) {
         // Export failed for this node; log structured error and record null
@@ -670,7 +1219,7 @@ async function getDocumentStyles(params) {
 }
 
 // -------- TOOL : get_style_consumers --------
-async function getStyleConsumers(params) {
+async function getStyleConsumers(params, ctx) {
   try {
     const { style_id } = params || {};
     if (typeof style_id !== 'string' || style_id.length === 0) {
@@ -678,15 +1227,24 @@ async function getStyleConsumers(params) {
       logger.error('❌ get_style_consumers failed', { code: payload.code, originalError: payload.message, details: payload.details });
       throw new Error(JSON.stringify(payload));
     }
+    const scope = (params && params.scope === 'page') ? 'page' : 'document';
 
     const consumers = [];
 
-    // Preferred: use the Style API if available to get canonical consumers and fields
+    // Opt-in: current page via the maintained inverted index (no traversal once built)
+    if (scope === 'page') {
+      const hits = await lookupStyleConsumers(style_id, ctx);
+      for (const hit of hits) consumers.push({ node: _toRichNodeSummary(hit.node), fields: hit.fields });
+      logger.info('✅ get_style_consumers succeeded', { count: consumers.length, method: 'index' });
+      return { consuming_nodes: consumers };
+    }
+
+    // Default: document scope via the Style API (canonical consumers and fields, no traversal)
     try {
       if (typeof figma.getStyleByIdAsync === 'function') {
         const style = await figma.getStyleByIdAsync(style_id);
         if (style && typeof style.getStyleConsumersAsync === 'function') {
-          const style_consumers = await style.getStyleConsumersAsync();
+          const style_consumers = await timePhase(ctx, 'style_consumers_api', () => style.getStyleConsumersAsync());
           for (const sc of style_consumers) {
             try {
               const node = sc && sc.node ? sc.node : null;
@@ -702,23 +1260,11 @@ async function getStyleConsumers(params) {
       // Non-fatal: fall back to scanning nodes on the page
     }
 
-    // Fallback: scan nodes on the current page and detect style ids on known fields
-    const page = figma.currentPage;
-    const nodes = page ? page.findAll(() => true) : [];
-    for (const n of nodes) {
-      try {
-        const applied_fields = [];
-        if ('fillStyleId' in n && n.fillStyleId === style_id) applied_fields.push('fillStyleId');
-        if ('strokeStyleId' in n && n.strokeStyleId === style_id) applied_fields.push('strokeStyleId');
-        if ('effectStyleId' in n && n.effectStyleId === style_id) applied_fields.push('effectStyleId');
-        if (n.type === 'TEXT' && 'textStyleId' in n && n.textStyleId === style_id) applied_fields.push('textStyleId');
-        if (applied_fields.length > 0) {
-          consumers.push({ node: _toRichNodeSummary(n), fields: applied_fields });
-        }
-      } catch (_) {}
-    }
+    // Fallback: the current page's index
+    const hits = await lookupStyleConsumers(style_id, ctx);
+    for (const hit of hits) consumers.push({ node: _toRichNodeSummary(hit.node), fields: hit.fields });
 
-    logger.info('✅ get_style_consumers succeeded', { count: consumers.length, method: 'scan' });
+    logger.info('✅ get_style_consumers succeeded', { count: consumers.length, method: 'index_fallback' });
     return { consuming_nodes: consumers };
   } catch (error) {
     try {
@@ -735,7 +1281,7 @@ async function getStyleConsumers(params) {
 }
 
 // -------- TOOL : get_document_components --------
-async function getDocumentComponents(params) {
+async function getDocumentComponents(params, ctx) {
   try {
     const components = [];
     // Optional filter: 'all' | 'published_only' | 'unpublished_only'
@@ -743,21 +1289,48 @@ async function getDocumentComponents(params) {
     if (published_filter !== 'published_only' && published_filter !== 'unpublished_only' && published_filter !== 'all') {
       published_filter = 'all';
     }
+    const include_instance_counts = !!(params && params.include_instance_counts === true);
     try {
-      const all = figma.root && typeof figma.root.findAll === 'function' ? figma.root.findAll(() => true) : [];
-      for (const n of all) {
-        if (n.type === 'COMPONENT' || n.type === 'COMPONENT_SET') {
-          const is_published = ("key" in n && !!n.key);
-          if ((published_filter === 'published_only' && !is_published) || (published_filter === 'unpublished_only' && is_published)) {
-            continue;
-          }
-          const entry = { id: n.id, component_key: ("key" in n && n.key) ? String(n.key) : null, name: n.name, type: n.type, is_published };
-          components.push(entry);
+      // Native type criteria avoid a JS callback per node across every page
+      let all = [];
+      if (figma.root && typeof figma.root.findAllWithCriteria === 'function') {
+        all = await timePhase(ctx, 'find_all', () => figma.root.findAllWithCriteria({ types: ['COMPONENT', 'COMPONENT_SET'] }));
+      } else if (figma.root && typeof figma.root.findAll === 'function') {
+        all = await timePhase(ctx, 'find_all', () => figma.root.findAll((n) => n.type === 'COMPONENT' || n.type === 'COMPONENT_SET'));
+      }
+      for (let i = 0; i < all.length; i++) {
+        if (i > 0 && i % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+        const n = all[i];
+        const is_published = ("key" in n && !!n.key);
+        if ((published_filter === 'published_only' && !is_published) || (published_filter === 'unpublished_only' && is_published)) {
+          continue;
         }
+        const entry = { id: n.id, component_key: ("key" in n && n.key) ? String(n.key) : null, name: n.name, type: n.type, is_published };
+        components.push(entry);
       }
     } catch (_) {}
-    logger.info('✅ get_document_components succeeded', { count: components.length, published_filter });
-    return { components };
+    if (include_instance_counts) {
+      // Counts come from the current page's component -> instances index; a
+      // component set counts the instances of all of its variants.
+      const index = await ensurePageNodeIndex(ctx);
+      const countOf = (id) => (index && index.instances.has(id)) ? index.instances.get(id).size : 0;
+      for (const entry of components) {
+        if (entry.type === 'COMPONENT_SET') {
+          let total = 0;
+          try {
+            const set = await figma.getNodeByIdAsync(entry.id);
+            for (const variant of (set && Array.isArray(set.children) ? set.children : [])) total += countOf(variant.id);
+          } catch (_) {}
+          entry.instance_count = total;
+        } else {
+          entry.instance_count = countOf(entry.id);
+        }
+      }
+    }
+    logger.info('✅ get_document_components succeeded', { count: components.length, published_filter, include_instance_counts });
+    return include_instance_counts
+      ? { components, instance_counts_page_id: figma.currentPage ? figma.currentPage.id : null }
+      : { components };
   } catch (error) {
     try {
       const maybe = JSON.parse(error && error.message ? error.message : String(error));
@@ -790,7 +1363,7 @@ async function getDocumentComponents(params) {
 
 
 // -------- TOOL : create_frame --------
-async function createFrame(params) {
+async function createFrame(params, ctx) {
   try {
     const name = params && typeof params.name === 'string' ? params.name : 'Frame';
     const parent_id = params && (typeof params.parent_id === 'string' ? params.parent_id : undefined);
@@ -810,7 +1383,7 @@ async function createFrame(params) {
     if (!parent_id) {
       figma.currentPage.appendChild(frame);
     } else {
-      const parentNode = await figma.getNodeByIdAsync(parent_id);
+      const parentNode = await resolveNode(parent_id, ctx);
       if (!parentNode) {
         logger.error('create_frame failed', { code: 'parent_not_found', details: { parent_id } });
         throw new Error(JSON.stringify({ code: 'parent_not_found', message: `Parent node not found with ID: ${parent_id}`, details: { parent_id } }));
@@ -845,7 +1418,7 @@ async function createFrame(params) {
 
 
 // -------- TOOL : create_text --------
-async function createText(params) {
+async function createText(params, ctx) {
   try {
     const characters = params && (typeof params.characters === 'string' ? params.characters : 'Text');
     const parent_id = params && (typeof params.parent_id === 'string' ? params.parent_id : undefined);
@@ -858,7 +1431,7 @@ async function createText(params) {
     const font_weight = params && (typeof params.font_weight === 'number' || typeof params.font_weight === 'string') ? params.font_weight : undefined;
     const font_color = params && typeof params.font_color === 'object' ? params.font_color : undefined;
 
-    await figma.loadFontAsync({ family: 'Inter', style: 'Regular' });
+    await loadFontCached({ family: 'Inter', style: 'Regular' });
     const textNode = figma.createText();
     textNode.x = x;
     textNode.y = y;
@@ -874,7 +1447,10 @@ async function createText(params) {
         // Keep existing font family but attempt to set style if possible.
         const current_family = textNode.fontName.family || 'Inter';
         const style = typeof font_weight === 'string' ? font_weight : String(font_weight);
-        try { textNode.fontName = { family: current_family, style }; } catch (_) {}
+        try {
+          await loadFontCached({ family: current_family, style });
+          textNode.fontName = { family: current_family, style };
+        } catch (_) {}
       }
     } catch (_) {}
 
@@ -890,7 +1466,7 @@ async function createText(params) {
     if (!parent_id) {
       figma.currentPage.appendChild(textNode);
     } else {
-      const parentNode = await figma.getNodeByIdAsync(parent_id);
+      const parentNode = await resolveNode(parent_id, ctx);
       if (!parentNode) {
         logger.error('❌ create_text failed', { code: 'parent_not_found', originalError: 'Parent not found', details: { parent_id } });
         throw new Error(JSON.stringify({ code: 'parent_not_found', message: 'Parent node not found', details: { parent_id } }));
@@ -1132,7 +1708,7 @@ async function _normalize_paints_input(paints) {
 }
 
 // -------- TOOL : set_fills --------
-async function set_fills(params) {
+async function set_fills(params, ctx) {
   logger.info("🎨 set_fills called", params);
   try {
     const { node_ids, paints } = params || {};
@@ -1169,9 +1745,10 @@ async function set_fills(params) {
     const nonOverridableNodes = [];
     const failedNodes = [];
     const failureReasons = {};
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("fills" in node)) { unsupportedNodes.push(id); continue; }
@@ -1213,7 +1790,7 @@ async function set_fills(params) {
 }
 
 // -------- TOOL : set_strokes --------
-async function set_strokes(params) {
+async function set_strokes(params, ctx) {
   logger.info("🖊️ set_strokes called", params);
   try {
     const { node_ids, paints, stroke_weight, stroke_align, dash_pattern } = params || {};
@@ -1247,9 +1824,10 @@ async function set_strokes(params) {
     const notFoundIds = [];
     const lockedNodes = [];
     const unsupportedNodes = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("strokes" in node)) { unsupportedNodes.push(id); continue; }
@@ -1283,7 +1861,7 @@ async function set_strokes(params) {
 }
 
 // -------- TOOL : set_corner_radius --------
-async function set_corner_radius(params) {
+async function set_corner_radius(params, ctx) {
   logger.info("📐 set_corner_radius (v2) called", params);
   try {
     const { node_ids, uniform_radius, top_left, top_right, bottom_left, bottom_right } = params || {};
@@ -1295,9 +1873,10 @@ async function set_corner_radius(params) {
     const notFoundIds = [];
     const lockedNodes = [];
     const unsupportedNodes = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         const supportsUniform = ("cornerRadius" in node);
@@ -1346,7 +1925,7 @@ async function set_corner_radius(params) {
 }
 
 // -------- TOOL : set_size --------
-async function set_size(params) {
+async function set_size(params, ctx) {
   logger.info("📏 set_size called", params);
   try {
     const { node_ids, width, height } = params || {};
@@ -1356,9 +1935,10 @@ async function set_size(params) {
     const notFoundIds = [];
     const lockedNodes = [];
     const unsupportedNodes = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         const canResize = typeof node.resize === "function";
@@ -1386,7 +1966,7 @@ async function set_size(params) {
 }
 
 // -------- TOOL : set_position --------
-async function setPosition(params) {
+async function setPosition(params, ctx) {
   logger.info("📍 set_position called", params);
   try {
     const { node_ids, x, y } = params || {};
@@ -1396,9 +1976,10 @@ async function setPosition(params) {
     const notFoundIds = [];
     const lockedNodes = [];
     const unsupportedNodes = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("x" in node) || !("y" in node)) { unsupportedNodes.push(id); continue; }
@@ -1424,7 +2005,7 @@ async function setPosition(params) {
 
 
 // -------- TOOL : set_layer_properties --------
-async function set_layer_properties(params) {
+async function set_layer_properties(params, ctx) {
   logger.info("🧱 set_layer_properties called", params);
   try {
     const { node_ids, name, opacity, visible, locked, blend_mode } = params || {};
@@ -1436,9 +2017,10 @@ async function set_layer_properties(params) {
     const notFoundIds = [];
     const lockedNodes = [];
     const unsupportedNodes = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         const before = { name: node.name, opacity: node.opacity, visible: node.visible, locked: node.locked, blendMode: node.blendMode };
@@ -1472,7 +2054,7 @@ async function set_layer_properties(params) {
 }
 
 // -------- TOOL : set_effects --------
-async function set_effects(params) {
+async function set_effects(params, ctx) {
   logger.info("✨ set_effects called", params);
   try {
     const { node_ids, effects } = params || {};
@@ -1512,9 +2094,10 @@ async function set_effects(params) {
         return null;
       }
     }
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("effects" in node)) { unsupportedNodes.push(id); continue; }
@@ -1582,7 +2165,7 @@ async function set_effects(params) {
 
 
 // -------- TOOL : set_auto_layout --------
-async function set_auto_layout(params) {
+async function set_auto_layout(params, ctx) {
   logger.info("📐 set_auto_layout called", params);
   try {
     const { node_ids } = params || {};
@@ -1610,9 +2193,10 @@ async function set_auto_layout(params) {
     const lockedNodes = [];
     const unsupportedNodes = [];
 
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("layoutMode" in node)) { unsupportedNodes.push(id); continue; }
@@ -1676,7 +2260,7 @@ async function set_auto_layout(params) {
 }
 
 // -------- TOOL : set_child_index --------
-async function set_child_index(params) {
+async function set_child_index(params, ctx) {
   const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
   logger.info("↕️ set_child_index called", params);
   try {
@@ -1692,7 +2276,7 @@ async function set_child_index(params) {
       throw new Error(JSON.stringify(payload));
     }
 
-    const node = await figma.getNodeByIdAsync(node_id);
+    const node = await resolveNode(node_id, ctx);
     if (!node) {
       const payload = { code: "node_not_found", message: `Node not found: ${node_id}`, details: { node_id } };
       logger.error("❌ set_child_index failed", { code: payload.code, originalError: payload.message, details: payload.details });
@@ -1745,7 +2329,7 @@ async function set_child_index(params) {
 }
 
 // -------- TOOL : set_auto_layout_child --------
-async function set_auto_layout_child(params) {
+async function set_auto_layout_child(params, ctx) {
   logger.info("📐 set_auto_layout_child called", params);
   try {
     const { node_ids } = params || {};
@@ -1758,9 +2342,10 @@ async function set_auto_layout_child(params) {
     const lockedNodes = [];
     const unsupportedNodes = [];
 
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         const supports = ("layoutAlign" in node) || ("layoutGrow" in node) || ("layoutPositioning" in node);
@@ -1802,7 +2387,7 @@ async function set_auto_layout_child(params) {
 }
 
 // -------- TOOL : set_constraints --------
-async function set_constraints(params) {
+async function set_constraints(params, ctx) {
   logger.info("📐 set_constraints called", params);
   try {
     const { node_ids, horizontal, vertical } = params || {};
@@ -1814,9 +2399,10 @@ async function set_constraints(params) {
     const lockedNodes = [];
     const unsupportedNodes = [];
 
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (!("constraints" in node)) { unsupportedNodes.push(id); continue; }
@@ -1854,13 +2440,13 @@ async function set_constraints(params) {
 
 
 // -------- TOOL : set_text_characters --------
-async function setTextCharacters(params) {
+async function setTextCharacters(params, ctx) {
   const { node_id, new_characters } = params || {};
   try {
     if (!node_id || typeof node_id !== "string") throw new Error(JSON.stringify({ code: "missing_parameter", message: "Provide node_id", details: {} }));
     if (typeof new_characters !== "string") throw new Error(JSON.stringify({ code: "missing_parameter", message: "Provide new_characters string", details: {} }));
 
-    const node = await figma.getNodeByIdAsync(node_id);
+    const node = await resolveNode(node_id, ctx);
     if (!node) throw new Error(JSON.stringify({ code: "node_not_found", message: `Node not found: ${node_id}`, details: { node_id } }));
     if (node.type !== 'TEXT') throw new Error(JSON.stringify({ code: "invalid_node_type", message: "Node is not a TEXT node", details: { node_id, node_type: node.type } }));
     if (node.locked) throw new Error(JSON.stringify({ code: "node_locked", message: "Node is locked", details: { node_id } }));
@@ -1868,12 +2454,12 @@ async function setTextCharacters(params) {
     // Load a font before changing characters
     try {
       if (node.fontName !== figma.mixed) {
-        await figma.loadFontAsync(node.fontName);
+        await loadFontCached(node.fontName);
       } else {
         // Use first character font as baseline when mixed
         if (node.characters && node.characters.length > 0) {
           const first = node.getRangeFontName(0, 1);
-          await figma.loadFontAsync(first);
+          await loadFontCached(first);
           node.fontName = first;
         }
       }
@@ -1890,8 +2476,110 @@ async function setTextCharacters(params) {
   }
 }
 
+// -------- TOOL : set_multiple_text_contents --------
+// Replaces the characters of many TEXT nodes in one command. Targets are grouped
+// by the font that has to be loaded (first-character font for mixed nodes, as in
+// set_text_characters) so each distinct font is loaded once, in parallel.
+async function setMultipleTextContents(params, ctx) {
+  const replacements = params && Array.isArray(params.replacements) ? params.replacements : null;
+  try {
+    if (!replacements || replacements.length === 0) {
+      throw new Error(JSON.stringify({ code: "missing_parameter", message: "Provide a non-empty replacements array", details: {} }));
+    }
+    const ids = replacements.map((r) => r && r.node_id);
+    // Results are keyed by node id, and two writes to one node would race on which text wins
+    const seen = new Set();
+    const duplicates = new Set();
+    for (const id of ids) {
+      if (typeof id !== "string") continue;
+      if (seen.has(id)) duplicates.add(id);
+      seen.add(id);
+    }
+    if (duplicates.size > 0) {
+      throw new Error(JSON.stringify({ code: "invalid_parameter", message: "Each node_id may appear only once in replacements", details: { duplicate_node_ids: Array.from(duplicates) } }));
+    }
+    const results = new Map(); // node_id -> { node_id, success, error? }
+    const fail = (node_id, code, message) => results.set(node_id, { node_id, success: false, error: { code, message } });
+
+    await prefetchNodes(ids, ctx);
+
+    // Resolve targets and group them by the font that must be loaded
+    const groups = new Map(); // fontKey -> { font, entries: [{ node, text, mixed }] }
+    for (const r of replacements) {
+      const node_id = r && r.node_id;
+      if (typeof node_id !== "string" || node_id.length === 0 || typeof r.text !== "string") {
+        fail(String(node_id), "invalid_parameter", "Each replacement needs a node_id and a text string");
+        continue;
+      }
+      const node = await resolveNode(node_id, ctx);
+      if (!node) { fail(node_id, "node_not_found", `Node not found: ${node_id}`); continue; }
+      if (node.type !== "TEXT") { fail(node_id, "invalid_node_type", `Node is not a TEXT node (${node.type})`); continue; }
+      if (node.locked) { fail(node_id, "node_locked", "Node is locked"); continue; }
+      let font = null;
+      let mixed = false;
+      try {
+        if (node.fontName !== figma.mixed) {
+          font = node.fontName;
+        } else if (node.characters && node.characters.length > 0) {
+          font = node.getRangeFontName(0, 1);
+          mixed = true;
+        }
+      } catch (_) {}
+      const key = font ? _fontKey(font) : "";
+      if (!groups.has(key)) groups.set(key, { font, entries: [] });
+      groups.get(key).entries.push({ node, text: r.text, mixed });
+    }
+
+    const fonts = Array.from(groups.values()).map((g) => g.font).filter(Boolean);
+    const loads = await timePhase(ctx, "font_load", () => Promise.allSettled(fonts.map((f) => loadFontCached(f))));
+    const failedFonts = new Set();
+    loads.forEach((outcome, i) => { if (outcome.status === "rejected") failedFonts.add(_fontKey(fonts[i])); });
+
+    const modified_node_ids = [];
+    let processed = 0;
+    for (const [key, group] of groups.entries()) {
+      for (const { node, text, mixed } of group.entries) {
+        processed += 1;
+        if (processed % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+        if (failedFonts.has(key)) { fail(node.id, "font_load_failed", `Failed to load font ${group.font.family} ${group.font.style}`); continue; }
+        try {
+          if (mixed && group.font) node.fontName = group.font;
+          node.characters = text;
+          results.set(node.id, { node_id: node.id, success: true });
+          modified_node_ids.push(node.id);
+        } catch (e) {
+          fail(node.id, "set_characters_failed", (e && e.message) || String(e));
+        }
+      }
+    }
+
+    const ordered = ids.map((id) => results.get(String(id))).filter(Boolean);
+    const failed = ordered.filter((r) => !r.success);
+    if (modified_node_ids.length === 0) {
+      const payload = { code: "set_multiple_text_contents_failed", message: "No text nodes were updated", details: { results: ordered } };
+      logger.error("❌ set_multiple_text_contents failed", { code: payload.code, originalError: payload.message, details: { failed: failed.length } });
+      throw new Error(JSON.stringify(payload));
+    }
+    logger.info("✅ set_multiple_text_contents succeeded", { modified: modified_node_ids.length, failed: failed.length, fonts: fonts.length });
+    return {
+      success: true,
+      summary: `Updated text on ${modified_node_ids.length} node(s)${failed.length ? `, ${failed.length} failed` : ""}.`,
+      modified_node_ids,
+      results: ordered,
+      fonts_loaded: fonts.length - failedFonts.size,
+    };
+  } catch (error) {
+    let parsed = null;
+    try { parsed = JSON.parse(error && error.message ? error.message : "{}"); } catch (_) {}
+    if (parsed && parsed.code) throw error;
+    const payload = { code: "set_multiple_text_contents_failed", message: (error && error.message) || String(error), details: {} };
+    logger.error("❌ set_multiple_text_contents failed", payload);
+    throw new Error(JSON.stringify(payload));
+  }
+}
+
 // -------- TOOL : set_text_style --------
-async function setTextStyle(params) {
+async function setTextStyle(params, ctx) {
   const { node_ids, font_size, font_name, text_align_horizontal, text_auto_resize, line_height_percent, letter_spacing_percent, text_case, text_decoration } = params || {};
   logger.info("🅰️ set_text_style called", params);
   try {
@@ -1904,12 +2592,13 @@ async function setTextStyle(params) {
     const needFontLoad = !!(font_name);
     const requestedFont = font_name ? { family: font_name.family, style: font_name.style } : null;
     if (requestedFont) {
-      try { await figma.loadFontAsync(requestedFont); } catch (e) { throw new Error(JSON.stringify({ code: "font_load_failed", message: "Failed to load requested font", details: { font_name } })); }
+      try { await loadFontCached(requestedFont); } catch (e) { throw new Error(JSON.stringify({ code: "font_load_failed", message: "Failed to load requested font", details: { font_name } })); }
     }
 
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { notFoundIds.push(id); continue; }
         if (node.locked) { lockedNodes.push(id); continue; }
         if (node.type !== 'TEXT') { nonTextNodes.push(id); continue; }
@@ -1917,9 +2606,9 @@ async function setTextStyle(params) {
         // Ensure some font is loaded before setting style properties which may require it
         try {
           if (node.fontName !== figma.mixed) {
-            await figma.loadFontAsync(node.fontName);
+            await loadFontCached(node.fontName);
           } else if (requestedFont) {
-            await figma.loadFontAsync(requestedFont);
+            await loadFontCached(requestedFont);
             node.fontName = requestedFont;
           }
         } catch (_) {}
@@ -1964,7 +2653,7 @@ async function setTextStyle(params) {
 
 
 // -------- TOOL : clone_nodes --------
-async function clone_nodes(params) {
+async function clone_nodes(params, ctx) {
   const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
   try {
     const { node_ids } = params || {};
@@ -1985,9 +2674,10 @@ async function clone_nodes(params) {
     const created_node_ids = [];
     const unresolved_node_ids = [];
 
+    await prefetchNodes(uniqueIds, ctx);
     for (const nodeId of uniqueIds) {
       try {
-        const node = await figma.getNodeByIdAsync(nodeId);
+        const node = await resolveNode(nodeId, ctx);
         if (!node) { unresolved_node_ids.push(nodeId); continue; }
         if (!("clone" in node) || typeof node.clone !== "function") {
           const payload = { code: "node_not_supported", message: "Node does not support clone()", details: { nodeId, type: node.type } };
@@ -2043,7 +2733,7 @@ async function clone_nodes(params) {
 
 
 // -------- TOOL : reparent_nodes --------
-async function reparent_nodes(params) {
+async function reparent_nodes(params, ctx) {
   const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
   try {
     const { node_ids_to_move, new_parent_id } = params || {};
@@ -2058,7 +2748,7 @@ async function reparent_nodes(params) {
       throw new Error(JSON.stringify(payload));
     }
 
-    const newParent = await figma.getNodeByIdAsync(new_parent_id);
+    const newParent = await resolveNode(new_parent_id, ctx);
     if (!newParent) {
       const payload = { code: "parent_not_found", message: "New parent node not found", details: { new_parent_id } };
       logger.error("❌ reparent_nodes failed", { code: payload.code, originalError: payload.message, details: payload.details });
@@ -2072,9 +2762,10 @@ async function reparent_nodes(params) {
 
     const moved_node_ids = [];
     const unresolved_node_ids = [];
+    await prefetchNodes(node_ids_to_move, ctx);
     for (const id of node_ids_to_move) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { unresolved_node_ids.push(id); continue; }
         try {
           // Best-effort remove/append
@@ -2116,7 +2807,7 @@ async function reparent_nodes(params) {
 }
 
 // -------- TOOL : reorder_nodes --------
-async function reorder_nodes(params) {
+async function reorder_nodes(params, ctx) {
   const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
   try {
     const { node_ids, mode } = params || {};
@@ -2135,9 +2826,10 @@ async function reorder_nodes(params) {
     const modified_node_ids = [];
     const unresolved_node_ids = [];
 
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const node = await figma.getNodeByIdAsync(id);
+        const node = await resolveNode(id, ctx);
         if (!node) { unresolved_node_ids.push(id); continue; }
         try {
           switch (mode) {
@@ -2364,7 +3056,7 @@ async function createComponentInstance(params) {
 }
 
 // -------- TOOL : set_instance_properties --------
-async function setInstanceProperties(params) {
+async function setInstanceProperties(params, ctx) {
   try {
     const { node_ids, properties } = params || {};
     if (!Array.isArray(node_ids) || node_ids.length === 0) {
@@ -2379,9 +3071,10 @@ async function setInstanceProperties(params) {
     }
 
     const modified_node_ids = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const n = await figma.getNodeByIdAsync(id);
+        const n = await resolveNode(id, ctx);
         if (!n || n.type !== "INSTANCE") continue;
         if (typeof n.setProperties === "function") {
           // Respect Figma API semantics; property keys should include '#id' where required
@@ -2415,7 +3108,7 @@ async function setInstanceProperties(params) {
 }
 
 // -------- TOOL : detach_instance --------
-async function detachInstance(params) {
+async function detachInstance(params, ctx) {
   try {
     const { node_ids } = params || {};
     if (!Array.isArray(node_ids) || node_ids.length === 0) {
@@ -2425,9 +3118,10 @@ async function detachInstance(params) {
     }
 
     const created_frame_ids = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const n = await figma.getNodeByIdAsync(id);
+        const n = await resolveNode(id, ctx);
         if (!n || n.type !== "INSTANCE") continue;
         const frame = n.detachInstance();
         if (frame && frame.id) created_frame_ids.push(frame.id);
@@ -2522,7 +3216,7 @@ async function createStyle(params) {
 }
 
 // -------- TOOL : apply_style --------
-async function applyStyle(params) {
+async function applyStyle(params, ctx) {
   try {
     const { node_ids, style_id, style_type } = params || {};
     if (!Array.isArray(node_ids) || node_ids.length === 0) {
@@ -2543,9 +3237,10 @@ async function applyStyle(params) {
     }
 
     const modified_node_ids = [];
+    await prefetchNodes(node_ids, ctx);
     for (const id of node_ids) {
       try {
-        const n = await figma.getNodeByIdAsync(id);
+        const n = await resolveNode(id, ctx);
         if (!n) continue;
 
         // Prefer async setter methods when available (required for documentAccess: dynamic-page)
@@ -2850,6 +3545,265 @@ async function bindVariableToProperty(params) {
 // ----------------------------------------------------
 
 
+// ----------------------------------------------------
+// -------- Sub-Category 3.11: Annotations & Connections --------
+// ----------------------------------------------------
+
+// Annotation property types Figma renders live from the node. Any other
+// {name, value} pair is appended to the label markdown instead.
+const ANNOTATION_PROPERTY_TYPES = new Set([
+  "width", "height", "maxWidth", "minWidth", "maxHeight", "minHeight",
+  "fills", "strokes", "effects", "strokeWeight", "cornerRadius",
+  "textStyleId", "textAlignHorizontal", "fontFamily", "fontStyle", "fontSize", "fontWeight",
+  "lineHeight", "letterSpacing", "itemSpacing", "padding", "layoutMode", "alignItems",
+  "opacity", "mainComponent",
+]);
+
+function _toFigmaAnnotation(item) {
+  const properties = [];
+  const extraLines = [];
+  for (const prop of (Array.isArray(item.properties) ? item.properties : [])) {
+    if (!prop || typeof prop.name !== "string" || prop.name.length === 0) continue;
+    if (ANNOTATION_PROPERTY_TYPES.has(prop.name)) {
+      properties.push({ type: prop.name });
+    } else {
+      extraLines.push(`**${prop.name}**: ${prop.value == null ? "" : String(prop.value)}`);
+    }
+  }
+  const labelMarkdown = extraLines.length ? `${item.label_markdown}\n\n${extraLines.join("\n")}` : item.label_markdown;
+  const annotation = { labelMarkdown };
+  if (typeof item.category_id === "string" && item.category_id.length > 0) annotation.categoryId = item.category_id;
+  if (properties.length) annotation.properties = properties;
+  return annotation;
+}
+
+// Figma returns either `label` or `labelMarkdown` on read; only one may be set on write
+function _copyExistingAnnotation(a) {
+  const copy = {};
+  if (a.labelMarkdown) copy.labelMarkdown = a.labelMarkdown;
+  else if (a.label) copy.label = a.label;
+  if (a.categoryId) copy.categoryId = a.categoryId;
+  if (Array.isArray(a.properties) && a.properties.length) copy.properties = a.properties.map((p) => ({ type: p.type }));
+  return copy;
+}
+
+// -------- TOOL : set_annotations --------
+// Applies many annotations in one command. Items are grouped per node so each
+// node's annotation list is read and written once; mode "append" keeps the
+// existing annotations, "replace" overwrites them with the new items.
+async function setAnnotations(params, ctx) {
+  const annotations = params && Array.isArray(params.annotations) ? params.annotations : null;
+  const mode = (params && params.mode) || "append";
+  try {
+    if (!annotations || annotations.length === 0) {
+      throw new Error(JSON.stringify({ code: "missing_parameter", message: "Provide a non-empty annotations array", details: {} }));
+    }
+    if (mode !== "append" && mode !== "replace") {
+      throw new Error(JSON.stringify({ code: "invalid_parameter", message: "mode must be 'append' or 'replace'", details: { mode } }));
+    }
+    const results = annotations.map((item, index) => ({ index, node_id: item && item.node_id, success: false }));
+    const fail = (index, code, message) => { results[index].error = { code, message }; };
+
+    await prefetchNodes(annotations.map((a) => a && a.node_id), ctx);
+
+    const groups = new Map(); // node_id -> { node, indexes: [], annotations: [] }
+    for (let index = 0; index < annotations.length; index++) {
+      const item = annotations[index];
+      if (!item || typeof item.node_id !== "string" || item.node_id.length === 0 || typeof item.label_markdown !== "string") {
+        fail(index, "invalid_parameter", "Each annotation needs a node_id and a label_markdown string");
+        continue;
+      }
+      const node = await resolveNode(item.node_id, ctx);
+      if (!node) { fail(index, "node_not_found", `Node not found: ${item.node_id}`); continue; }
+      if (!("annotations" in node)) { fail(index, "invalid_node_type", `Node does not support annotations (${node.type})`); continue; }
+      if (!groups.has(node.id)) groups.set(node.id, { node, indexes: [], annotations: [] });
+      const group = groups.get(node.id);
+      group.indexes.push(index);
+      group.annotations.push(_toFigmaAnnotation(item));
+    }
+
+    const modified_node_ids = [];
+    let processed = 0;
+    for (const { node, indexes, annotations: added } of groups.values()) {
+      processed += 1;
+      if (processed % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+      try {
+        const existing = mode === "append" ? (node.annotations || []).map(_copyExistingAnnotation) : [];
+        node.annotations = existing.concat(added);
+        for (const index of indexes) results[index].success = true;
+        modified_node_ids.push(node.id);
+      } catch (e) {
+        for (const index of indexes) fail(index, "set_annotations_failed", (e && e.message) || String(e));
+      }
+    }
+
+    const failed = results.filter((r) => !r.success);
+    if (modified_node_ids.length === 0) {
+      const payload = { code: "set_annotations_failed", message: "No annotations were applied", details: { results } };
+      logger.error("❌ set_annotations failed", { code: payload.code, originalError: payload.message, details: { failed: failed.length } });
+      throw new Error(JSON.stringify(payload));
+    }
+    logger.info("✅ set_annotations succeeded", { nodes: modified_node_ids.length, applied: results.length - failed.length, failed: failed.length, mode });
+    return {
+      success: true,
+      summary: `Applied ${results.length - failed.length} annotation(s) to ${modified_node_ids.length} node(s)${failed.length ? `, ${failed.length} failed` : ""}.`,
+      modified_node_ids,
+      results,
+    };
+  } catch (error) {
+    let parsed = null;
+    try { parsed = JSON.parse(error && error.message ? error.message : "{}"); } catch (_) {}
+    if (parsed && parsed.code) throw error;
+    const payload = { code: "set_annotations_failed", message: (error && error.message) || String(error), details: {} };
+    logger.error("❌ set_annotations failed", payload);
+    throw new Error(JSON.stringify(payload));
+  }
+}
+
+function _pageOf(node) {
+  let current = node;
+  while (current && current.type !== "PAGE") current = current.parent || null;
+  return current;
+}
+
+// Point where the segment from the box center toward `target` leaves the box
+function _boxEdgePoint(box, target) {
+  const cx = box.x + box.width / 2;
+  const cy = box.y + box.height / 2;
+  const dx = target.x - cx;
+  const dy = target.y - cy;
+  if (dx === 0 && dy === 0) return { x: cx, y: cy };
+  const sx = dx !== 0 ? (box.width / 2) / Math.abs(dx) : Infinity;
+  const sy = dy !== 0 ? (box.height / 2) / Math.abs(dy) : Infinity;
+  const s = Math.min(sx, sy, 1);
+  return { x: cx + dx * s, y: cy + dy * s };
+}
+
+async function _createConnectorBetween(start, end, text) {
+  const connector = figma.createConnector();
+  connector.connectorStart = { endpointNodeId: start.id, magnet: "AUTO" };
+  connector.connectorEnd = { endpointNodeId: end.id, magnet: "AUTO" };
+  if (text) {
+    await loadFontCached(connector.text.fontName);
+    connector.text.characters = text;
+  }
+  return { method: "connector", connector_id: connector.id, created: [connector.id] };
+}
+
+// Figma Design has no connector node: draw an arrow between the node edges
+// on the start node's page, with an optional text label at its midpoint.
+async function _createLineBetween(start, end, text) {
+  const page = _pageOf(start);
+  if (!page || page !== _pageOf(end)) {
+    throw new Error(JSON.stringify({ code: "cross_page_connection", message: "Start and end nodes must be on the same page", details: {} }));
+  }
+  const a = _computeAbsoluteBoundingBox(start);
+  const b = _computeAbsoluteBoundingBox(end);
+  const from = _boxEdgePoint(a, { x: b.x + b.width / 2, y: b.y + b.height / 2 });
+  const to = _boxEdgePoint(b, { x: a.x + a.width / 2, y: a.y + a.height / 2 });
+  const line = figma.createVector();
+  const created = [line.id];
+  try {
+    line.name = `Connection: ${start.name} → ${end.name}`;
+    page.appendChild(line);
+    await line.setVectorNetworkAsync({
+      vertices: [{ x: 0, y: 0 }, { x: to.x - from.x, y: to.y - from.y, strokeCap: "ARROW_LINES" }],
+      segments: [{ start: 0, end: 1 }],
+    });
+    line.x = Math.min(from.x, to.x);
+    line.y = Math.min(from.y, to.y);
+    line.strokes = [{ type: "SOLID", color: { r: 0.4, g: 0.4, b: 0.4 } }];
+    line.strokeWeight = 2;
+    let label_id;
+    if (text) {
+      await loadFontCached({ family: "Inter", style: "Regular" });
+      const label = figma.createText();
+      created.push(label.id);
+      page.appendChild(label);
+      label.fontName = { family: "Inter", style: "Regular" };
+      label.characters = text;
+      label.name = `Connection label: ${text}`;
+      label.x = (from.x + to.x) / 2 - label.width / 2;
+      label.y = (from.y + to.y) / 2 - label.height / 2;
+      label_id = label.id;
+    }
+    return { method: "line", line_id: line.id, label_id, created };
+  } catch (e) {
+    for (const id of created) { try { const n = await figma.getNodeByIdAsync(id); if (n && !n.removed) n.remove(); } catch (_) {} }
+    throw e;
+  }
+}
+
+// -------- TOOL : create_connections --------
+// Connects pairs of nodes in one command. In FigJam each pair becomes a native
+// connector bound to both nodes; in Figma Design it becomes an arrow vector.
+async function createConnections(params, ctx) {
+  const connections = params && Array.isArray(params.connections) ? params.connections : null;
+  try {
+    if (!connections || connections.length === 0) {
+      throw new Error(JSON.stringify({ code: "missing_parameter", message: "Provide a non-empty connections array", details: {} }));
+    }
+    const useConnector = figma.editorType === "figjam" && typeof figma.createConnector === "function";
+    const ids = [];
+    for (const c of connections) { if (c) ids.push(c.start_node_id, c.end_node_id); }
+    await prefetchNodes(ids, ctx);
+
+    const results = [];
+    const created_node_ids = [];
+    for (let index = 0; index < connections.length; index++) {
+      if (index > 0 && index % CANCEL_CHECK_INTERVAL === 0) await cooperativeCheckpoint(ctx);
+      const c = connections[index] || {};
+      const entry = { index, start_node_id: c.start_node_id, end_node_id: c.end_node_id, success: false };
+      results.push(entry);
+      if (typeof c.start_node_id !== "string" || typeof c.end_node_id !== "string" || !c.start_node_id || !c.end_node_id) {
+        entry.error = { code: "invalid_parameter", message: "Each connection needs start_node_id and end_node_id" };
+        continue;
+      }
+      if (c.start_node_id === c.end_node_id) {
+        entry.error = { code: "invalid_parameter", message: "A connection needs two different nodes" };
+        continue;
+      }
+      const start = await resolveNode(c.start_node_id, ctx);
+      const end = await resolveNode(c.end_node_id, ctx);
+      const missing = !start ? c.start_node_id : (!end ? c.end_node_id : null);
+      if (missing) { entry.error = { code: "node_not_found", message: `Node not found: ${missing}` }; continue; }
+      const text = typeof c.text === "string" && c.text.length > 0 ? c.text : null;
+      try {
+        const made = await timePhase(ctx, "connect", () => (useConnector ? _createConnectorBetween(start, end, text) : _createLineBetween(start, end, text)));
+        const { created, ...rest } = made;
+        Object.assign(entry, rest, { success: true });
+        created_node_ids.push(...created);
+      } catch (e) {
+        let parsed = null;
+        try { parsed = JSON.parse(e && e.message ? e.message : ""); } catch (_) {}
+        entry.error = parsed && parsed.code ? { code: parsed.code, message: parsed.message } : { code: "create_connection_failed", message: (e && e.message) || String(e) };
+      }
+    }
+
+    const failed = results.filter((r) => !r.success);
+    if (created_node_ids.length === 0) {
+      const payload = { code: "create_connections_failed", message: "No connections were created", details: { results } };
+      logger.error("❌ create_connections failed", { code: payload.code, originalError: payload.message, details: { failed: failed.length } });
+      throw new Error(JSON.stringify(payload));
+    }
+    logger.info("✅ create_connections succeeded", { created: results.length - failed.length, failed: failed.length, method: useConnector ? "connector" : "line" });
+    return {
+      success: true,
+      summary: `Created ${results.length - failed.length} connection(s)${failed.length ? `, ${failed.length} failed` : ""}.`,
+      created_node_ids,
+      results,
+    };
+  } catch (error) {
+    let parsed = null;
+    try { parsed = JSON.parse(error && error.message ? error.message : "{}"); } catch (_) {}
+    if (parsed && parsed.code) throw error;
+    const payload = { code: "create_connections_failed", message: (error && error.message) || String(error), details: {} };
+    logger.error("❌ create_connections failed", payload);
+    throw new Error(JSON.stringify(payload));
+  }
+}
+
+
 
 
 
@@ -2860,7 +3814,7 @@ async function bindVariableToProperty(params) {
 // ============================================
 
 // -------- TOOL : scroll_and_zoom_into_view --------
-async function scroll_and_zoom_into_view(params) {
+async function scroll_and_zoom_into_view(params, ctx) {
   const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
   try {
       const { node_ids } = params || {};
@@ -2881,9 +3835,10 @@ async function scroll_and_zoom_into_view(params) {
       const nodes = [];
       const resolved_node_ids = [];
       const unresolved_node_ids = [];
+      await prefetchNodes(uniqueIds, ctx);
       for (const nodeId of uniqueIds) {
           try {
-              const node = await figma.getNodeByIdAsync(nodeId);
+              const node = await resolveNode(nodeId, ctx);
               if (node) {
                   nodes.push(node);
                   resolved_node_ids.push(nodeId);
@@ -2923,7 +3878,7 @@ async function scroll_and_zoom_into_view(params) {
 }
 
 // -------- TOOL : delete_nodes --------
-async function delete_nodes(params) {
+async function delete_nodes(params, ctx) {
 const logger = (globalThis.logger && typeof globalThis.logger.info === 'function') ? globalThis.logger : console;
 try {
   const { node_ids } = params || {};
@@ -2946,9 +3901,10 @@ try {
   const locked_node_ids = [];
   const non_deletable_node_ids = [];
 
+  await prefetchNodes(uniqueIds, ctx);
   for (const nodeId of uniqueIds) {
     try {
-      const node = await figma.getNodeByIdAsync(nodeId);
+      const node = await resolveNode(nodeId, ctx);
       if (!node) { unresolved_node_ids.push(nodeId); continue; }
       if (node.type === "DOCUMENT" || node.type === "PAGE") { non_deletable_node_ids.push(nodeId); continue; }
       if ("locked" in node && node.locked) { locked_node_ids.push(nodeId); continue; }
@@ -3050,6 +4006,251 @@ try {
 }
 }
 
+// -------- TOOL : preload_fonts --------
+// Warms the session font cache so later text edits skip loadFontAsync. Fonts come
+// from `fonts` and/or the TEXT nodes under `node_ids` (capped scan).
+const PRELOAD_FONTS_MAX_TEXT_NODES = 500;
+
+async function preloadFonts(params, ctx) {
+  try {
+    const requested = new Map();
+    const add = (font) => {
+      if (font && typeof font.family === "string" && typeof font.style === "string") requested.set(_fontKey(font), { family: font.family, style: font.style });
+    };
+    if (params && Array.isArray(params.fonts)) params.fonts.forEach(add);
+    let scanned = 0;
+    if (params && Array.isArray(params.node_ids)) {
+      for (const id of params.node_ids) {
+        if (scanned >= PRELOAD_FONTS_MAX_TEXT_NODES) break;
+        let node = null;
+        try { node = await figma.getNodeByIdAsync(id); } catch (_) {}
+        if (!node) continue;
+        const texts = node.type === "TEXT" ? [node] : (("findAllWithCriteria" in node) ? node.findAllWithCriteria({ types: ["TEXT"] }) : []);
+        for (const text of texts) {
+          if (scanned >= PRELOAD_FONTS_MAX_TEXT_NODES) break;
+          scanned += 1;
+          getTextNodeFonts(text).forEach(add);
+        }
+      }
+    }
+    if (requested.size === 0) {
+      const payload = { code: "missing_parameter", message: "Provide fonts or node_ids containing text", details: { scanned_text_nodes: scanned } };
+      logger.error("❌ preload_fonts failed", { code: payload.code, originalError: payload.message, details: payload.details });
+      throw new Error(JSON.stringify(payload));
+    }
+
+    const fonts = Array.from(requested.values());
+    const already_cached = fonts.filter((f) => fontLoadCache.has(_fontKey(f))).length;
+    const outcomes = await timePhase(ctx, "font_load", () => Promise.allSettled(fonts.map((f) => loadFontCached(f))));
+    const loaded_fonts = [];
+    const failed_fonts = [];
+    outcomes.forEach((outcome, i) => {
+      if (outcome.status === "fulfilled") loaded_fonts.push(fonts[i]);
+      else failed_fonts.push({ ...fonts[i], error: String((outcome.reason && outcome.reason.message) || outcome.reason) });
+    });
+    logger.info("✅ preload_fonts succeeded", { loaded: loaded_fonts.length, failed: failed_fonts.length, already_cached });
+    return {
+      success: true,
+      summary: `Loaded ${loaded_fonts.length} font(s)${failed_fonts.length ? `, ${failed_fonts.length} unavailable` : ""}.`,
+      loaded_fonts,
+      failed_fonts,
+      already_cached,
+      scanned_text_nodes: scanned,
+    };
+  } catch (error) {
+    let maybe = null;
+    try { maybe = JSON.parse(error && error.message ? error.message : String(error)); } catch (_) {}
+    if (maybe && maybe.code) throw error;
+    const payload = { code: "unknown_plugin_error", message: (error && error.message) || String(error), details: {} };
+    logger.error("❌ preload_fonts failed", { code: payload.code, originalError: payload.message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  }
+}
+
+// -------- TOOL : apply_edit_plan --------
+// Runs an ordered list of registry commands inside this single tool_call, so a
+// multi-step edit costs one round-trip and one undo group. String params of the
+// form "$<ref>.<key>" are replaced with values produced by an earlier operation
+// that declared `ref` (e.g. "$card.id", "$card.node_ids").
+// With `atomic: true` the plan is a transaction: it becomes its own undo step and
+// a failing operation rolls back everything applied before it.
+const EDIT_PLAN_MAX_OPERATIONS = 100;
+const EDIT_PLAN_EXCLUDED_COMMANDS = new Set(["apply_edit_plan", "commit_undo_step"]);
+const EDIT_PLAN_TOKEN_PATTERN = /^\$([A-Za-z_][A-Za-z0-9_-]*)\.([A-Za-z_][A-Za-z0-9_]*)$/;
+
+// Reference record for an operation result: `id` is the primary created/affected
+// node, `node_ids` every node id the result mentions; other top-level keys
+// (e.g. collection_id, initial_mode_id) are addressable as-is.
+function _editPlanRefFromResult(result) {
+  const r = (result && typeof result === "object") ? result : {};
+  const node_ids = [];
+  const push = (id) => { if (typeof id === "string" && id.length > 0 && !node_ids.includes(id)) node_ids.push(id); };
+  push(r.created_node_id);
+  if (r.node && r.node.id) push(r.node.id);
+  push(r.created_component_id);
+  for (const key of ["created_node_ids", "created_frame_ids", "modified_node_ids", "resolved_node_ids"]) {
+    if (Array.isArray(r[key])) r[key].forEach(push);
+  }
+  const primary = node_ids[0] || r.created_style_id || r.variable_id || r.collection_id || null;
+  return { ...r, id: primary, node_ids };
+}
+
+// Replace "$ref.key" tokens anywhere in params. A list-valued token inside an
+// array is spliced in, so ["$a.id", "$b.node_ids"] flattens to plain ids.
+function _resolveEditPlanParams(value, refs, index) {
+  if (typeof value === "string") {
+    const m = EDIT_PLAN_TOKEN_PATTERN.exec(value);
+    if (!m) return value;
+    const [, name, key] = m;
+    if (!refs.has(name)) {
+      throw new Error(JSON.stringify({ code: "unknown_reference", message: `Operation ${index} references '$${name}' before it was created`, details: { index, token: value, known_refs: Array.from(refs.keys()) } }));
+    }
+    const resolved = refs.get(name)[key];
+    if (resolved === undefined || resolved === null) {
+      throw new Error(JSON.stringify({ code: "unresolved_reference", message: `'${value}' has no value (ref '${name}' lacks '${key}')`, details: { index, token: value } }));
+    }
+    return resolved;
+  }
+  if (Array.isArray(value)) {
+    const out = [];
+    for (const item of value) {
+      const resolved = _resolveEditPlanParams(item, refs, index);
+      if (typeof item === "string" && Array.isArray(resolved)) out.push(...resolved);
+      else out.push(resolved);
+    }
+    return out;
+  }
+  if (value && typeof value === "object") {
+    const out = {};
+    for (const [k, v] of Object.entries(value)) out[k] = _resolveEditPlanParams(v, refs, index);
+    return out;
+  }
+  return value;
+}
+
+// Undo a failed atomic plan. The plan starts on a fresh undo step, so one
+// triggerUndo() reverts it; nodes created by the plan that survive (or every
+// created node when the undo API is unavailable) are removed directly.
+async function _rollbackEditPlan(createdIds) {
+  const rollback = { method: "remove_created", restored: false, removed_node_ids: [], remaining_node_ids: [] };
+  // Atomic plans start with commitUndo(), so one undo reverts this plan only,
+  // including partial edits of an operation that failed midway
+  if (typeof figma.triggerUndo === "function") {
+    try {
+      figma.triggerUndo();
+      rollback.method = "undo";
+    } catch (e) {
+      rollback.undo_error = (e && e.message) || String(e);
+    }
+  }
+  for (const id of createdIds) {
+    let node = null;
+    try { node = await figma.getNodeByIdAsync(id); } catch (_) {}
+    if (!node || node.removed) continue;
+    try { node.remove(); rollback.removed_node_ids.push(id); } catch (_) { rollback.remaining_node_ids.push(id); }
+  }
+  // Property edits on pre-existing nodes are only reverted by the undo path
+  rollback.restored = rollback.method === "undo" && rollback.remaining_node_ids.length === 0;
+  return rollback;
+}
+
+function _parseStructuredError(error) {
+  const raw = (error && error.message) || String(error);
+  try {
+    const parsed = JSON.parse(raw);
+    if (parsed && parsed.code) return parsed;
+  } catch (_) {}
+  return { code: "unknown_plugin_error", message: raw, details: {} };
+}
+
+async function applyEditPlan(params, ctx) {
+  const operations = params && Array.isArray(params.operations) ? params.operations : null;
+  if (!operations || operations.length === 0) {
+    const payload = { code: "missing_parameter", message: "'operations' must be a non-empty array", details: {} };
+    logger.error("❌ apply_edit_plan failed", { code: payload.code, originalError: payload.message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  }
+  if (operations.length > EDIT_PLAN_MAX_OPERATIONS) {
+    const payload = { code: "invalid_parameter", message: `An edit plan may contain at most ${EDIT_PLAN_MAX_OPERATIONS} operations`, details: { count: operations.length } };
+    logger.error("❌ apply_edit_plan failed", { code: payload.code, originalError: payload.message, details: payload.details });
+    throw new Error(JSON.stringify(payload));
+  }
+  for (let i = 0; i < operations.length; i++) {
+    const op = operations[i];
+    const command = op && typeof op.command === "string" ? op.command : null;
+    if (!command || !commandRegistry.has(command) || EDIT_PLAN_EXCLUDED_COMMANDS.has(command)) {
+      const payload = { code: "invalid_operation", message: `Operation ${i} has an unsupported command: ${command}`, details: { index: i, command } };
+      logger.error("❌ apply_edit_plan failed", { code: payload.code, originalError: payload.message, details: payload.details });
+      throw new Error(JSON.stringify(payload));
+    }
+  }
+
+  const atomic = params.atomic === true;
+  if (atomic && typeof figma.commitUndo === "function") {
+    // Close the user's pending undo step so a rollback only reverts this plan
+    try { figma.commitUndo(); } catch (_) {}
+  }
+
+  const refs = new Map();
+  const results = [];
+  const modified = new Set();
+  const createdIds = [];
+  for (let i = 0; i < operations.length; i++) {
+    const op = operations[i];
+    const ref = typeof op.ref === "string" && op.ref.length > 0 ? op.ref : null;
+    let result;
+    try {
+      throwIfCancelled(ctx);
+      const resolvedParams = await resolveSelectorParams(op.command, _resolveEditPlanParams(op.params || {}, refs, i), ctx);
+      const handler = commandRegistry.get(op.command);
+      result = await timePhase(ctx, `op:${op.command}`, () => handler(resolvedParams, ctx));
+    } catch (error) {
+      const cause = _parseStructuredError(error);
+      if (atomic) {
+        const rollback = await timePhase(ctx, "rollback", () => _rollbackEditPlan(createdIds));
+        const payload = {
+          code: "transaction_rolled_back",
+          message: `Operation ${i} (${op.command}) failed: ${cause.message}. ${results.length} earlier operation(s) were rolled back${rollback.restored ? "" : " (partially)"}.`,
+          details: { index: i, command: op.command, ref, cause, rolled_back_operations: results.length, rollback },
+        };
+        logger.error("❌ apply_edit_plan rolled back", { code: payload.code, originalError: cause.message, details: { index: i, command: op.command, method: rollback.method, restored: rollback.restored } });
+        throw new Error(JSON.stringify(payload));
+      }
+      if (cause.code === "cancelled") throw error;
+      const payload = {
+        code: "edit_plan_step_failed",
+        message: `Operation ${i} (${op.command}) failed: ${cause.message}`,
+        details: { index: i, command: op.command, ref, cause, completed: results, refs: Object.fromEntries(Array.from(refs.entries()).map(([k, v]) => [k, v.id])) },
+      };
+      logger.error("❌ apply_edit_plan failed", { code: payload.code, originalError: cause.message, details: { index: i, command: op.command } });
+      throw new Error(JSON.stringify(payload));
+    }
+    const record = _editPlanRefFromResult(result);
+    if (ref) refs.set(ref, record);
+    record.node_ids.forEach((id) => modified.add(id));
+    if (result && typeof result.created_node_id === "string") createdIds.push(result.created_node_id);
+    if (result && Array.isArray(result.created_node_ids)) createdIds.push(...result.created_node_ids);
+    const entry = { index: i, command: op.command, result };
+    if (ref) entry.ref = ref;
+    results.push(entry);
+  }
+
+  const refIds = {};
+  for (const [name, record] of refs.entries()) refIds[name] = record.id;
+  if (atomic && typeof figma.commitUndo === "function") {
+    try { figma.commitUndo(); } catch (_) {}
+  }
+  logger.info("✅ apply_edit_plan succeeded", { operations: results.length, refs: Object.keys(refIds).length, atomic });
+  return {
+    success: true,
+    summary: `Applied ${results.length} operation(s) in one step${atomic ? " (atomic)" : ""}.`,
+    atomic,
+    refs: refIds,
+    results,
+    modified_node_ids: Array.from(modified),
+  };
+}
+
 
 
 
@@ -3123,6 +4324,44 @@ function _toRichNodeSummary(node) {
   };
 }
 
+/**
+ * Normalize an optional `fields` projection into a Set (always containing "id").
+ * Returns null when no projection was requested (full shape).
+ * @param {any} fields
+ * @returns {Set<string>|null}
+ */
+function normalizeFieldSelection(fields) {
+  if (!Array.isArray(fields)) return null;
+  const set = new Set(fields.filter((f) => typeof f === "string" && f.length > 0));
+  if (set.size === 0) return null;
+  set.add("id");
+  return set;
+}
+
+/**
+ * Node summary restricted to the requested fields. Only requested values are
+ * computed (e.g. the bounding box is skipped unless asked for). Besides the
+ * RichNodeSummary keys, a few cheap live properties may be requested:
+ * visible, locked, opacity, parent_id and characters (TEXT only).
+ * @param {SceneNode} node
+ * @param {Set<string>|null} fieldSet
+ */
+function _toProjectedNodeSummary(node, fieldSet) {
+  if (!fieldSet) return _toRichNodeSummary(node);
+  const out = { id: node.id };
+  if (fieldSet.has("name")) out.name = node.name;
+  if (fieldSet.has("type")) out.type = node.type;
+  if (fieldSet.has("absolute_bounding_box")) out.absolute_bounding_box = _computeAbsoluteBoundingBox(node);
+  if (fieldSet.has("auto_layout_mode")) out.auto_layout_mode = ("layoutMode" in node && node.layoutMode) ? node.layoutMode : null;
+  if (fieldSet.has("has_children")) out.has_children = Array.isArray(node.children) && node.children.length > 0;
+  if (fieldSet.has("visible")) out.visible = node.visible !== false;
+  if (fieldSet.has("locked")) out.locked = !!node.locked;
+  if (fieldSet.has("opacity") && "opacity" in node) out.opacity = node.opacity;
+  if (fieldSet.has("parent_id")) out.parent_id = node.parent ? node.parent.id : null;
+  if (fieldSet.has("characters") && node.type === "TEXT") out.characters = node.characters;
+  return out;
+}
+
 // ======================================================
 // Section: Node Introspection Helpers (shared)
 // ======================================================
@@ -3406,7 +4645,13 @@ function customBase64Encode(bytes) {
 
   return base64;
 }
-async function buildNodeDetailsInternal(nodeId, highlight = false) {
+// Target-node keys that only the JSON_REST_V1 export provides
+const JSON_EXPORT_FIELDS = ["fills", "corner_radius", "absolute_bounding_box", "characters", "style", "children"];
+
+async function buildNodeDetailsInternal(nodeId, highlight = false, ctx = null, options = {}) {
+  const fieldSet = (options && options.fields) || null;
+  const includeImage = !!(options && options.includeImage);
+  const want = (key) => !fieldSet || fieldSet.has(key);
   try {
     // Validate params
     if (!nodeId || typeof nodeId !== "string") {
@@ -3418,7 +4663,7 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
     // Best-effort page preload (non-fatal if unavailable)
     try {
       if (typeof figma.loadAllPagesAsync === "function") {
-        await figma.loadAllPagesAsync();
+        await timePhase(ctx, 'load_pages', () => figma.loadAllPagesAsync());
       }
       if (figma.currentPage && typeof figma.currentPage.loadAsync === "function") {
         await figma.currentPage.loadAsync();
@@ -3442,7 +4687,7 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
     let parentContext = null;
     try {
       const parent = node.parent || null;
-      if (parent) {
+      if (parent && !fieldSet) {
         parentContext = {
           id: parent.id,
           name: parent.name,
@@ -3455,7 +4700,7 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
     // Children context (direct only)
     let childrenContext = [];
     try {
-      if ("children" in node && Array.isArray(node.children)) {
+      if (!fieldSet && "children" in node && Array.isArray(node.children)) {
         const parentChildren = node.children;
         childrenContext = parentChildren.map((child, index) => ({ id: child.id, name: child.name, type: child.type, index }));
       }
@@ -3464,10 +4709,13 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
     // Export and sanitize node JSON
     let target_node = { id: node.id, name: node.name, type: node.type };
     try {
-      const response = await node.exportAsync({ format: "JSON_REST_V1" });
-      const filtered = filterFigmaNode(response.document);
-      if (filtered && typeof filtered === "object") {
-        target_node = Object.assign({}, filtered);
+      // The REST export is the expensive step; skip it when no export-only field is requested
+      if (!fieldSet || JSON_EXPORT_FIELDS.some((k) => fieldSet.has(k))) {
+        const response = await timePhase(ctx, 'json_rest_export', () => node.exportAsync({ format: "JSON_REST_V1" }));
+        const filtered = filterFigmaNode(response.document);
+        if (filtered && typeof filtered === "object") {
+          target_node = Object.assign({}, filtered);
+        }
       }
     } catch (exportErr) {
       // Keep going; we'll still provide live properties below
@@ -3478,51 +4726,63 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
     try {
       // Identity & hierarchy
       const parent = node.parent || null;
-      const indexInParent = parent && parent.children ? parent.children.indexOf(node) : -1;
-      target_node.parent_id = parent ? parent.id : figma.currentPage.id;
-      target_node.index = indexInParent;
+      if (want("parent_id")) target_node.parent_id = parent ? parent.id : figma.currentPage.id;
+      if (want("index")) target_node.index = parent && parent.children ? parent.children.indexOf(node) : -1;
 
       // Core state & geometry
-      target_node.visible = node.visible !== false;
-      target_node.locked = !!node.locked;
-      target_node.is_mask = ("isMask" in node) ? node.isMask : false;
-      target_node.opacity = ("opacity" in node) ? node.opacity : 1;
-      target_node.width = node.width;
-      target_node.height = node.height;
-      target_node.rotation = ("rotation" in node) ? node.rotation : 0;
+      if (want("visible")) target_node.visible = node.visible !== false;
+      if (want("locked")) target_node.locked = !!node.locked;
+      if (want("is_mask")) target_node.is_mask = ("isMask" in node) ? node.isMask : false;
+      if (want("opacity")) target_node.opacity = ("opacity" in node) ? node.opacity : 1;
+      if (want("width")) target_node.width = node.width;
+      if (want("height")) target_node.height = node.height;
+      if (want("rotation")) target_node.rotation = ("rotation" in node) ? node.rotation : 0;
 
       // Layout
-      if (("clipsContent" in node)) target_node.clips_content = node.clipsContent;
-      target_node.auto_layout = getAutoLayoutInfo(node) || target_node.auto_layout;
-      if (("layoutSizingHorizontal" in node)) target_node.layout_sizing_horizontal = node.layoutSizingHorizontal;
-      if (("layoutSizingVertical" in node)) target_node.layout_sizing_vertical = node.layoutSizingVertical;
+      if (want("clips_content") && ("clipsContent" in node)) target_node.clips_content = node.clipsContent;
+      if (want("auto_layout")) target_node.auto_layout = getAutoLayoutInfo(node) || target_node.auto_layout;
+      if (want("layout_sizing_horizontal") && ("layoutSizingHorizontal" in node)) target_node.layout_sizing_horizontal = node.layoutSizingHorizontal;
+      if (want("layout_sizing_vertical") && ("layoutSizingVertical" in node)) target_node.layout_sizing_vertical = node.layoutSizingVertical;
 
       // Styling
-      if (Array.isArray(node.strokes) && !target_node.strokes) target_node.strokes = node.strokes;
-      if (("strokeWeight" in node)) target_node.stroke_weight = node.strokeWeight;
-      if (("strokeAlign" in node)) target_node.stroke_align = node.strokeAlign;
-      if (Array.isArray(node.effects) && !target_node.effects) target_node.effects = node.effects;
+      if (want("strokes") && Array.isArray(node.strokes) && !target_node.strokes) target_node.strokes = node.strokes;
+      if (want("stroke_weight") && ("strokeWeight" in node)) target_node.stroke_weight = node.strokeWeight;
+      if (want("stroke_align") && ("strokeAlign" in node)) target_node.stroke_align = node.strokeAlign;
+      if (want("effects") && Array.isArray(node.effects) && !target_node.effects) target_node.effects = node.effects;
 
       // Design system & prototyping
       const styleRefs = getStyleRefs(node);
-      Object.assign(target_node, styleRefs);
-      if (Array.isArray(node.reactions)) target_node.reactions = node.reactions;
-      if (node.boundVariables) target_node.bound_variables = node.boundVariables;
+      for (const key of Object.keys(styleRefs)) {
+        if (want(key) || want("style_ids")) target_node[key] = styleRefs[key];
+      }
+      if (want("reactions") && Array.isArray(node.reactions)) target_node.reactions = node.reactions;
+      if (want("bound_variables") && node.boundVariables) target_node.bound_variables = node.boundVariables;
 
       // Type-specific
-      if (node.type === "TEXT") {
+      if (want("text_meta") && node.type === "TEXT") {
         const textMeta = getTextNodeMeta(node);
         if (textMeta) target_node.text_meta = textMeta;
       }
-      const compInfo = getComponentInfo(node);
-      if (compInfo) target_node.component_meta = compInfo;
+      if (want("component_meta")) {
+        const compInfo = getComponentInfo(node);
+        if (compInfo) target_node.component_meta = compInfo;
+      }
     } catch (_) { /* best-effort enrichment */ }
 
-    // Export PNG 2x image preview of the target node
+    // Drop anything outside the projection (id is always kept)
+    if (fieldSet) {
+      const styleKeys = new Set(["fillStyleId", "strokeStyleId", "effectStyleId", "textStyleId"]);
+      for (const key of Object.keys(target_node)) {
+        if (fieldSet.has(key) || (styleKeys.has(key) && fieldSet.has("style_ids"))) continue;
+        delete target_node[key];
+      }
+    }
+
+    // Export PNG 2x image preview of the target node (opt-in; the export dominates inspection time)
     let exported_image = null;
     try {
-      if (("exportAsync" in node)) {
-        const bytes = await node.exportAsync({ format: "PNG", constraint: { type: "SCALE", value: 2 }, useAbsoluteBounds: true });
+      if (includeImage && ("exportAsync" in node)) {
+        const bytes = await timePhase(ctx, 'png_export', () => node.exportAsync({ format: "PNG", constraint: { type: "SCALE", value: 2 }, useAbsoluteBounds: true }));
         exported_image = customBase64Encode(bytes);
       }
     } catch (_) { exported_image = null; }
@@ -3564,6 +4824,50 @@ async function buildNodeDetailsInternal(nodeId, highlight = false) {
 // ======================================================
 // Section: Text Helpers (Font loading and character utilities)
 // ======================================================
+// Fonts stay loaded for the rest of the plugin session once loadFontAsync
+// resolves, so loads are cached as one promise per family/style: repeated and
+// concurrent requests for the same font share a single load.
+const fontLoadCache = new Map(); // "family::style" -> Promise<void>
+
+function _fontKey(font) {
+  return `${font.family}::${font.style}`;
+}
+
+/**
+ * Load a font once per session. Failed loads are forgotten so a later call can retry.
+ * @param {{family:string,style:string}} font
+ * @returns {Promise<void>}
+ */
+function loadFontCached(font) {
+  if (!font || typeof font !== "object" || typeof font.family !== "string" || typeof font.style !== "string") {
+    return Promise.reject(new Error(`Invalid font name: ${JSON.stringify(font)}`));
+  }
+  const key = _fontKey(font);
+  let pending = fontLoadCache.get(key);
+  if (!pending) {
+    pending = figma.loadFontAsync({ family: font.family, style: font.style });
+    fontLoadCache.set(key, pending);
+    pending.catch(() => { if (fontLoadCache.get(key) === pending) fontLoadCache.delete(key); });
+  }
+  return pending;
+}
+
+/**
+ * Fonts used by a TEXT node (every run when the node mixes fonts).
+ * @param {TextNode} node
+ * @returns {{family:string,style:string}[]}
+ */
+function getTextNodeFonts(node) {
+  if (!node || node.type !== "TEXT") return [];
+  try {
+    if (node.fontName !== figma.mixed) return [node.fontName];
+    const length = node.characters ? node.characters.length : 0;
+    return length > 0 ? node.getRangeAllFontNames(0, length) : [];
+  } catch (_) {
+    return [];
+  }
+}
+
 // Text Helpers: general utilities used by text font matching
 /**
  * Return unique items from an array based on a predicate or key.
@@ -3588,10 +4892,10 @@ const setCharacters = async (node, characters, options) => {
   try {
     if (node.fontName === figma.mixed) {
       const firstCharFont = node.getRangeFontName(0, 1);
-      await figma.loadFontAsync(firstCharFont);
+      await loadFontCached(firstCharFont);
       node.fontName = firstCharFont;
     } else {
-      await figma.loadFontAsync({
+      await loadFontCached({
         family: node.fontName.family,
         style: node.fontName.style,
       });
@@ -3601,7 +4905,7 @@ const setCharacters = async (node, characters, options) => {
       `⚠️ Failed to load "${node.fontName["family"]} ${node.fontName["style"]}" font; replaced with fallback "${fallbackFont.family} ${fallbackFont.style}"`,
       err
     );
-    await figma.loadFontAsync(fallbackFont);
+    await loadFontCached(fallbackFont);
     node.fontName = fallbackFont;
   }
   try {
@@ -3705,11 +5009,38 @@ function computeSelectionSignature(nodes) {
   }
 }
 
+// Fonts reported in the selection summary so the backend can preload them
+const SELECTION_FONT_SCAN_LIMIT = 200;
+const SELECTION_FONT_MAX = 20;
+
+/**
+ * Distinct fonts used by TEXT nodes in (and under) the selection, capped.
+ * @param {SceneNode[]} selectedNodes
+ * @returns {{family:string,style:string}[]}
+ */
+function collectSelectionFonts(selectedNodes) {
+  const fonts = new Map();
+  let scanned = 0;
+  for (const n of selectedNodes) {
+    if (scanned >= SELECTION_FONT_SCAN_LIMIT || fonts.size >= SELECTION_FONT_MAX) break;
+    let texts = [];
+    try {
+      texts = n.type === "TEXT" ? [n] : (("findAllWithCriteria" in n) ? n.findAllWithCriteria({ types: ["TEXT"] }) : []);
+    } catch (_) {}
+    for (const t of texts) {
+      if (scanned >= SELECTION_FONT_SCAN_LIMIT || fonts.size >= SELECTION_FONT_MAX) break;
+      scanned += 1;
+      for (const f of getTextNodeFonts(t)) fonts.set(_fontKey(f), { family: f.family, style: f.style });
+    }
+  }
+  return Array.from(fonts.values()).slice(0, SELECTION_FONT_MAX);
+}
+
 /**
  * Build a selection summary suitable for UI consumption.
  * Includes counts, hints and per-node summaries.
  * @param {SceneNode[]} selectedNodes
- * @returns {{selectionCount:number,typesCount:Record<string,number>,hints:object,nodes:object[]}}
+ * @returns {{selectionCount:number,typesCount:Record<string,number>,hints:object,nodes:object[],fonts:object[]}}
  */
 function buildSelectionSummary(selectedNodes) {
   const nodes = selectedNodes.map(collectNodeSummary);
@@ -3732,6 +5063,7 @@ function buildSelectionSummary(selectedNodes) {
     types_count,
     hints: { has_instances, has_variants, has_auto_layout, sticky_note_count, total_text_chars },
     nodes,
+    fonts: collectSelectionFonts(selectedNodes),
   };
 }
 
@@ -3772,12 +5104,138 @@ figma.on("run", () => {
   try { figma.ui.postMessage({ type: "auto-connect" }); } catch (_) {}
 });
 
+// ======================================================
+// Section: Document Change Stream
+// ======================================================
+// Coalesces node changes on the current page (plus selection/page switches) into
+// debounced batches for the agent, so it can invalidate caches and mirrored indexes.
+// `nodechange` on the current page is used instead of `documentchange`, which would
+// require loading every page under dynamic-page document access.
+const DOCUMENT_CHANGE_DEBOUNCE_MS = 300;
+const DOCUMENT_CHANGE_MAX_WAIT_MS = 1000;
+const DOCUMENT_CHANGE_MAX_NODES = 500;
+
+const documentChangeState = {
+  seq: 0,
+  nodes: new Map(), // id -> { kinds:Set<string>, properties:Set<string> }
+  overflow: false,
+  selectionChanged: false,
+  pageChanged: false,
+  firstAt: 0,
+  timer: null,
+  page: null,
+  watching: false,
+};
+
+function recordNodeChange(id, kind, properties) {
+  const st = documentChangeState;
+  if (!st.overflow) {
+    let entry = st.nodes.get(id);
+    if (!entry) {
+      if (st.nodes.size >= DOCUMENT_CHANGE_MAX_NODES) {
+        // Too many to list: the consumer treats the batch as "everything on the page changed"
+        st.overflow = true;
+        st.nodes.clear();
+        return;
+      }
+      entry = { kinds: new Set(), properties: new Set() };
+      st.nodes.set(id, entry);
+    }
+    entry.kinds.add(kind);
+    if (Array.isArray(properties)) for (const p of properties) entry.properties.add(p);
+  }
+}
+
+function flushDocumentChanges() {
+  const st = documentChangeState;
+  if (st.timer) { clearTimeout(st.timer); st.timer = null; }
+  if (!st.overflow && st.nodes.size === 0 && !st.selectionChanged && !st.pageChanged) return;
+  const changes = [];
+  for (const [id, entry] of st.nodes) {
+    changes.push({ id, kinds: Array.from(entry.kinds), properties: Array.from(entry.properties) });
+  }
+  const batch = {
+    type: "document_change",
+    seq: ++st.seq,
+    page_id: figma.currentPage ? figma.currentPage.id : null,
+    changes,
+    overflow: st.overflow,
+    selection_changed: st.selectionChanged,
+    page_changed: st.pageChanged,
+    ts: Date.now(),
+  };
+  st.nodes = new Map();
+  st.overflow = false;
+  st.selectionChanged = false;
+  st.pageChanged = false;
+  st.firstAt = 0;
+  // Any structural or property change may alter the cached snapshot payload
+  if (changes.length > 0 || batch.overflow || batch.page_changed) _lastCanvasSnapshot = null;
+  try { figma.ui.postMessage(batch); } catch (_) {}
+  logger.info("🔔 document_change batch posted", { seq: batch.seq, changes: changes.length, overflow: batch.overflow });
+}
+
+function scheduleDocumentChangeFlush() {
+  const st = documentChangeState;
+  const now = Date.now();
+  if (!st.firstAt) st.firstAt = now;
+  if (st.timer) clearTimeout(st.timer);
+  // Debounce bursts, but never hold a batch longer than the max wait
+  const wait = Math.max(0, Math.min(DOCUMENT_CHANGE_DEBOUNCE_MS, st.firstAt + DOCUMENT_CHANGE_MAX_WAIT_MS - now));
+  st.timer = setTimeout(flushDocumentChanges, wait);
+}
+
+function handleNodeChange(event) {
+  try {
+    const list = (event && Array.isArray(event.nodeChanges)) ? event.nodeChanges : [];
+    for (const change of list) {
+      const id = change && (change.id || (change.node && change.node.id));
+      if (!id) continue;
+      const kind = String(change.type || "PROPERTY_CHANGE");
+      pageIndexOnNodeChange(id, kind, change.properties);
+      recordNodeChange(id, kind, change.properties);
+    }
+    if (list.length > 0) scheduleDocumentChangeFlush();
+  } catch (e) {
+    console.warn("Failed to record node changes", e);
+  }
+}
+
+function watchCurrentPage() {
+  const st = documentChangeState;
+  const page = figma.currentPage;
+  if (st.page === page) return;
+  try { if (st.page && typeof st.page.off === "function") st.page.off("nodechange", handleNodeChange); } catch (_) {}
+  st.page = page;
+  // Changes on the previous page are no longer observed, so its index cannot be trusted
+  invalidatePageNodeIndex();
+  st.watching = false;
+  try {
+    if (page && typeof page.on === "function") {
+      page.on("nodechange", handleNodeChange);
+      st.watching = true;
+    }
+  } catch (e) {
+    logger.warn("⚠️ nodechange subscription failed", { originalError: (e && e.message) || String(e) });
+  }
+}
+
 // Re-enable lightweight selection summary broadcasting so UI can invalidate cache
 figma.on("selectionchange", handleSelectionChange);
+figma.on("selectionchange", () => {
+  documentChangeState.selectionChanged = true;
+  scheduleDocumentChangeFlush();
+});
 figma.on("currentpagechange", () => {
   try { postDocumentInfo(); } catch (_) {}
   try { handleSelectionChange(); } catch (_) {}
+  // Pending node ids belong to the old page; report the switch as a whole-page change
+  documentChangeState.nodes.clear();
+  documentChangeState.pageChanged = true;
+  watchCurrentPage();
+  scheduleDocumentChangeFlush();
 });
+watchCurrentPage();
 
 // ======================================================
 // Section: UI Message Handling
@@ -3847,23 +5305,39 @@ figma.ui.onmessage = async (msg) => {
       break;
 
     // Tool execution using existing command registry infrastructure
-    case "tool_call":
-      // Reuse existing execute-command infrastructure
+    case "tool_call": {
+      // Reuse existing execute-command infrastructure; timings ride along with the response
+      const ctx = createCommandContext(msg.id, msg.command, msg.options);
+      if (cancelledCommandIds.delete(msg.id)) {
+        ctx.cancelled = true;
+      }
+      if (msg.id) activeCommandContexts.set(msg.id, ctx);
       try {
-        const result = await handleCommand(msg.command, msg.params);
+        const result = await handleCommand(msg.command, msg.params, ctx);
         figma.ui.postMessage({
           type: "tool_response",
           id: msg.id,
           result,
+          timings: buildCommandTimings(ctx),
         });
       } catch (error) {
         figma.ui.postMessage({
           type: "tool_response", 
           id: msg.id,
           error: error.message || "Error executing command",
+          timings: buildCommandTimings(ctx),
         });
+      } finally {
+        if (msg.id) activeCommandContexts.delete(msg.id);
       }
       break;
+    }
+
+    case "tool_cancel": {
+      const wasActive = markCommandCancelled(msg.id, msg.reason);
+      logger.info("🛑 tool_cancel received", { details: { id: msg.id, reason: msg.reason || null, active: wasActive } });
+      break;
+    }
     
     default:
       // ignore unknown UI messages
@@ -3982,7 +5456,7 @@ async function createTextStyle(params) {
 
         try {
             if (s.font_name && typeof s.font_name === 'object' && s.font_name.family && s.font_name.style) {
-                try { await figma.loadFontAsync({ family: s.font_name.family, style: s.font_name.style }); } catch (_) {}
+                try { await loadFontCached({ family: s.font_name.family, style: s.font_name.style }); } catch (_) {}
                 try { textStyle.fontName = { family: s.font_name.family, style: s.font_name.style }; } catch (_) {}
             }
             if (typeof s.font_size === 'number') { try { textStyle.fontSize = s.font_size; } catch (_) {} }
@@ -4136,10 +5610,76 @@ async function createGridStyle(params) {
 
  
 
+// ======================================================
+// Reveal policy
+// - "always": reveal affected nodes after every step (default)
+// - "end_of_turn": collect affected ids until the backend sends flush_reveal
+// - "never": skip page switches, selection changes and viewport work
+// A tool_call selects its policy through `options.reveal`.
+// ======================================================
+const REVEAL_POLICIES = new Set(["always", "end_of_turn", "never"]);
+const MAX_NODES_TO_REVEAL = 50;
+const pendingRevealIds = new Set();
+
+function deferReveal(ids) {
+  for (const id of ids) {
+    if (pendingRevealIds.size >= MAX_NODES_TO_REVEAL) break;
+    if (typeof id === 'string' && id.length > 0) pendingRevealIds.add(id);
+  }
+}
+
+// Select the first resolvable node and bring it (and its same-page peers) into view
+async function revealNodes(idList, ctx) {
+  const revealed = [];
+  try {
+    // Resolve nodes; limit to a reasonable number to avoid perf issues
+    const ids = idList.slice(0, MAX_NODES_TO_REVEAL);
+    await prefetchNodes(ids, ctx);
+    const nodes = [];
+    for (const id of ids) {
+      const n = await resolveNode(id, ctx);
+      if (n) nodes.push(n);
+    }
+    if (nodes.length > 0) {
+      const primary = nodes[0];
+      // Switch to the page of the primary node
+      let p = primary.parent;
+      while (p && p.type !== 'PAGE') p = p.parent;
+      if (p && p.id && figma.currentPage && p.id !== figma.currentPage.id) {
+        try { figma.currentPage = p; } catch (_) {}
+      }
+      // Keep selection minimal to avoid disrupting user workflow
+      try { figma.currentPage.selection = [primary]; } catch (_) {}
+      // Only reveal nodes that are on the same page as the primary
+      const pageId = (p && p.id) ? p.id : (figma.currentPage && figma.currentPage.id);
+      const nodesOnPage = nodes.filter((n) => {
+        let q = n.parent; let page = null;
+        while (q && q.type !== 'PAGE') q = q.parent;
+        page = q;
+        return page && page.id === pageId;
+      });
+      const targets = nodesOnPage.length > 0 ? nodesOnPage : [primary];
+      try { figma.viewport.scrollAndZoomIntoView(targets); } catch (_) {}
+      for (const n of targets) revealed.push(n.id);
+    }
+  } catch (_) {}
+  return revealed;
+}
+
+// -------- TOOL : flush_reveal --------
+// Reveal everything deferred under the "end_of_turn" policy (no-op when nothing is pending)
+async function flushReveal(params, ctx) {
+  const ids = Array.from(pendingRevealIds);
+  pendingRevealIds.clear();
+  const revealed_node_ids = ids.length > 0 ? await timePhase(ctx, "reveal", () => revealNodes(ids, ctx)) : [];
+  logger.info("✅ flush_reveal succeeded", { pending: ids.length, revealed: revealed_node_ids.length });
+  return { success: true, summary: `Revealed ${revealed_node_ids.length} node(s).`, revealed_node_ids };
+}
+
 // ======================================================
 // Undo Group Wrapper: withUndoGroup(label, actions, options)
 // - Ensures step-level logging
-// - Optionally reveals affected nodes for UX via scrollAndZoomIntoView
+// - Optionally reveals affected nodes for UX via scrollAndZoomIntoView (per reveal policy)
 // - Does NOT call figma.commitUndo() automatically (split only when intentional)
 // ======================================================
 async function withUndoGroup(label, actions, options) {
@@ -4171,36 +5711,15 @@ async function withUndoGroup(label, actions, options) {
       for (const id of opts.candidate_ids) if (typeof id === 'string' && id.length > 0) affectedIds.add(id);
     }
 
-    if (reveal && affectedIds.size > 0) {
-      try {
-        // Resolve nodes; limit to a reasonable number to avoid perf issues
-        const MAX_NODES_TO_REVEAL = 50;
-        const ids = Array.from(affectedIds).slice(0, MAX_NODES_TO_REVEAL);
-        const nodes = [];
-        for (const id of ids) {
-          try { const n = await figma.getNodeByIdAsync(id); if (n) nodes.push(n); } catch (_) {}
-        }
-        if (nodes.length > 0) {
-          const primary = nodes[0];
-          // Switch to the page of the primary node
-          let p = primary.parent;
-          while (p && p.type !== 'PAGE') p = p.parent;
-          if (p && p.id && figma.currentPage && p.id !== figma.currentPage.id) {
-            try { figma.currentPage = p; } catch (_) {}
-          }
-          // Keep selection minimal to avoid disrupting user workflow
-          try { figma.currentPage.selection = [primary]; } catch (_) {}
-          // Only reveal nodes that are on the same page as the primary
-          const pageId = (p && p.id) ? p.id : (figma.currentPage && figma.currentPage.id);
-          const nodesOnPage = nodes.filter((n) => {
-            let q = n.parent; let page = null;
-            while (q && q.type !== 'PAGE') q = q.parent;
-            page = q;
-            return page && page.id === pageId;
-          });
-          try { figma.viewport.scrollAndZoomIntoView(nodesOnPage.length > 0 ? nodesOnPage : [primary]); } catch (_) {}
-        }
-      } catch (_) {}
+    const policy = opts.revealPolicy || "always";
+    if (reveal && affectedIds.size > 0 && !(opts.ctx && opts.ctx.cancelled)) {
+      if (policy === "end_of_turn") {
+        deferReveal(affectedIds);
+      } else if (policy === "always") {
+        const revealStart = Date.now();
+        await revealNodes(Array.from(affectedIds), opts.ctx);
+        if (opts.ctx && opts.ctx.phases) opts.ctx.phases.reveal = { ms: Date.now() - revealStart, count: affectedIds.size };
+      }
     }
 
     log.info(`✅ Step success`, { label });
@@ -0,0 +1,45 @@
+// Loads plugin/code.js into a vm context with a minimal `figma` stub so command
+// handlers can be called directly. Nodes are looked up in `nodes` by id.
+const fs = require("node:fs");
+const path = require("node:path");
+const vm = require("node:vm");
+
+function loadPlugin({ nodes = {} } = {}) {
+  const noop = () => {};
+  const figma = {
+    mixed: Symbol("mixed"),
+    showUI: noop,
+    on: noop,
+    off: noop,
+    ui: { postMessage: noop, onmessage: null },
+    clientStorage: { getAsync: async () => undefined, setAsync: async () => {} },
+    currentPage: { id: "0:1", name: "Page 1", children: [], selection: [] },
+    root: { children: [] },
+    getNodeByIdAsync: async (id) => nodes[id] || null,
+    loadFontAsync: async () => {},
+    notify: noop,
+  };
+  const context = vm.createContext({
+    figma,
+    __html__: "",
+    console: { log: noop, info: noop, warn: noop, error: noop, debug: noop },
+    setTimeout,
+    clearTimeout,
+    Promise,
+  });
+  const source = fs.readFileSync(path.join(__dirname, "..", "code.js"), "utf8");
+  vm.runInContext(source, context, { filename: "code.js" });
+  return context;
+}
+
+// Parse the structured `{ code, message, details }` payload a handler threw
+async function structuredError(promise) {
+  try {
+    await promise;
+  } catch (error) {
+    return JSON.parse(error.message);
+  }
+  throw new Error("expected the handler to throw");
+}
+
+module.exports = { loadPlugin, structuredError };
@@ -0,0 +1,38 @@
+const test = require("node:test");
+const assert = require("node:assert/strict");
+const { loadPlugin, structuredError } = require("./load-plugin");
+
+test("set_annotations reports per-item results when every item fails", async () => {
+  const plugin = loadPlugin();
+  const payload = await structuredError(plugin.setAnnotations({
+    annotations: [
+      { node_id: "9:1", label_markdown: "Primary CTA" },
+      { node_id: "9:2", label_markdown: "Secondary CTA" },
+    ],
+  }, {}));
+  assert.equal(payload.code, "set_annotations_failed");
+  assert.equal(payload.details.results.length, 2);
+  assert.deepEqual(payload.details.results.map((r) => r.error.code), ["node_not_found", "node_not_found"]);
+});
+
+test("set_annotations keeps the code of parameter errors", async () => {
+  const plugin = loadPlugin();
+  assert.equal((await structuredError(plugin.setAnnotations({ annotations: [] }, {}))).code, "missing_parameter");
+  const invalid = await structuredError(plugin.setAnnotations({ annotations: [{ node_id: "9:1", label_markdown: "x" }], mode: "merge" }, {}));
+  assert.equal(invalid.code, "invalid_parameter");
+});
+
+test("create_connections reports per-item results when every item fails", async () => {
+  const plugin = loadPlugin();
+  const payload = await structuredError(plugin.createConnections({
+    connections: [{ from_node_id: "9:1", to_node_id: "9:2" }],
+  }, {}));
+  assert.equal(payload.code, "create_connections_failed");
+  assert.equal(payload.details.results.length, 1);
+  assert.equal(payload.details.results[0].success, false);
+});
+
+test("preload_fonts keeps the code of parameter errors", async () => {
+  const plugin = loadPlugin();
+  assert.equal((await structuredError(plugin.preloadFonts({}, {}))).code, "missing_parameter");
+});